@@ -25,6 +25,7 @@ from app.elastic.schemas import (
     IndexNamePathParams,
     IndexType,
     UpdateIndexBody,
+    UpdateMappingBody,
 )
 from app.elastic.schemas.document import MessageResponseSchema
 from core.exceptions import (
@@ -151,6 +152,28 @@ async def update_elastic_index(
     return ElasticIndexUpdateResponse(updated=True)
 
 
+@elastic_router.post(
+    "/indices/{index_name}/mappings",
+    description="Add new fields to the mappings of an index in Elasticsearch",
+    response_model=ElasticIndexUpdateResponse,
+    responses={
+        "400": CustomExceptionHelper.get_exception_response(
+            BadRequestException,
+            "Bad request, please check request body, params, headers, or query",
+        ),
+        "404": CustomExceptionHelper.get_exception_response(
+            NotFoundException, "Index with given name does not exist"
+        ),
+    },
+    dependencies=[Depends(PermissionDependency([IsAuthenticated, IsEmailVerified]))],
+)
+async def update_elastic_index_mappings(
+    body: UpdateMappingBody, path: IndexNamePathParams = Depends()
+):
+    EsClient.put_mapping(index=path.index_name, properties=body.properties)
+    return ElasticIndexUpdateResponse(updated=True)
+
+
 @elastic_router.post(
     "/indices/{index_name}/delete",
     description="Delete an index in Elasticsearch",
@@ -6,7 +6,6 @@ from app.exception import BaseHttpErrorSchema
 from app.preprocess import PreprocessUtil
 from app.search.enums.search import DomainEnum
 from app.search.schemas.search import (
-    DocumentDetails,
     SemanticSearchRequest,
     SemanticSearchResponseSchema,
     RepoSearchPathParams,
@@ -15,12 +14,15 @@ from app.search.schemas.search import (
 )
 from core.exceptions import (
     EmailNotVerifiedException,
+    InvalidSearchCursorException,
     InvalidRepositoryCollaboratorException,
     InvalidRepositoryRoleException,
     RepositoryNotFoundException,
+    ServiceUnavailableException,
     UnauthorizedException,
     UserNotAllowedException,
 )
+from core.helpers.executor import inference_executor
 from core.utils import CustomExceptionHelper
 from core.fastapi.dependencies import (
     IsAuthenticated,
@@ -38,9 +40,15 @@ ds = DocumentService()
     description="Fetches relevant public documents",
     response_model=SemanticSearchResponseSchema,        
     responses={
+        "400": CustomExceptionHelper.get_exception_response(
+            InvalidSearchCursorException, "Invalid or expired search cursor"
+        ),
         "403": CustomExceptionHelper.get_exception_response(
             UserNotAllowedException, "Not allowed"
         ),
+        "503": CustomExceptionHelper.get_exception_response(
+            ServiceUnavailableException, "Server is busy"
+        ),
     },
     dependencies=[Depends(PermissionDependency([IsAuthenticated, IsEmailVerified]))],
 )
@@ -48,47 +56,37 @@ async def search_public(
         request: Request,
         body: SemanticSearchRequest
     ):
-    doc_ids = await DocumentService().get_all_accessible_documents(request.user.id)
-
-    result = ss.run_search(
-        body.query, body.domain, body.advanced_filter, doc_ids
+    access_filter = await ds.get_search_access_filter(request.user.id)
+
+    result, next_cursor = await ss.run_search(
+        body.query,
+        body.domain,
+        body.advanced_filter,
+        access_filter,
+        page_size=body.page_size,
+        cursor=body.cursor,
     )
-    retrieved_doc_ids = [doc.get("id") for doc in result]
-    
-    result_list = []
+    highlights = await inference_executor.run(PreprocessUtil().preprocess, body.query)
 
-    if (retrieved_doc_ids):
-        for i in range(len(retrieved_doc_ids)):
-            doc_detail = await DocumentService().get_document_by_ids(
-                [retrieved_doc_ids[i]]
-            )
-            domain = ss.get_document_category(doc_detail[0])
-            result_list.append(
-                DocumentDetails(
-                    details=doc_detail[0].__dict__,
-                    preview=f"...{result[i].get('text')}...",
-                    highlights=PreprocessUtil().preprocess(body.query),
-                    domain=domain,
-                )
-            )
-
-
-    return SemanticSearchResponseSchema(
-        num_docs_retrieved=len(retrieved_doc_ids),
-        result=result_list,
-    )
+    return await ss.build_search_response(result, highlights, next_cursor)
 
 @search_router.post(
     "/public/file",
     description="Fetch similar documents based on uploaded document",
     response_model=SemanticSearchResponseSchema,
     responses={
+        "400": CustomExceptionHelper.get_exception_response(
+            InvalidSearchCursorException, "Invalid or expired search cursor"
+        ),
         "403": CustomExceptionHelper.get_exception_response(
             UserNotAllowedException, "Not allowed"
         ),
         "404": CustomExceptionHelper.get_exception_response(
             RepositoryNotFoundException, "Repository not found"
         ),
+        "503": CustomExceptionHelper.get_exception_response(
+            ServiceUnavailableException, "Server is busy"
+        ),
     },
     dependencies=[Depends(PermissionDependency([IsAuthenticated, IsEmailVerified]))],
 )
@@ -96,32 +94,12 @@ async def upload_document(
         request: Request,
         path: PublicFileSearchPathParams = Depends(),
         file: UploadFile = File(...)):
-    doc_ids = await DocumentService().get_all_accessible_documents(request.user.id)
-
-    result = ss.run_file_search(file, path.domain, doc_ids)
-    retrieved_doc_ids = [doc.get("id") for doc in result]
-    
-    result_list = []
+    access_filter = await ds.get_search_access_filter(request.user.id)
 
-    if (retrieved_doc_ids):
-        for i in range(len(retrieved_doc_ids)):
-            doc_detail = await DocumentService().get_document_by_ids(
-                [retrieved_doc_ids[i]]
-            )
-            domain = ss.get_document_category(doc_detail[0])
-            result_list.append(
-                DocumentDetails(
-                    details=doc_detail[0].__dict__,
-                    preview=f"...{result[i].get('text')}...",
-                    highlights=[],
-                    domain=domain,
-                )
-            )
-
-    return SemanticSearchResponseSchema(
-        num_docs_retrieved=len(retrieved_doc_ids),
-        result=result_list,
+    result, next_cursor = await ss.run_file_search(
+        file, path.domain, access_filter, page_size=path.page_size, cursor=path.cursor
     )
+    return await ss.build_search_response(result, [], next_cursor)
 
 
 @search_router.post(
@@ -129,12 +107,18 @@ async def upload_document(
     description="Fetches relevant public documents",
     response_model=SemanticSearchResponseSchema,
     responses={
+        "400": CustomExceptionHelper.get_exception_response(
+            InvalidSearchCursorException, "Invalid or expired search cursor"
+        ),
         "403": CustomExceptionHelper.get_exception_response(
             UserNotAllowedException, "Not allowed"
         ),
         "404": CustomExceptionHelper.get_exception_response(
             RepositoryNotFoundException, "Repository not found"
         ),
+        "503": CustomExceptionHelper.get_exception_response(
+            ServiceUnavailableException, "Server is busy"
+        ),
     },
     dependencies=[Depends(PermissionDependency([IsAuthenticated, IsEmailVerified]))],
 )
@@ -142,45 +126,36 @@ async def search_repo(
         body: SemanticSearchRequest,
         path: RepoSearchPathParams = Depends()
     ):
-    doc_ids = await DocumentService().get_repo_accessible_documents(path.repository_id)
-    result = ss.run_search(
-        body.query, body.domain, body.advanced_filter, doc_ids
+    access_filter = await ds.get_repo_search_access_filter(path.repository_id)
+    result, next_cursor = await ss.run_search(
+        body.query,
+        body.domain,
+        body.advanced_filter,
+        access_filter,
+        page_size=body.page_size,
+        cursor=body.cursor,
     )
-    retrieved_doc_ids = [doc.get("id") for doc in result]
-    
-    result_list = []
-
-    if (retrieved_doc_ids):
-        for i in range(len(retrieved_doc_ids)):
-            doc_detail = await DocumentService().get_document_by_ids(
-                [retrieved_doc_ids[i]]
-            )
-            domain = ss.get_document_category(doc_detail[0])
-            result_list.append(
-                DocumentDetails(
-                    details=doc_detail[0].__dict__,
-                    preview=f"...{result[i].get('text')}...",
-                    highlights=PreprocessUtil().preprocess(body.query),
-                    domain=domain,
-                )
-            )
+    highlights = await inference_executor.run(PreprocessUtil().preprocess, body.query)
 
-    return SemanticSearchResponseSchema(
-        num_docs_retrieved=len(retrieved_doc_ids),
-        result=result_list,
-    )
+    return await ss.build_search_response(result, highlights, next_cursor)
 
 @search_router.post(
     "/repository/{repository_id}/file",
     description="Fetch similar documents based on uploaded document",
     response_model=SemanticSearchResponseSchema,
     responses={
+        "400": CustomExceptionHelper.get_exception_response(
+            InvalidSearchCursorException, "Invalid or expired search cursor"
+        ),
         "403": CustomExceptionHelper.get_exception_response(
             UserNotAllowedException, "Not allowed"
         ),
         "404": CustomExceptionHelper.get_exception_response(
             RepositoryNotFoundException, "Repository not found"
         ),
+        "503": CustomExceptionHelper.get_exception_response(
+            ServiceUnavailableException, "Server is busy"
+        ),
     },
     dependencies=[Depends(PermissionDependency([IsAuthenticated, IsEmailVerified]))],
 )
@@ -188,29 +163,9 @@ async def upload_document(
         request: Request,
         path: FileSearchPathParams = Depends(),
         file: UploadFile = File(...)):
-    doc_ids = await DocumentService().get_repo_accessible_documents(path.repository_id)
-
-    result = ss.run_file_search(file, path.domain, doc_ids)
-    retrieved_doc_ids = [doc.get("id") for doc in result]
-    
-    result_list = []
-    
-    if (retrieved_doc_ids):
-        for i in range(len(retrieved_doc_ids)):
-            doc_detail = await DocumentService().get_document_by_ids(
-                [retrieved_doc_ids[i]]
-            )
-            domain = ss.get_document_category(doc_detail[0])
-            result_list.append(
-                DocumentDetails(
-                    details=doc_detail[0].__dict__,
-                    preview=f"...{result[i].get('text')}...",
-                    highlights=[],
-                    domain=domain,
-                )
-            )
+    access_filter = await ds.get_repo_search_access_filter(path.repository_id)
 
-    return SemanticSearchResponseSchema(
-        num_docs_retrieved=len(retrieved_doc_ids),
-        result=result_list,
+    result, next_cursor = await ss.run_file_search(
+        file, path.domain, access_filter, page_size=path.page_size, cursor=path.cursor
     )
+    return await ss.build_search_response(result, [], next_cursor)
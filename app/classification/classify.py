@@ -17,13 +17,23 @@ class Classifier:
     Classifier is a class that provides several static methods to classify text using SVM.
     """
 
-    labelencode: LabelEncoder = pickle.load(
-        open(os.path.join(path, labelencode_name), "rb")
-    )
-    tfidf_vect: TfidfVectorizer = pickle.load(
-        open(os.path.join(path, tfidf_vect_name), "rb")
-    )
-    svm: SVC = pickle.load(open(os.path.join(path, svm_name), "rb"))
+    labelencode: LabelEncoder = None
+    tfidf_vect: TfidfVectorizer = None
+    svm: SVC = None
+
+    @classmethod
+    def load(cls) -> None:
+        """
+        Load the fitted label encoder, TF-IDF vectorizer and SVM model if not loaded yet.
+        """
+        if cls.svm is not None:
+            return
+        with open(os.path.join(path, labelencode_name), "rb") as f:
+            cls.labelencode = pickle.load(f)
+        with open(os.path.join(path, tfidf_vect_name), "rb") as f:
+            cls.tfidf_vect = pickle.load(f)
+        with open(os.path.join(path, svm_name), "rb") as f:
+            cls.svm = pickle.load(f)
 
     @classmethod
     def classify(cls, texts: List[str]) -> str:
@@ -34,6 +44,7 @@ class Classifier:
         [Returns]
             str: Label of the text.
         """
+        cls.load()
         texts = str(texts)
         texts_vectorized = cls.tfidf_vect.transform([texts])
         prediction = cls.svm.predict(texts_vectorized)
@@ -0,0 +1,227 @@
+from typing import Awaitable, Callable, Iterable, List, Optional
+
+from redis.exceptions import RedisError
+
+from core.config import config
+from core.db import run_after_transaction
+from core.helpers.redis import redis
+from core.repository import DocumentRepo, RepositoryRepo
+
+# Replaces a set with members loaded from the database, unless the set was invalidated since the
+# loader started: KEYS[1] is the set, KEYS[2] its generation, ARGV[1] the generation read before
+# loading, ARGV[2] the TTL and the rest the members. Members are added in batches to stay below
+# the Lua stack limit. unpack is global in the Lua 5.1 of Redis and table.unpack in newer Lua.
+REPLACE_IF_CURRENT = """
+local unpack = unpack or table.unpack
+if (redis.call("GET", KEYS[2]) or "0") ~= ARGV[1] then
+    return 0
+end
+redis.call("DEL", KEYS[1])
+for i = 3, #ARGV, 5000 do
+    redis.call("SADD", KEYS[1], unpack(ARGV, i, math.min(i + 4999, #ARGV)))
+end
+redis.call("EXPIRE", KEYS[1], ARGV[2])
+return 1
+"""
+
+# Sets always hold this member so an empty set can be told apart from a missing key, document and
+# repository ids start from 1.
+PLACEHOLDER = 0
+
+
+class AccessibleDocumentService:
+    """
+    AccessibleDocumentService caches the ids of the documents every user can access in Redis. A
+    document is accessible when it is public, when it is in a repository the user is a member of,
+    or when the user is one of its collaborators, so the cache is made of sets that change
+    independently: public documents, documents of every repository, repositories of every user,
+    and documents every user collaborates on. The accessible set of a user is the union of them.
+
+    Sets are only ever loaded from the database. Code paths changing permissions delete the sets
+    they affect once their transaction ends, so the next read reloads them from committed state.
+    Every set has a generation counter bumped with the deletion, a load that started before the
+    deletion does not store what it read. Sets expire after ACCESSIBLE_DOCUMENT_CACHE_TTL seconds,
+    which bounds how long a lost invalidation stays visible. When Redis fails the accessible
+    documents are read from the database.
+    """
+
+    key_prefix = "accessible"
+    document_repo = DocumentRepo()
+    repository_repo = RepositoryRepo()
+
+    def __init__(self):
+        self.replace_if_current = redis.register_script(REPLACE_IF_CURRENT)
+
+    @property
+    def enabled(self) -> bool:
+        return config.ACCESSIBLE_DOCUMENT_CACHE_TTL > 0
+
+    def public_key(self) -> str:
+        return f"{self.key_prefix}::public"
+
+    def repository_key(self, repository_id: int) -> str:
+        return f"{self.key_prefix}::repository::{repository_id}"
+
+    def user_repositories_key(self, user_id: int) -> str:
+        return f"{self.key_prefix}::user::{user_id}::repositories"
+
+    def user_documents_key(self, user_id: int) -> str:
+        return f"{self.key_prefix}::user::{user_id}::documents"
+
+    def generation_key(self, key: str) -> str:
+        return f"{key}::generation"
+
+    async def load(self, key: str, loader: Callable[[], Awaitable[List[int]]]) -> None:
+        """
+        Load a set from the database unless it is cached. The set is not stored when it is
+        invalidated while loading.
+        [Parameters]
+            key: str -> Key of the set.
+            loader: Callable[[], Awaitable[List[int]]] -> Reads the members from the database.
+        """
+        if await redis.exists(key):
+            return
+        # The generation is read before the database so a concurrent invalidation is detected.
+        generation = await redis.get(self.generation_key(key))
+        members = await loader()
+        await self.replace_if_current(
+            keys=[key, self.generation_key(key)],
+            args=[generation or 0, config.ACCESSIBLE_DOCUMENT_CACHE_TTL, PLACEHOLDER, *members],
+        )
+
+    async def members(self, *keys: str) -> Optional[List[int]]:
+        """
+        Get the union of cached sets.
+        [Parameters]
+            keys: str -> Keys of the sets.
+        [Returns]
+            Optional[List[int]] -> Members of the sets, None when one of them is not cached.
+        """
+        async with redis.pipeline(transaction=True) as pipe:
+            pipe.exists(*keys)
+            pipe.sunion(list(keys))
+            exists, members = await pipe.execute()
+        if exists != len(keys):
+            return None
+        return sorted(int(member) for member in members if int(member) != PLACEHOLDER)
+
+    async def get_user_document_ids(self, user_id: int) -> List[int]:
+        """
+        Get the ids of the documents a user can access.
+        [Parameters]
+            user_id: int -> User id.
+        [Returns]
+            List[int] -> Document ids.
+        """
+        if not self.enabled:
+            return await self.document_repo.get_all_accessible_documents(user_id)
+        try:
+            await self.load(
+                self.user_repositories_key(user_id),
+                lambda: self.repository_repo.get_user_repository_ids(user_id),
+            )
+            repository_ids = await self.members(self.user_repositories_key(user_id))
+
+            document_ids = None
+            if repository_ids is not None:
+                await self.load(self.public_key(), self.document_repo.get_public_document_ids)
+                await self.load(
+                    self.user_documents_key(user_id),
+                    lambda: self.document_repo.get_document_ids_by_collaborator_id(user_id),
+                )
+                keys = [self.public_key(), self.user_documents_key(user_id)]
+                for repository_id in repository_ids:
+                    await self.load(
+                        self.repository_key(repository_id),
+                        lambda: self.document_repo.get_document_ids_by_repository_id(
+                            repository_id
+                        ),
+                    )
+                    keys.append(self.repository_key(repository_id))
+                document_ids = await self.members(*keys)
+        except RedisError as e:
+            print("[ACCESSIBLE DOCUMENT CACHE] read failed: {}".format(e))
+            document_ids = None
+        if document_ids is None:
+            # Sets invalidated while being read are not waited for.
+            return await self.document_repo.get_all_accessible_documents(user_id)
+        return document_ids
+
+    async def invalidate(self, *keys: str) -> None:
+        """
+        Delete sets once the current transaction ends, failures are logged since the sets expire
+        anyway.
+        [Parameters]
+            keys: str -> Keys of the sets.
+        """
+        if not self.enabled or not keys:
+            return
+
+        async def delete() -> None:
+            try:
+                async with redis.pipeline(transaction=True) as pipe:
+                    for key in keys:
+                        pipe.incr(self.generation_key(key))
+                    pipe.delete(*keys)
+                    await pipe.execute()
+            except RedisError as e:
+                print("[ACCESSIBLE DOCUMENT CACHE] invalidation failed: {}".format(e))
+
+        await run_after_transaction(delete)
+
+    async def document_created(
+        self, document_id: int, repository_id: int, is_public: bool
+    ) -> None:
+        await self.invalidate(
+            self.repository_key(repository_id), *([self.public_key()] if is_public else [])
+        )
+
+    async def document_deleted(
+        self, document_id: int, repository_id: int, collaborator_ids: Iterable[int]
+    ) -> None:
+        await self.invalidate(
+            self.public_key(),
+            self.repository_key(repository_id),
+            *[self.user_documents_key(user_id) for user_id in collaborator_ids],
+        )
+
+    async def visibility_changed(self, document_id: int, is_public: bool) -> None:
+        await self.invalidate(self.public_key())
+
+    async def collaborators_added(
+        self, document_id: int, user_ids: Iterable[int]
+    ) -> None:
+        await self.invalidate(*[self.user_documents_key(user_id) for user_id in user_ids])
+
+    async def collaborators_removed(
+        self, document_id: int, user_ids: Iterable[int]
+    ) -> None:
+        await self.invalidate(*[self.user_documents_key(user_id) for user_id in user_ids])
+
+    async def repository_member_added(self, repository_id: int, user_id: int) -> None:
+        await self.invalidate(self.user_repositories_key(user_id))
+
+    async def repository_member_removed(self, repository_id: int, user_id: int) -> None:
+        # The collaborations of the user on the repository documents are removed as well.
+        await self.invalidate(
+            self.user_repositories_key(user_id), self.user_documents_key(user_id)
+        )
+
+    async def repository_deleted(
+        self, repository_id: int, document_ids: Iterable[int], user_ids: Iterable[int]
+    ) -> None:
+        await self.invalidate(
+            self.public_key(),
+            self.repository_key(repository_id),
+            *[
+                key
+                for user_id in user_ids
+                for key in (
+                    self.user_repositories_key(user_id),
+                    self.user_documents_key(user_id),
+                )
+            ],
+        )
+
+    async def user_repositories_changed(self, user_id: int) -> None:
+        await self.invalidate(self.user_repositories_key(user_id))
@@ -1,4 +1,4 @@
-from typing import List, Literal, Optional
+from typing import Dict, List, Literal, Optional
 
 from fastapi import UploadFile
 
@@ -6,14 +6,17 @@ from app.classification import map_string_to_enum_label
 from app.document.enums import DocumentRole, IndexingStatusEnum
 from app.document.models import Document, DocumentIndex
 from app.document.schemas import DocumentCollaboratorSchema, DocumentSchema
+from app.document.services.accessible_document import AccessibleDocumentService
 from app.elastic import EsClient
 from app.elastic.configuration import GENERAL_ELASTICSEARCH_INDEX_NAME
 from app.repository.enums import RepositoryRole
-from core.db import Transactional, standalone_session
+from core.config import config
+from core.db import Transactional, run_after_transaction, standalone_session
 from core.exceptions import (
     DocumentCollaboratorAlreadyExistException,
     DocumentCollaboratorNotFoundException,
     DocumentNotFoundException,
+    FailedDependencyException,
     InvalidDocumentRoleException,
     InvalidRepositoryRoleException,
     NotFoundException,
@@ -41,6 +44,7 @@ class DocumentService:
     document_repo = DocumentRepo()
     document_index_repo = DocumentIndexRepo()
     user_repo = UserRepo()
+    accessible_document_service = AccessibleDocumentService()
 
     def __init__(self):
         ...
@@ -141,6 +145,18 @@ class DocumentService:
             raise NotFoundException("Document with specified ids not found")
         return data
 
+    async def get_ranked_documents(self, ids: List[int]) -> List[Document]:
+        """
+        Get documents with a single query, ordered like the given ids.
+        [Parameters]
+            ids: List[int] -> Document ids, e.g. ordered by search rank.
+        [Returns]
+            List[Document] -> Documents, ids not found in the database are skipped.
+        """
+        documents = await self.document_repo.get_by_ids(ids=ids)
+        documents_by_id = {document.id: document for document in documents}
+        return [documents_by_id[id] for id in ids if id in documents_by_id]
+
     async def check_user_have_access_to_repo(
         self,
         user_id: int,
@@ -279,6 +295,37 @@ class DocumentService:
         )
         return await self.get_document_by_id(id)
 
+    @standalone_session
+    @Transactional()
+    async def finish_indexing_celery(
+        self,
+        id: int,
+        task_id: str,
+        params: dict,
+    ) -> bool:
+        """
+        Save the elasticsearch related metadata of an indexed document and mark it as indexed in
+        a single transaction, only while the document is still indexed by the given task.
+        [Parameters]
+            id: int -> Document id.
+            task_id: str -> Id of the task that indexed the document.
+            params: dict -> Document parameters.
+        [Returns]
+            bool -> False if the document was reindexed meanwhile, nothing is saved then.
+        """
+        if not await self.document_index_repo.update_by_doc_id(
+            doc_id=id,
+            params={
+                "status": IndexingStatusEnum.SUCCESS,
+                "reason": None,
+                "current_task_id": None,
+            },
+            task_id=task_id,
+        ):
+            return False
+        await self.document_repo.update_by_id(id=id, params=params)
+        return True
+
     @Transactional()
     async def delete_document(self, id: int) -> bool:
         """
@@ -289,6 +336,7 @@ class DocumentService:
             bool -> True if successful.
         """
         document = await self.get_document_by_id(id)
+        access = await self.get_document_access([id])
 
         if document.general_elastic_doc_id:
             EsClient.safe_delete_doc(
@@ -303,6 +351,11 @@ class DocumentService:
 
         await self.document_repo.delete(document)
         await self.document_index_repo.delete(document.index)
+        await self.accessible_document_service.document_deleted(
+            document_id=id,
+            repository_id=document.repository_id,
+            collaborator_ids=access[id]["collaborator_ids"] if id in access else [],
+        )
 
     async def check_user_owner_or_admin_repo(
         self,
@@ -362,21 +415,28 @@ class DocumentService:
         document: Document,
         document_label: str = None,
         document_title: str = None,
-    ):
+        start_pipeline: bool = True,
+    ) -> dict:
         """
         Logic for reindexing a document.
         [Parameters]
             document: Document -> Document to be reindexed.
             document_label: str = None -> Document label.
+            start_pipeline: bool = True -> Whether to start the indexing task, set to False when
+                the caller indexes several documents in bulk.
+        [Returns]
+            dict -> Arguments of the indexing pipeline of the document.
         """
         # Fuck partial dependency.
-        from celery_app import celery, parsing
+        from celery_app import celery, is_bulk_document_task_id, start_document_pipeline
 
         index: DocumentIndex = document.index
 
-        # Revoke the task if indexing is still in progress.
+        # Revoke the task if indexing is still in progress. A bulk task also indexes other
+        # documents, it only drops this one once the task id below is cleared.
         if index.status != IndexingStatusEnum.SUCCESS and index.current_task_id:
-            celery.control.revoke(index.current_task_id, terminate=True)
+            if not is_bulk_document_task_id(index.current_task_id):
+                celery.control.revoke(index.current_task_id, terminate=True)
             await self.document_index_repo.update_by_doc_id(
                 doc_id=document.id,
                 params={
@@ -422,13 +482,16 @@ class DocumentService:
         )
 
         # Re-index the document.
-        parsing.delay(
-            document_id=document.id,
-            document_title=document_title or document.title,
-            document_url=document.file_url,
-            document_label=document_label,
-            document_title_fixed=(document_title is not None),
-        )
+        pipeline = {
+            "document_id": document.id,
+            "document_title": document_title or document.title,
+            "document_url": document.file_url,
+            "document_label": document_label,
+            "document_title_fixed": (document_title is not None),
+        }
+        if start_pipeline:
+            start_document_pipeline(**pipeline)
+        return pipeline
 
     async def reindex_by_id(self, doc_id: int, user_id: int) -> None:
         """
@@ -552,14 +615,17 @@ class DocumentService:
         repository_id: int,
         file: UploadFile,
         uploaded_by: int,
+        start_pipeline: bool = True,
     ) -> Document:
         """
         Upload document and create task to index it.
         [Parameters]
             repository_id: int -> Id of the corresponding repository.
             file: UploadFile -> File to be uploaded.
+            start_pipeline: bool = True -> Whether to start the indexing task, set to False when
+                the caller indexes several documents in bulk.
         """
-        from celery_app import parsing
+        from celery_app import start_document_pipeline
 
         document: Document = None
 
@@ -576,13 +642,19 @@ class DocumentService:
                 uploaded_by=uploaded_by,
             )
             document = await self.get_document_by_id(id=doc_id, include_index=True)
-
-            parsing.delay(
+            await self.accessible_document_service.document_created(
                 document_id=document.id,
-                document_title=title,
-                document_url=uploaded_file_url,
+                repository_id=repository_id,
+                is_public=bool(document.is_public),
             )
 
+            if start_pipeline:
+                start_document_pipeline(
+                    document_id=document.id,
+                    document_title=title,
+                    document_url=uploaded_file_url,
+                )
+
             return document
 
         except Exception as e:
@@ -642,10 +714,12 @@ class DocumentService:
             repository_id=repository_id,
         )
 
+        from celery_app import start_bulk_document_pipeline
+
         documents_response = []
         for file in files:
             processed_document = await self.process_upload_document(
-                repository_id, file, user_id
+                repository_id, file, user_id, start_pipeline=False
             )
             documents_response.append(processed_document)
 
@@ -653,6 +727,17 @@ class DocumentService:
                 user_id=user_id, document_id=processed_document.id
             )
 
+        # Index the uploaded documents in bulk.
+        start_bulk_document_pipeline(
+            [
+                {
+                    "document_id": document.id,
+                    "document_title": document.title,
+                    "document_url": document.file_url,
+                }
+                for document in documents_response
+            ]
+        )
         return documents_response
 
     async def get_repository_documents(
@@ -772,8 +857,12 @@ class DocumentService:
                     document=document,
                     document_title=name,
                 )
+        previous_collaborator_ids = []
         if is_public is not None:
             if document.is_public != is_public:
+                previous_collaborator_ids = (
+                    await self.get_document_access([document_id])
+                )[document_id]["collaborator_ids"]
                 # Make all document visible to all collaborators that does not have read access
                 # to the document.
                 if is_public:
@@ -803,6 +892,20 @@ class DocumentService:
                 params["is_public"] = is_public
 
         await self.document_repo.update_by_id(document_id, params)
+        if "is_public" in params:
+            await self.sync_document_access_after_transaction([document_id])
+            collaborator_ids = (await self.get_document_access([document_id]))[
+                document_id
+            ]["collaborator_ids"]
+            await self.accessible_document_service.visibility_changed(
+                document_id, params["is_public"]
+            )
+            await self.accessible_document_service.collaborators_added(
+                document_id, set(collaborator_ids) - set(previous_collaborator_ids)
+            )
+            await self.accessible_document_service.collaborators_removed(
+                document_id, set(previous_collaborator_ids) - set(collaborator_ids)
+            )
 
     async def get_document_collaborators(
         self, user_id: int, document_id: int
@@ -922,6 +1025,10 @@ class DocumentService:
         await self.document_repo.add_collaborator(
             document_id, collaborator_id, role.name.title()
         )
+        await self.sync_document_access_after_transaction([document_id])
+        await self.accessible_document_service.collaborators_added(
+            document_id, [collaborator_id]
+        )
 
     async def add_document_collaborators_after_upload(
         self,
@@ -971,6 +1078,9 @@ class DocumentService:
                     collaborator_id=collaborator.id,
                     role=doc_role,
                 )
+        await self.accessible_document_service.collaborators_added(
+            document_id, [user_id] + [collaborator.id for collaborator in collabolators]
+        )
 
     async def edit_document_collaborator(
         self,
@@ -1045,6 +1155,10 @@ class DocumentService:
             await self.document_repo.add_collaborator(
                 document_id, collaborator_id, role.name.title()
             )
+            await self.sync_document_access_after_transaction([document_id])
+            await self.accessible_document_service.collaborators_added(
+                document_id, [collaborator_id]
+            )
 
             return
 
@@ -1107,6 +1221,10 @@ class DocumentService:
             raise DocumentCollaboratorNotFoundException
 
         await self.document_repo.delete_collaborator(document_id, collaborator_id)
+        await self.sync_document_access_after_transaction([document_id])
+        await self.accessible_document_service.collaborators_removed(
+            document_id, [collaborator_id]
+        )
 
     async def get_all_accessible_documents(self, user_id: int) -> List[int]:
         """
@@ -1116,9 +1234,7 @@ class DocumentService:
         [Returns]
             List[int] -> List[int].
         """
-        data = await self.document_repo.get_all_accessible_documents(
-            collaborator_id=user_id
-        )
+        data = await self.accessible_document_service.get_user_document_ids(user_id)
         if not data:
             raise NotFoundException("No accessible documents found")
         return data
@@ -1137,3 +1253,143 @@ class DocumentService:
         if not data:
             raise NotFoundException("No accessible documents found")
         return data
+
+    async def get_search_access_filter(self, user_id: int) -> dict:
+        """
+        Get the Elasticsearch filter of the documents a user can search.
+        [Parameters]
+            user_id: int -> User id.
+        [Returns]
+            dict -> Filter clause.
+        """
+        if not config.ELASTICSEARCH_ACCESS_FILTER:
+            document_ids = await self.get_all_accessible_documents(user_id)
+            return {"terms": {"document_id": document_ids}}
+        repository_ids = await self.repository_repo.get_user_repository_ids(user_id)
+        return EsClient.access_filter(user_id, repository_ids)
+
+    async def get_repo_search_access_filter(self, repository_id: int) -> dict:
+        """
+        Get the Elasticsearch filter of the documents within a specific repository.
+        [Parameters]
+            repository_id: int -> Repository id.
+        [Returns]
+            dict -> Filter clause.
+        """
+        if not config.ELASTICSEARCH_ACCESS_FILTER:
+            document_ids = await self.get_repo_accessible_documents(repository_id)
+            return {"terms": {"document_id": document_ids}}
+        return {"term": {"repository_id": repository_id}}
+
+    async def get_document_access(self, document_ids: List[int]) -> Dict[int, dict]:
+        """
+        Get the access fields indexed with the Elasticsearch documents of documents.
+        [Parameters]
+            document_ids: List[int] -> Document ids.
+        [Returns]
+            Dict[int, dict] -> Repository id, visibility, and collaborator ids by document id.
+        """
+        rows = await self.document_repo.get_document_access(document_ids)
+        return {
+            row.id: {
+                "repository_id": row.repository_id,
+                "is_public": bool(row.is_public),
+                "collaborator_ids": list(row.collaborator_ids),
+            }
+            for row in rows
+        }
+
+    @standalone_session
+    async def get_document_access_celery(
+        self, document_ids: List[int]
+    ) -> Dict[int, dict]:
+        """
+        Get the access fields of documents, used by celery tasks.
+        [Parameters]
+            document_ids: List[int] -> Document ids.
+        [Returns]
+            Dict[int, dict] -> Repository id, visibility, and collaborator ids by document id.
+        """
+        return await self.get_document_access(document_ids)
+
+    async def sync_document_access(self, document_ids: List[int]) -> None:
+        """
+        Update the access fields of the Elasticsearch documents of documents after their
+        permissions changed. Documents not indexed yet get their access fields when indexed.
+        [Parameters]
+            document_ids: List[int] -> Document ids.
+        """
+        if not document_ids:
+            return
+        documents = await self.document_repo.get_by_ids(document_ids)
+        access = await self.get_document_access(document_ids)
+
+        actions = []
+        for document in documents:
+            elastic_docs = []
+            if document.general_elastic_doc_id:
+                elastic_docs.append(
+                    (GENERAL_ELASTICSEARCH_INDEX_NAME, document.general_elastic_doc_id)
+                )
+            if document.elastic_doc_id and document.elastic_index_name:
+                elastic_docs.append((document.elastic_index_name, document.elastic_doc_id))
+            for index_name, doc_id in elastic_docs:
+                actions.append(
+                    {
+                        "_op_type": "update",
+                        "_index": index_name,
+                        "_id": doc_id,
+                        "doc": access[document.id],
+                    }
+                )
+
+        errors = []
+        for ok, item in EsClient.bulk_index_docs(actions):
+            result = item.get("update", {})
+            # Documents removed from Elasticsearch concurrently are skipped.
+            if not ok and result.get("status") != 404:
+                errors.append(str(result.get("error", result)))
+        if errors:
+            raise FailedDependencyException(
+                "Failed to update document access in Elasticsearch: {}".format(
+                    "; ".join(errors)
+                )
+            )
+
+    async def sync_document_access_after_transaction(self, document_ids: List[int]) -> None:
+        """
+        Update the access fields of the Elasticsearch documents of documents once the current
+        transaction ends, so Elasticsearch never holds permissions that are rolled back. The
+        committed permissions are read then, failures are logged since they are fixed by the
+        next sync of the documents or by sync_all_document_access.
+        [Parameters]
+            document_ids: List[int] -> Document ids.
+        """
+        if not document_ids:
+            return
+
+        async def sync() -> None:
+            try:
+                await self.sync_document_access(document_ids)
+            except Exception as e:
+                print(
+                    "[ACCESS SYNC] sync of documents {} failed: {}".format(document_ids, e)
+                )
+
+        await run_after_transaction(sync)
+
+    @standalone_session
+    async def sync_all_document_access(self) -> None:
+        """
+        Update the access fields of the Elasticsearch documents of every document, used to
+        backfill documents indexed before the access fields existed.
+        """
+        document_ids = [document.id for document in await self.document_repo.get_all()]
+        batch_size = config.ELASTICSEARCH_BULK_CHUNK_SIZE
+        for i in range(0, len(document_ids), batch_size):
+            await self.sync_document_access(document_ids[i : i + batch_size])
+            print(
+                "[ACCESS SYNC] {}/{} documents".format(
+                    min(i + batch_size, len(document_ids)), len(document_ids)
+                )
+            )
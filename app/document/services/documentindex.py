@@ -1,3 +1,5 @@
+from typing import Optional
+
 from app.document.enums.document import IndexingStatusEnum
 from app.document.models import DocumentIndex
 from core.db import Transactional, standalone_session
@@ -61,15 +63,41 @@ class DocumentIndexService:
         self,
         doc_id: int,
         params: dict,
-    ) -> DocumentIndex:
+        task_id: str = None,
+    ) -> Optional[DocumentIndex]:
         """
         Update the indexing status of a document.
         [Parameters]
             doc_id: int -> Document id.
             params: dict -> Parameters to update.
+            task_id: str -> Only update the status while the document is indexed by this task,
+                e.g. it is not updated anymore once the document was reindexed.
+        [Returns]
+            Optional[DocumentIndex] -> Updated indexing status, None if the document is indexed
+                by another task.
         """
-        await self.document_index_repo.update_by_doc_id(
+        if not await self.document_index_repo.update_by_doc_id(
             doc_id=doc_id,
             params=params,
-        )
+            task_id=task_id,
+        ):
+            return None
         return await self.get_by_doc_id(doc_id)
+
+    @standalone_session
+    @Transactional()
+    async def claim_indexing_celery(
+        self,
+        doc_id: int,
+        params: dict,
+    ) -> bool:
+        """
+        Update the indexing status of a document only if no task started indexing it since it
+        was queued.
+        [Parameters]
+            doc_id: int -> Document id.
+            params: dict -> Parameters to update, with the id of the claiming task.
+        [Returns]
+            bool -> Whether the document was claimed.
+        """
+        return await self.document_index_repo.claim_by_doc_id(doc_id=doc_id, params=params)
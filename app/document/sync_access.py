@@ -0,0 +1,7 @@
+import asyncio
+
+from app.document.services import document_service
+
+if __name__ == "__main__":
+    # Backfill the access fields of documents indexed before they were stored in Elasticsearch.
+    asyncio.run(document_service.sync_all_document_access())
@@ -1,3 +1,4 @@
+from app.elastic.async_client import AsyncElasticsearchClient
 from app.elastic.client import ElasticsearchClient
 from app.elastic.configuration import (
     GENERAL_ELASTICSEARCH_INDEX_MAPPINGS,
@@ -12,6 +13,7 @@ from app.elastic.configuration import (
 )
 
 EsClient = ElasticsearchClient()
+AsyncEsClient = AsyncElasticsearchClient()
 
 __all__ = [
     "GENERAL_ELASTICSEARCH_INDEX_NAME",
@@ -0,0 +1,168 @@
+from typing import TYPE_CHECKING, Any, List, Mapping, Optional
+
+from elasticsearch import AsyncElasticsearch
+from elasticsearch.exceptions import ApiError
+
+from app.elastic.client import ElasticsearchClient
+from app.elastic.helpers import classify_error
+from core.config import config
+from core.exceptions.base import CustomException, FailedDependencyException
+from core.helpers.executor import inference_executor
+
+if TYPE_CHECKING:
+    from app.search.services.text_encoding import TextEncodingService
+
+
+class AsyncElasticsearchClient:
+    """
+    AsyncElasticsearchClient is the asyncio counterpart of ElasticsearchClient, used by the API so
+    Elasticsearch requests do not block the event loop. The AsyncElasticsearch client is created
+    on first use, inside the running event loop, and shared afterwards.
+
+    [Attributes]
+      client: AsyncElasticsearch -> AsyncElasticsearch client instance.
+    """
+
+    def __init__(self) -> None:
+        """
+        Constructor of AsyncElasticsearchClient class.
+        """
+        self._client: AsyncElasticsearch = None
+
+    @property
+    def client(self) -> AsyncElasticsearch:
+        if self._client is None:
+            options = dict(ElasticsearchClient.client_options())
+            # The keep-alive node is urllib3 based, the async client uses its aiohttp node.
+            options.pop("node_class", None)
+            self._client = AsyncElasticsearch(**options)
+        return self._client
+
+    async def close(self) -> None:
+        """
+        Close the pooled connections of the client.
+        """
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
+
+    async def open_point_in_time(self, index: str) -> str:
+        """
+        Open a point in time of an index, so the pages of a search see the same documents.
+        [Parameters]
+          index: str -> Name of the index.
+        [Returns]
+          str: Point in time id.
+        """
+        try:
+            response = await self.client.open_point_in_time(
+                index=index, keep_alive=config.ELASTICSEARCH_PIT_KEEP_ALIVE
+            )
+            return response["id"]
+        except ApiError as e:
+            raise classify_error(e)
+        except Exception as e:
+            raise FailedDependencyException(e)
+
+    async def close_point_in_time(self, pit_id: str) -> None:
+        """
+        Close a point in time, failures are ignored since it expires anyway.
+        [Parameters]
+          pit_id: str -> Point in time id.
+        """
+        try:
+            await self.client.close_point_in_time(id=pit_id)
+        except Exception as e:
+            print("[ELASTICSEARCH] Failed to close point in time: {}".format(e))
+
+    async def search_semantic(
+        self,
+        query: str,
+        index: str,
+        size: int,
+        source: List[str],
+        emb_vector: str,
+        access_filter: Mapping[str, Any],
+        fields: List[str] = None,
+        model: "TextEncodingService" = None,
+        chunk_path: Optional[str] = None,
+        mode: Optional[str] = None,
+        pit_id: Optional[str] = None,
+        search_after: Optional[List[Any]] = None,
+        aggs: Optional[Mapping[str, Any]] = None,
+        highlight: Optional[Mapping[str, Any]] = None,
+    ):
+        """
+        Retrieve documents from an Elasticsearch index based on an input query, the query is
+        encoded on the inference executor.
+        [Parameters]
+          query: str -> User search prompt
+          index_name: str -> Name of index that will be the base of the search
+          chunk_path: Optional[str] -> Path of nested chunk vectors, when given a document is
+            scored by the better of its document vector and its best-matching chunk vector
+          mode: Optional[str] -> Either script_score, knn, or hybrid, defaults to
+            ELASTICSEARCH_SEARCH_MODE
+          pit_id: Optional[str] -> Point in time of the index to be searched instead of the index,
+            hits are then sorted by score and shard document so they can be paginated
+          search_after: Optional[List[Any]] -> Sort values of the last hit of the previous page,
+            only used with a point in time
+          aggs: Optional[Mapping[str, Any]] -> Aggregations computed over every match
+          highlight: Optional[Mapping[str, Any]] -> Highlighting of the hits, see
+            ElasticsearchClient.preview_highlight
+        """
+        try:
+            query_vector = None
+            if query != "":
+                query_vector = (await inference_executor.run(model.encode_batch, [query]))[
+                    0
+                ].tolist()
+            if query != "" and ElasticsearchClient.search_mode(mode) == "hybrid":
+                searches = ElasticsearchClient.hybrid_searches(
+                    index,
+                    query,
+                    emb_vector,
+                    access_filter,
+                    fields,
+                    query_vector,
+                    source,
+                    size,
+                    highlight,
+                )
+                return ElasticsearchClient.fuse_hits(
+                    await self.client.msearch(searches=searches), size
+                )
+            body = ElasticsearchClient.semantic_search_body(
+                query,
+                emb_vector,
+                access_filter,
+                fields,
+                query_vector,
+                chunk_path,
+                mode,
+                size,
+            )
+            if aggs:
+                body["aggs"] = aggs
+            if highlight:
+                body["highlight"] = highlight
+            if pit_id is None:
+                return await self.client.search(
+                    index=index, size=size, body=body, source={"includes": source}
+                )
+            body["pit"] = {"id": pit_id, "keep_alive": config.ELASTICSEARCH_PIT_KEEP_ALIVE}
+            body["sort"] = [
+                {"_score": {"order": "desc"}},
+                {"_shard_doc": {"order": "asc"}},
+            ]
+            if search_after:
+                body["search_after"] = search_after
+            return await self.client.search(
+                size=size, body=body, source={"includes": source}
+            )
+
+        except (TimeoutError, CustomException) as e:
+            raise e
+        except ApiError as e:
+            raise classify_error(e)
+        except Exception as e:
+            raise FailedDependencyException(e)
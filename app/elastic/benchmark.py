@@ -0,0 +1,81 @@
+import argparse
+import statistics
+import time
+from typing import Callable, Dict, List
+
+from elasticsearch import Elasticsearch
+
+from app.elastic.client import ElasticsearchClient
+from app.elastic.configuration import GENERAL_ELASTICSEARCH_INDEX_NAME
+
+BENCHMARK_QUERY = {"match": {"preprocessed_text": "machine learning"}}
+
+
+def measure(
+    get_client: Callable[[], Elasticsearch], index: str, requests: int, close_client: bool
+) -> Dict[str, float]:
+    """
+    Measure the latency of search requests.
+    [Parameters]
+        get_client: Callable[[], Elasticsearch] -> Returns the client used for a request.
+        index: str -> Name of the index to be searched.
+        requests: int -> Number of requests.
+        close_client: bool -> Close the client after every request, for clients built per
+            request, so their connections are not left open.
+    [Returns]
+        Dict[str, float]: p50, p99 and mean latency in milliseconds.
+    """
+    latencies: List[float] = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        client = get_client()
+        try:
+            client.search(index=index, query=BENCHMARK_QUERY, size=10)
+            latencies.append((time.perf_counter() - start) * 1000)
+        finally:
+            if close_client:
+                client.close()
+    percentiles = statistics.quantiles(latencies, n=100)
+    return {
+        "p50": statistics.median(latencies),
+        "p99": percentiles[98],
+        "mean": statistics.mean(latencies),
+    }
+
+
+def run(index: str, requests: int) -> Dict[str, Dict[str, float]]:
+    """
+    Compare a new client per request (the previous behaviour of the search path) with the shared
+    pooled client.
+    [Parameters]
+        index: str -> Name of the index to be searched.
+        requests: int -> Number of requests per mode.
+    [Returns]
+        Dict[str, Dict[str, float]]: Latency of every mode.
+    """
+    # Warm up the shared client so its connections are open.
+    ElasticsearchClient.get_client().info()
+    return {
+        "new client per request": measure(
+            ElasticsearchClient.build_client, index, requests, close_client=True
+        ),
+        "shared pooled client": measure(
+            ElasticsearchClient.get_client, index, requests, close_client=False
+        ),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark Elasticsearch search latency with and without client reuse."
+    )
+    parser.add_argument("--index", default=GENERAL_ELASTICSEARCH_INDEX_NAME)
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+
+    for mode, result in run(args.index, args.requests).items():
+        print(
+            "{:<24} p50: {:8.2f} ms  p99: {:8.2f} ms  mean: {:8.2f} ms".format(
+                mode, result["p50"], result["p99"], result["mean"]
+            )
+        )
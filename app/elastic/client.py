@@ -1,13 +1,26 @@
-from typing import Any, List, Mapping, Optional
+import json
+import os
+import threading
+from contextlib import contextmanager
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Tuple,
+)
 
 from bert_serving.client import BertClient
 from elastic_transport import ObjectApiResponse
-from elasticsearch import Elasticsearch
+from elasticsearch import Elasticsearch, helpers
 from elasticsearch.client import IndicesClient
 from elasticsearch.exceptions import ApiError
-from sentence_transformers import SentenceTransformer
 
-from app.elastic.helpers import classify_error
+from app.elastic.helpers import KeepAliveHttpNode, classify_error
 from app.elastic.schemas import (
     ElasticCreateIndexResponse,
     ElasticIndexCat,
@@ -16,38 +29,94 @@ from app.elastic.schemas import (
 )
 from core.config import config
 from core.exceptions.base import FailedDependencyException, NotFoundException
+from core.helpers.redis import get_sync_redis
+
+if TYPE_CHECKING:
+    from app.search.services.text_encoding import TextEncodingService
+
+# Upper bound of num_candidates accepted by Elasticsearch.
+MAX_KNN_NUM_CANDIDATES = 10000
+# Default of the index.highlight.max_analyzed_offset index setting.
+MAX_HIGHLIGHT_ANALYZED_OFFSET = 1000000
 
 
 class ElasticsearchClient:
     """
     ElasticsearchClient is a singleton class that provides connection and several methods to interact
-    with Elasticsearch.
+    with Elasticsearch. Every instance in a process shares the same pooled Elasticsearch client, so
+    creating an instance is cheap and connections stay warm between requests.
 
     [Attributes]
       client: Elasticsearch -> Elasticsearch client instance.
     """
 
+    _lock = threading.Lock()
+    _client: Elasticsearch = None
+    _client_pid: int = None
+
     def __init__(self) -> None:
         """
         Constructor of ElasticsearchClient class.
         """
-        self.client = Elasticsearch(
-            hosts=[
+        self.get_client()
+
+    @property
+    def client(self) -> Elasticsearch:
+        return self.get_client()
+
+    @property
+    def indices_client(self) -> IndicesClient:
+        return IndicesClient(self.get_client())
+
+    @staticmethod
+    def client_options() -> Mapping[str, Any]:
+        """
+        Get the connection options of the Elasticsearch client.
+        [Returns]
+          Mapping[str, Any]: Keyword arguments of the Elasticsearch client.
+        """
+        options = {
+            "basic_auth": (config.ELASTICSEARCH_USER, config.ELASTICSEARCH_PASSWORD),
+            "node_class": KeepAliveHttpNode,
+            "connections_per_node": config.ELASTICSEARCH_CONNECTIONS_PER_NODE,
+            "request_timeout": config.ELASTICSEARCH_REQUEST_TIMEOUT,
+            "max_retries": config.ELASTICSEARCH_MAX_RETRIES,
+            "retry_on_timeout": config.ELASTICSEARCH_RETRY_ON_TIMEOUT,
+        }
+        if config.ELASTICSEARCH_CLOUD.lower() == "true":
+            options["cloud_id"] = config.ELASTICSEARCH_CLOUD_ID
+        else:
+            options["hosts"] = [
                 {
                     "scheme": config.ELASTICSEARCH_SCHEME,
                     "host": config.ELASTICSEARCH_HOST,
                     "port": config.ELASTICSEARCH_PORT,
                 }
-            ],
-            basic_auth=(config.ELASTICSEARCH_USER, config.ELASTICSEARCH_PASSWORD),
-        )
-        if config.ELASTICSEARCH_CLOUD.lower() == "true":
-            self.client = Elasticsearch(
-                cloud_id=config.ELASTICSEARCH_CLOUD_ID,
-                basic_auth=(config.ELASTICSEARCH_USER, config.ELASTICSEARCH_PASSWORD),
-            )
+            ]
+        return options
 
-        self.indices_client = IndicesClient(self.client)
+    @classmethod
+    def build_client(cls) -> Elasticsearch:
+        """
+        Create a new Elasticsearch client with its own connection pool.
+        [Returns]
+          Elasticsearch: Elasticsearch client.
+        """
+        return Elasticsearch(**cls.client_options())
+
+    @classmethod
+    def get_client(cls) -> Elasticsearch:
+        """
+        Get the Elasticsearch client shared by the current process, it is recreated after a fork
+        so pooled connections are never shared between processes.
+        [Returns]
+          Elasticsearch: Elasticsearch client.
+        """
+        with cls._lock:
+            if cls._client is None or cls._client_pid != os.getpid():
+                cls._client = cls.build_client()
+                cls._client_pid = os.getpid()
+            return cls._client
         # self.bc = BertClient(
         #     ip=config.BERT_SERVER_IP or "bertserving", output_fmt="list", timeout=60000
         # )
@@ -97,7 +166,8 @@ class ElasticsearchClient:
         """
         try:
             indice = self.indices_client.get(index=index)
-            return indice[index]
+            # The response is keyed by the concrete index when an alias is given.
+            return indice[index] if index in indice else next(iter(indice.values()))
         except ApiError as e:
             raise classify_error(e)
         except Exception as e:
@@ -147,6 +217,24 @@ class ElasticsearchClient:
         except Exception as e:
             raise FailedDependencyException(e)
 
+    def put_mapping(
+        self, index: str, properties: Mapping[str, Any]
+    ) -> ObjectApiResponse[Any]:
+        """
+        Add new fields to the mapping of an existing index.
+        [Parameters]
+            index: str -> Name of the index.
+            properties: Mapping[str, Any] -> Mapping of the fields to be added.
+        [Returns]
+            ObjectApiResponse[Any]: Response from Elasticsearch
+        """
+        try:
+            return self.indices_client.put_mapping(index=index, properties=properties)
+        except ApiError as e:
+            raise classify_error(e)
+        except Exception as e:
+            raise FailedDependencyException(e)
+
     def delete_index(self, index: str) -> ObjectApiResponse[Any]:
         """
         Delete an index in Elasticsearch.
@@ -193,6 +281,153 @@ class ElasticsearchClient:
         except Exception as e:
             raise FailedDependencyException(e)
 
+    def bulk_index_docs(
+        self,
+        actions: Iterable[Mapping[str, Any]],
+        chunk_size: int = None,
+        max_chunk_bytes: int = None,
+    ) -> Iterator[Tuple[bool, Dict[str, Any]]]:
+        """
+        Index documents in Elasticsearch with the bulk API. Actions are consumed lazily and sent
+        in chunks limited by number of actions and size in bytes. Failures are reported per item
+        instead of being raised, a chunk that could not be sent at all is reported as failed for
+        every item in it.
+        [Parameters]
+            actions: Iterable[Mapping[str, Any]] -> Bulk actions, e.g. {"_index": ..., "_id": ...,
+                "_source": ...}.
+            chunk_size: int -> Maximum number of actions per request.
+            max_chunk_bytes: int -> Maximum size of a request in bytes.
+        [Returns]
+            Iterator[Tuple[bool, Dict[str, Any]]]: Success flag and result of every action. Actions
+                retried after a 429 are reported after the rest of their chunk, so results are
+                matched to actions by _id rather than by position.
+        """
+        return helpers.streaming_bulk(
+            self.client,
+            actions,
+            chunk_size=chunk_size or config.ELASTICSEARCH_BULK_CHUNK_SIZE,
+            max_chunk_bytes=max_chunk_bytes or config.ELASTICSEARCH_BULK_MAX_CHUNK_BYTES,
+            raise_on_error=False,
+            raise_on_exception=False,
+            max_retries=config.ELASTICSEARCH_BULK_MAX_RETRIES,
+        )
+
+    def delete_by_query(
+        self, indices: List[str], query: Mapping[str, Any]
+    ) -> ObjectApiResponse[Any]:
+        """
+        Delete every document matching a query.
+        [Parameters]
+            indices: List[str] -> Names of the indices.
+            query: Mapping[str, Any] -> Query of the documents to be deleted.
+        [Returns]
+            ObjectApiResponse[Any]: Response from Elasticsearch
+        """
+        try:
+            return self.client.delete_by_query(
+                index=indices, query=query, conflicts="proceed", ignore_unavailable=True
+            )
+        except ApiError as e:
+            raise classify_error(e)
+        except Exception as e:
+            raise FailedDependencyException(e)
+
+    def get_refresh_interval(self, index: str) -> Optional[str]:
+        """
+        Get the refresh interval set on an index.
+        [Parameters]
+            index: str -> Name of the index.
+        [Returns]
+            Optional[str]: Refresh interval, None when the index uses the default.
+        """
+        try:
+            indice = self.indices_client.get_settings(index=index, name="index.refresh_interval")
+            # The response is keyed by the concrete index when an alias is given.
+            settings = indice[index] if index in indice else next(iter(indice.values()))
+            return settings["settings"].get("index", {}).get("refresh_interval")
+        except ApiError as e:
+            raise classify_error(e)
+        except Exception as e:
+            raise FailedDependencyException(e)
+
+    def relaxed_refresh_keys(self, index: str) -> Tuple[str, str, str]:
+        key = f"elastic::relaxed_refresh::{index}"
+        return f"{key}::jobs", f"{key}::previous", f"{key}::lock"
+
+    def relax_refresh(self, index: str, refresh_interval: str) -> None:
+        """
+        Count a job relaxing the refresh interval of an index, the first job saves the interval
+        of the index and relaxes it.
+        [Parameters]
+            index: str -> Name of the index.
+            refresh_interval: str -> Refresh interval during the job.
+        """
+        redis = get_sync_redis()
+        jobs_key, previous_key, lock_key = self.relaxed_refresh_keys(index)
+        with redis.lock(lock_key, timeout=60, blocking_timeout=60):
+            jobs = redis.incr(jobs_key)
+            redis.expire(jobs_key, config.ELASTICSEARCH_BULK_RELAX_REFRESH_TTL)
+            if jobs > 1:
+                return
+            # A saved interval is left by a job that failed to restore it, the current one is
+            # then still relaxed.
+            if not redis.exists(previous_key):
+                redis.set(previous_key, json.dumps(self.get_refresh_interval(index)))
+            self.update_index(index, {"index": {"refresh_interval": refresh_interval}})
+
+    def restore_refresh(self, index: str) -> None:
+        """
+        Count a job relaxing the refresh interval of an index out, the last job restores the
+        interval saved by the first one. The index is refreshed so the documents of the job are
+        searchable.
+        [Parameters]
+            index: str -> Name of the index.
+        """
+        redis = get_sync_redis()
+        jobs_key, previous_key, lock_key = self.relaxed_refresh_keys(index)
+        with redis.lock(lock_key, timeout=60, blocking_timeout=60):
+            jobs = redis.decr(jobs_key)
+            if jobs > 0:
+                redis.expire(jobs_key, config.ELASTICSEARCH_BULK_RELAX_REFRESH_TTL)
+            else:
+                previous = redis.get(previous_key)
+                if previous is not None:
+                    self.update_index(
+                        index, {"index": {"refresh_interval": json.loads(previous)}}
+                    )
+                redis.delete(jobs_key, previous_key)
+        self.indices_client.refresh(index=index)
+
+    @contextmanager
+    def relaxed_refresh(self, indices: List[str], refresh_interval: str = None):
+        """
+        Relax the refresh interval of indices during a large indexing job. Concurrent jobs are
+        counted in Redis: the interval is relaxed by the first job and restored to the value it
+        had before by the last one, and every job refreshes the indices once done. The count
+        expires after ELASTICSEARCH_BULK_RELAX_REFRESH_TTL seconds without a job starting or
+        ending, so a killed job does not keep the interval relaxed past the next job.
+        [Parameters]
+            indices: List[str] -> Name of the indices.
+            refresh_interval: str -> Refresh interval during the job, "-1" disables refresh.
+        """
+        refresh_interval = refresh_interval or config.ELASTICSEARCH_BULK_REFRESH_INTERVAL
+        relaxed = []
+        try:
+            for index in indices:
+                relaxed.append(index)
+                self.relax_refresh(index, refresh_interval)
+            yield
+        finally:
+            for index in relaxed:
+                try:
+                    self.restore_refresh(index)
+                except Exception as e:
+                    print(
+                        "[ELASTICSEARCH] failed to restore refresh interval of {}: {}".format(
+                            index, e
+                        )
+                    )
+
     def get_doc(self, index: str, doc_id: str) -> dict:
         """
         Get a document in Elasticsearch.
@@ -284,53 +519,54 @@ class ElasticsearchClient:
         size: int,
         source: List[str],
         emb_vector: str,
-        doc_ids: List[int],
+        access_filter: Mapping[str, Any],
         fields: List[str] = None,
-        model: SentenceTransformer = None,
+        model: "TextEncodingService" = None,
+        chunk_path: Optional[str] = None,
+        mode: Optional[str] = None,
+        highlight: Optional[Mapping[str, Any]] = None,
     ):
         """
         Retrieve documents from an Elasticsearch index based on an input query
         [Parameters]
           query: str -> User search prompt
           index_name: str -> Name of index that will be the base of the search
+          chunk_path: Optional[str] -> Path of nested chunk vectors, when given a document is
+            scored by the better of its document vector and its best-matching chunk vector
+          mode: Optional[str] -> Either script_score, knn, or hybrid, defaults to
+            ELASTICSEARCH_SEARCH_MODE
+          highlight: Optional[Mapping[str, Any]] -> Highlighting of the hits, see
+            preview_highlight
         """
         try:
-            if query == "":
-                script_query = {
-                    "bool": {
-                        "must": [
-                            {"terms": {"document_id": doc_ids}},
-                            {"match_all": {}},
-                        ]
-                    }
-                }
-                body = {"query": script_query}
-            
-            else:
-                query_vector = model.encode(query)
-                script_query = {
-                    "bool": {
-                        "must": [
-                            {"terms": {"document_id": doc_ids}},
-                            {"multi_match": {"query": query, "fields": fields}},
-                            {
-                                "script_score": {
-                                    "query": {"match_all": {}},
-                                    "script": {
-                                        "source": f'doc["{emb_vector}"].size() == 0 ? 0 : cosineSimilarity(params.query_vector, "{emb_vector}") + 1',
-                                        "params": {"query_vector": query_vector},
-                                    },
-                                }
-                            },
-                        ]
-                    }
-                }
-                body = {
-                    "query": script_query,
-                    "sort": [{"_score": {"order": "desc"}}],
-                    "search_type": "dfs_query_then_fetch",
-                }
-
+            query_vector = None
+            if query != "":
+                query_vector = model.encode_batch([query])[0].tolist()
+            if query != "" and self.search_mode(mode) == "hybrid":
+                searches = self.hybrid_searches(
+                    index,
+                    query,
+                    emb_vector,
+                    access_filter,
+                    fields,
+                    query_vector,
+                    source,
+                    size,
+                    highlight,
+                )
+                return self.fuse_hits(self.client.msearch(searches=searches), size)
+            body = self.semantic_search_body(
+                query,
+                emb_vector,
+                access_filter,
+                fields,
+                query_vector,
+                chunk_path,
+                mode,
+                size,
+            )
+            if highlight:
+                body["highlight"] = highlight
             return self.client.search(
                 index=index, size=size, body=body, source={"includes": source}
             )
@@ -341,3 +577,320 @@ class ElasticsearchClient:
             raise classify_error(e)
         except Exception as e:
             raise FailedDependencyException(e)  # TODO: Create new exception type
+
+    @staticmethod
+    def access_filter(user_id: int, repository_ids: List[int]) -> dict:
+        """
+        Build the filter clause of the documents a user can retrieve, using the access fields
+        indexed with every document: public documents, documents of the repositories the user
+        is a member of, and documents the user is a collaborator of.
+        [Parameters]
+          user_id: int -> User id.
+          repository_ids: List[int] -> Ids of the repositories the user is a member of.
+        [Returns]
+          dict: Filter clause.
+        """
+        should = [
+            {"term": {"is_public": True}},
+            {"term": {"collaborator_ids": user_id}},
+        ]
+        if repository_ids:
+            should.append({"terms": {"repository_id": repository_ids}})
+        return {"bool": {"should": should, "minimum_should_match": 1}}
+
+    @staticmethod
+    def preview_highlight(field: str) -> dict:
+        """
+        Build the highlighting of a search request that returns preview fragments of a text
+        field, so the field itself does not need to be part of _source. Fragments are plain text,
+        terms are highlighted by the client, and a document without matching fragments is
+        previewed by the beginning of the field.
+        [Parameters]
+          field: str -> Name of the text field.
+        [Returns]
+          dict: Highlight clause.
+        """
+        return {
+            "pre_tags": [""],
+            "post_tags": [""],
+            "require_field_match": False,
+            # Long documents are highlighted up to this offset instead of failing the search.
+            "max_analyzed_offset": MAX_HIGHLIGHT_ANALYZED_OFFSET,
+            "fields": {
+                field: {
+                    "fragment_size": config.ELASTICSEARCH_HIGHLIGHT_FRAGMENT_SIZE,
+                    "number_of_fragments": config.ELASTICSEARCH_HIGHLIGHT_FRAGMENTS,
+                    "no_match_size": config.ELASTICSEARCH_HIGHLIGHT_FRAGMENT_SIZE,
+                }
+            },
+        }
+
+    @staticmethod
+    def search_mode(mode: Optional[str] = None) -> str:
+        """
+        Resolve the search mode, defaults to ELASTICSEARCH_SEARCH_MODE.
+        """
+        return (mode or config.ELASTICSEARCH_SEARCH_MODE).lower()
+
+    @classmethod
+    def semantic_search_body(
+        cls,
+        query: str,
+        emb_vector: str,
+        access_filter: Mapping[str, Any],
+        fields: List[str] = None,
+        query_vector: Optional[List[float]] = None,
+        chunk_path: Optional[str] = None,
+        mode: Optional[str] = None,
+        size: int = 10,
+    ) -> dict:
+        """
+        Build the body of a semantic search request, combining keyword matching on the given fields
+        with the cosine similarity of the query vector.
+        [Parameters]
+          query: str -> User search prompt, an empty query matches every document.
+          emb_vector: str -> Name of the dense vector field.
+          access_filter: Mapping[str, Any] -> Filter clause of the documents that can be
+            retrieved, see ElasticsearchClient.access_filter.
+          fields: List[str] -> Fields used for keyword matching.
+          query_vector: Optional[List[float]] -> Embedding of the query.
+          chunk_path: Optional[str] -> Path of nested chunk vectors, only used by the script_score
+            mode.
+          mode: Optional[str] -> Either script_score or knn, defaults to ELASTICSEARCH_SEARCH_MODE.
+          size: int -> Number of documents to be retrieved.
+        [Returns]
+          dict: Search request body.
+        """
+        if query == "":
+            script_query = {
+                "bool": {
+                    "must": [
+                        access_filter,
+                        {"match_all": {}},
+                    ]
+                }
+            }
+            return {"query": script_query}
+
+        match cls.search_mode(mode):
+            case "knn":
+                return cls.knn_search_body(
+                    query, emb_vector, access_filter, fields, query_vector, size
+                )
+            case "script_score":
+                pass
+            case _:
+                raise ValueError("Unsupported search mode: {}".format(mode))
+
+        semantic_query = cls.vector_score_query(emb_vector, query_vector)
+        if chunk_path:
+            semantic_query = {
+                "dis_max": {
+                    "queries": [
+                        semantic_query,
+                        {
+                            "nested": {
+                                "path": chunk_path,
+                                "score_mode": "max",
+                                "ignore_unmapped": True,
+                                "query": cls.vector_score_query(
+                                    f"{chunk_path}.text_vector", query_vector
+                                ),
+                            }
+                        },
+                    ]
+                }
+            }
+        script_query = {
+            "bool": {
+                "must": [
+                    access_filter,
+                    {"multi_match": {"query": query, "fields": fields}},
+                    semantic_query,
+                ]
+            }
+        }
+        return {
+            "query": script_query,
+            "sort": [{"_score": {"order": "desc"}}],
+            "search_type": "dfs_query_then_fetch",
+        }
+
+    @staticmethod
+    def knn_search_body(
+        query: str,
+        emb_vector: str,
+        access_filter: Mapping[str, Any],
+        fields: List[str],
+        query_vector: List[float],
+        size: int,
+    ) -> dict:
+        """
+        Build the body of a semantic search request that uses approximate kNN on the HNSW graph
+        of the vector field instead of scoring every document with a script. As in the
+        script_score mode only documents matching the keywords are retrieved, kNN is
+        pre-filtered by them and its score (scaled to [0, 2] like cosine similarity + 1) is added
+        to the keyword score.
+        [Parameters]
+          query: str -> User search prompt.
+          emb_vector: str -> Name of the indexed dense vector field.
+          access_filter: Mapping[str, Any] -> Filter clause of the documents that can be
+            retrieved, see ElasticsearchClient.access_filter.
+          fields: List[str] -> Fields used for keyword matching.
+          query_vector: List[float] -> Embedding of the query.
+          size: int -> Number of nearest neighbours to be retrieved.
+        [Returns]
+          dict: Search request body.
+        """
+        keyword_filter = [
+            access_filter,
+            {"multi_match": {"query": query, "fields": fields}},
+        ]
+        return {
+            "knn": {
+                "field": emb_vector,
+                "query_vector": query_vector,
+                "k": size,
+                "num_candidates": min(
+                    max(size, config.ELASTICSEARCH_KNN_NUM_CANDIDATES),
+                    MAX_KNN_NUM_CANDIDATES,
+                ),
+                "filter": {"bool": {"filter": keyword_filter}},
+                "boost": 2,
+            },
+            "query": {
+                "bool": {"filter": keyword_filter[:1], "must": keyword_filter[1:]}
+            },
+        }
+
+    @staticmethod
+    def hybrid_searches(
+        index: str,
+        query: str,
+        emb_vector: str,
+        access_filter: Mapping[str, Any],
+        fields: List[str],
+        query_vector: List[float],
+        source: List[str],
+        size: int,
+        highlight: Optional[Mapping[str, Any]] = None,
+    ) -> List[dict]:
+        """
+        Build a multi search request that retrieves keyword (BM25) and kNN candidates separately,
+        each limited to ELASTICSEARCH_HYBRID_CANDIDATES documents, to be fused by fuse_hits.
+        [Parameters]
+          index: str -> Name of the index.
+          query: str -> User search prompt.
+          emb_vector: str -> Name of the indexed dense vector field.
+          access_filter: Mapping[str, Any] -> Filter clause of the documents that can be
+            retrieved, see ElasticsearchClient.access_filter.
+          fields: List[str] -> Fields used for keyword matching.
+          query_vector: List[float] -> Embedding of the query.
+          source: List[str] -> Fields of the documents to be returned.
+          size: int -> Number of documents to be retrieved.
+          highlight: Optional[Mapping[str, Any]] -> Highlighting of the hits.
+        [Returns]
+          List[dict]: Headers and bodies of the multi search request.
+        """
+        candidates = min(size, config.ELASTICSEARCH_HYBRID_CANDIDATES)
+        keyword_body = {
+            "query": {
+                "bool": {
+                    "filter": [access_filter],
+                    "must": [{"multi_match": {"query": query, "fields": fields}}],
+                }
+            },
+            "size": candidates,
+            "_source": {"includes": source},
+        }
+        knn_body = {
+            "knn": {
+                "field": emb_vector,
+                "query_vector": query_vector,
+                "k": candidates,
+                "num_candidates": min(
+                    max(candidates, config.ELASTICSEARCH_KNN_NUM_CANDIDATES),
+                    MAX_KNN_NUM_CANDIDATES,
+                ),
+                "filter": access_filter,
+            },
+            "size": candidates,
+            "_source": {"includes": source},
+        }
+        if highlight:
+            keyword_body["highlight"] = highlight
+            knn_body["highlight"] = highlight
+        return [{"index": index}, keyword_body, {"index": index}, knn_body]
+
+    @staticmethod
+    def fuse_hits(response: Mapping[str, Any], size: int) -> dict:
+        """
+        Fuse the ranked lists of a multi search response into one list, either by reciprocal
+        rank fusion (rrf) or by a weighted sum of min-max normalized scores (weighted), as set by
+        ELASTICSEARCH_HYBRID_FUSION.
+        [Parameters]
+          response: Mapping[str, Any] -> Multi search response, keyword hits first.
+          size: int -> Number of documents to be returned.
+        [Returns]
+          dict: Search response with the fused hits.
+        """
+        ranked_lists = []
+        for item in response["responses"]:
+            if "error" in item:
+                raise Exception(item["error"])
+            ranked_lists.append(item["hits"]["hits"])
+
+        fusion = config.ELASTICSEARCH_HYBRID_FUSION.lower()
+        weights = [
+            1 - config.ELASTICSEARCH_HYBRID_VECTOR_WEIGHT,
+            config.ELASTICSEARCH_HYBRID_VECTOR_WEIGHT,
+        ]
+        hits: Dict[str, dict] = {}
+        scores: Dict[str, float] = {}
+        for hits_list, weight in zip(ranked_lists, weights):
+            if not hits_list:
+                continue
+            max_score = max(hit["_score"] for hit in hits_list)
+            min_score = min(hit["_score"] for hit in hits_list)
+            for rank, hit in enumerate(hits_list, start=1):
+                match fusion:
+                    case "rrf":
+                        score = 1 / (config.ELASTICSEARCH_RRF_RANK_CONSTANT + rank)
+                    case "weighted":
+                        score = weight * (
+                            (hit["_score"] - min_score) / (max_score - min_score)
+                            if max_score > min_score
+                            else 1
+                        )
+                    case _:
+                        raise ValueError("Unsupported hybrid fusion: {}".format(fusion))
+                hits.setdefault(hit["_id"], hit)
+                scores[hit["_id"]] = scores.get(hit["_id"], 0) + score
+
+        fused = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:size]
+        return {
+            "hits": {
+                "total": {"value": len(scores), "relation": "eq"},
+                "hits": [{**hits[_id], "_score": score} for _id, score in fused],
+            }
+        }
+
+    @staticmethod
+    def vector_score_query(emb_vector: str, query_vector: List[float]) -> dict:
+        """
+        Build a query that scores every document by cosine similarity of a vector field.
+        [Parameters]
+          emb_vector: str -> Name of the dense vector field.
+          query_vector: List[float] -> Embedding of the query.
+        [Returns]
+          dict: script_score query.
+        """
+        return {
+            "script_score": {
+                "query": {"match_all": {}},
+                "script": {
+                    "source": f'doc["{emb_vector}"].size() == 0 ? 0 : cosineSimilarity(params.query_vector, "{emb_vector}") + 1',
+                    "params": {"query_vector": query_vector},
+                },
+            }
+        }
@@ -3,15 +3,38 @@ from copy import deepcopy
 # =============================================================================
 # Base configuration for Elasticsearch.
 # =============================================================================
+# Dense vectors indexed in an HNSW graph, so they can be searched with approximate kNN.
+INDEXED_DENSE_VECTOR_MAPPING = {
+    "type": "dense_vector",
+    "dims": 768,
+    "index": True,
+    "similarity": "cosine",
+}
+
 BASE_ELASTICSEARCH_INDEX_MAPPINGS = {
     "dynamic": "true",
     "_source": {"enabled": "true"},
     "properties": {
         "document_id": {"type": "integer"},
+        # Access fields of the document, kept in sync with the database on permission changes
+        # so searches filter by them instead of by a list of accessible document ids.
+        "repository_id": {"type": "integer"},
+        "is_public": {"type": "boolean"},
+        "collaborator_ids": {"type": "integer"},
         "title": {"type": "text"},
         "raw_text": {"type": "text"},
         "processed_text": {"type": "text"},
-        "text_vector": {"type": "dense_vector", "dims": 768},
+        "text_vector": INDEXED_DENSE_VECTOR_MAPPING,
+        # Embedding of each overlapping token window of the document, used to score a document
+        # by its best-matching passage. Vectors inside nested fields can not be indexed for kNN
+        # before Elasticsearch 8.11, so chunks are scored with a script.
+        "text_chunks": {
+            "type": "nested",
+            "properties": {
+                "chunk_index": {"type": "integer"},
+                "text_vector": {"type": "dense_vector", "dims": 768},
+            },
+        },
         "document_label": {"type": "text"},
         "document_metadata": {
             "type": "object",
@@ -128,7 +151,7 @@ RECRUITMENT_ELASTICSEARCH_INDEX_INFORMATION = {
         "type": "object",
         "properties": {
             "text": {"type": "text"},
-            "text_vector": {"type": "dense_vector", "dims": 768},
+            "text_vector": INDEXED_DENSE_VECTOR_MAPPING,
         },
     },
     "education_insitutions": {"type": "text"},
@@ -137,7 +160,7 @@ RECRUITMENT_ELASTICSEARCH_INDEX_INFORMATION = {
         "type": "object",
         "properties": {
             "text": {"type": "text"},
-            "text_vector": {"type": "dense_vector", "dims": 768},
+            "text_vector": INDEXED_DENSE_VECTOR_MAPPING,
         },
     },
     "projects_titles": {"type": "text"},
@@ -145,7 +168,7 @@ RECRUITMENT_ELASTICSEARCH_INDEX_INFORMATION = {
         "type": "object",
         "properties": {
             "text": {"type": "text"},
-            "text_vector": {"type": "dense_vector", "dims": 768},
+            "text_vector": INDEXED_DENSE_VECTOR_MAPPING,
         },
     },
     "certifications_titles": {"type": "text"},
@@ -153,7 +176,7 @@ RECRUITMENT_ELASTICSEARCH_INDEX_INFORMATION = {
         "type": "object",
         "properties": {
             "text": {"type": "text"},
-            "text_vector": {"type": "dense_vector", "dims": 768},
+            "text_vector": INDEXED_DENSE_VECTOR_MAPPING,
         },
     },
 }
@@ -190,14 +213,14 @@ SCIENTIFIC_ELASTICSEARCH_INDEX_CONFIGURATION = {
     "abstract": {
         "type": "object",
         "properties": {
-            "text_vector": {"type": "dense_vector", "dims": 768},
+            "text_vector": INDEXED_DENSE_VECTOR_MAPPING,
             "text": {"type": "text"},
         },
     },
     "title": {
         "type": "object",
         "properties": {
-            "text_vector": {"type": "dense_vector", "dims": 768},
+            "text_vector": INDEXED_DENSE_VECTOR_MAPPING,
             "text": {"type": "text"},
         },
     },
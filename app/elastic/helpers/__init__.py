@@ -1,5 +1,9 @@
+from app.elastic.helpers.bulk import BulkIndexTracker
 from app.elastic.helpers.exception import classify_error
+from app.elastic.helpers.transport import KeepAliveHttpNode
 
 __all__ = [
+    "BulkIndexTracker",
     "classify_error",
+    "KeepAliveHttpNode",
 ]
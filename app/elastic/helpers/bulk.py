@@ -0,0 +1,70 @@
+import uuid
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+
+class BulkIndexTracker:
+    """
+    BulkIndexTracker matches the results of bulk index actions back to the documents they were
+    built from. Results do not come back in the order of the actions, streaming_bulk yields the
+    actions retried after a 429 once the rest of their chunk is done, so every action gets an
+    explicit _id the results are keyed on.
+
+    [Attributes]
+        action_document_ids: Dict[str, int] -> Document id of every action without result yet.
+        expected_results: Dict[int, int] -> Number of actions of every unfinished document.
+        results: Dict[int, List[Tuple[bool, Dict[str, Any]]]] -> Results of every unfinished
+            document so far.
+    """
+
+    def __init__(self) -> None:
+        self.action_document_ids: Dict[str, int] = {}
+        self.expected_results: Dict[int, int] = {}
+        self.results: Dict[int, List[Tuple[bool, Dict[str, Any]]]] = {}
+
+    def add_document(
+        self, document_id: int, index_docs: List[Tuple[str, Mapping[str, Any]]]
+    ) -> List[Dict[str, Any]]:
+        """
+        Build the bulk actions indexing the Elasticsearch documents of a document.
+        [Parameters]
+            document_id: int -> Document id.
+            index_docs: List[Tuple[str, Mapping[str, Any]]] -> Index name and Elasticsearch
+                document.
+        [Returns]
+            List[Dict[str, Any]]: Bulk actions.
+        """
+        self.expected_results[document_id] = len(index_docs)
+        self.results[document_id] = []
+        actions = []
+        for index_name, doc in index_docs:
+            action_id = uuid.uuid4().hex
+            self.action_document_ids[action_id] = document_id
+            actions.append({"_index": index_name, "_id": action_id, "_source": doc})
+        return actions
+
+    def add_result(self, ok: bool, item: Mapping[str, Any]) -> Optional[int]:
+        """
+        Record the result of a bulk action.
+        [Parameters]
+            ok: bool -> Whether the action succeeded.
+            item: Mapping[str, Any] -> Result item yielded by the bulk helper.
+        [Returns]
+            Optional[int]: Id of the document when this was its last result, None otherwise.
+        """
+        result = item.get("index", {})
+        document_id = self.action_document_ids.pop(result["_id"])
+        self.results[document_id].append((ok, result))
+        if len(self.results[document_id]) == self.expected_results[document_id]:
+            return document_id
+        return None
+
+    def pop_results(self, document_id: int) -> List[Tuple[bool, Dict[str, Any]]]:
+        """
+        Get and forget the results of a document.
+        [Parameters]
+            document_id: int -> Document id.
+        [Returns]
+            List[Tuple[bool, Dict[str, Any]]]: Success flag and result of its actions so far.
+        """
+        self.expected_results.pop(document_id, None)
+        return self.results.pop(document_id, [])
@@ -0,0 +1,39 @@
+import socket
+from typing import List, Tuple
+
+from elastic_transport import NodeConfig, Urllib3HttpNode
+from urllib3.connection import HTTPConnection
+
+from core.config import config
+
+
+def keep_alive_socket_options(idle: int) -> List[Tuple[int, int, int]]:
+    """
+    Socket options enabling TCP keep-alive probes on idle connections.
+    [Parameters]
+        idle: int -> Seconds a connection is idle before the first probe is sent.
+    [Returns]
+        List[Tuple[int, int, int]]: Socket options.
+    """
+    options = list(HTTPConnection.default_socket_options)
+    options.append((socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1))
+    # TCP_KEEPIDLE and TCP_KEEPINTVL are not available on every platform.
+    if hasattr(socket, "TCP_KEEPIDLE"):
+        options.append((socket.IPPROTO_TCP, socket.TCP_KEEPIDLE, idle))
+    if hasattr(socket, "TCP_KEEPINTVL"):
+        options.append((socket.IPPROTO_TCP, socket.TCP_KEEPINTVL, max(idle // 4, 1)))
+    return options
+
+
+class KeepAliveHttpNode(Urllib3HttpNode):
+    """
+    Urllib3 node whose pooled connections send TCP keep-alive probes, so idle connections are not
+    silently dropped by load balancers or NAT between requests and stay reusable.
+    """
+
+    def __init__(self, config_: NodeConfig) -> None:
+        super().__init__(config_)
+        if config.ELASTICSEARCH_TCP_KEEPALIVE_IDLE > 0:
+            self.pool.conn_kw["socket_options"] = keep_alive_socket_options(
+                config.ELASTICSEARCH_TCP_KEEPALIVE_IDLE
+            )
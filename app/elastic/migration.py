@@ -0,0 +1,191 @@
+import argparse
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+from app.elastic.client import ElasticsearchClient
+from app.elastic.configuration import (
+    GENERAL_ELASTICSEARCH_INDEX_MAPPINGS,
+    GENERAL_ELASTICSEARCH_INDEX_NAME,
+    GENERAL_ELASTICSEARCH_INDEX_SETTINGS,
+    RECRUITMENT_ELASTICSEARCH_INDEX_MAPPINGS,
+    RECRUITMENT_ELASTICSEARCH_INDEX_NAME,
+    RECRUITMENT_ELASTICSEARCH_INDEX_SETTINGS,
+    SCIENTIFIC_ELASTICSEARCH_INDEX_MAPPINGS,
+    SCIENTIFIC_ELASTICSEARCH_INDEX_NAME,
+    SCIENTIFIC_ELASTICSEARCH_INDEX_SETTINGS,
+)
+
+INDEX_CONFIGURATIONS: Dict[str, Tuple[Mapping[str, Any], Mapping[str, Any]]] = {
+    GENERAL_ELASTICSEARCH_INDEX_NAME: (
+        GENERAL_ELASTICSEARCH_INDEX_MAPPINGS,
+        GENERAL_ELASTICSEARCH_INDEX_SETTINGS,
+    ),
+    RECRUITMENT_ELASTICSEARCH_INDEX_NAME: (
+        RECRUITMENT_ELASTICSEARCH_INDEX_MAPPINGS,
+        RECRUITMENT_ELASTICSEARCH_INDEX_SETTINGS,
+    ),
+    SCIENTIFIC_ELASTICSEARCH_INDEX_NAME: (
+        SCIENTIFIC_ELASTICSEARCH_INDEX_MAPPINGS,
+        SCIENTIFIC_ELASTICSEARCH_INDEX_SETTINGS,
+    ),
+}
+
+# Older documents hold zero vectors for empty semantic metadata, which dense_vector fields indexed
+# with cosine similarity reject. They are dropped while copying, like new documents that are
+# indexed without a vector for empty metadata.
+STRIP_ZERO_VECTORS_SCRIPT = """
+boolean isZeroVector(def vector) {
+    if (!(vector instanceof List)) {
+        return vector == null;
+    }
+    for (def value : vector) {
+        if (((Number) value).doubleValue() != 0.0) {
+            return false;
+        }
+    }
+    return true;
+}
+
+void stripZeroVector(def field) {
+    if (field instanceof Map && field.containsKey('text_vector')
+            && isZeroVector(field.get('text_vector'))) {
+        field.remove('text_vector');
+    }
+}
+
+stripZeroVector(ctx._source);
+if (ctx._source.document_metadata instanceof Map) {
+    for (def field : ctx._source.document_metadata.values()) {
+        if (field instanceof List) {
+            for (def item : field) {
+                stripZeroVector(item);
+            }
+        } else {
+            stripZeroVector(field);
+        }
+    }
+}
+"""
+
+
+def next_index_name(index: str) -> str:
+    """
+    Get the name of the next version of an index, e.g. general-0002 for general-0001.
+    [Parameters]
+        index: str -> Name of the current index.
+    [Returns]
+        str: Name of the next index.
+    """
+    prefix, _, version = index.rpartition("-")
+    return "{}-{:04d}".format(prefix, int(version) + 1)
+
+
+def resolve_index(name: str) -> Optional[str]:
+    """
+    Get the concrete index behind a name, which is either an index or an alias.
+    [Parameters]
+        name: str -> Index or alias name.
+    [Returns]
+        Optional[str]: Name of the concrete index, None if it does not exist.
+    """
+    client = ElasticsearchClient.get_client()
+    if client.indices.exists_alias(name=name):
+        return next(iter(client.indices.get_alias(name=name)))
+    if client.indices.exists(index=name):
+        return name
+    return None
+
+
+def migrate_index(
+    name: str, mappings: Mapping[str, Any], settings: Mapping[str, Any]
+) -> str:
+    """
+    Copy an index into a new index created with the given mappings and point the name to it as
+    an alias, so the application keeps using the same index name. Mappings of existing fields
+    (e.g. indexing dense vectors for kNN) can only be changed this way. Documents written to the
+    old index while it is copied are lost, so the Celery workers should be stopped first. Zero
+    vectors are dropped while copying, and the new index is deleted if the migration fails.
+    [Parameters]
+        name: str -> Index name used by the application, e.g. general-0001.
+        mappings: Mapping[str, Any] -> Mappings of the new index.
+        settings: Mapping[str, Any] -> Settings of the new index.
+    [Returns]
+        str: Name of the new index.
+    """
+    client = ElasticsearchClient.get_client()
+    source = resolve_index(name)
+    target = next_index_name(source or name)
+
+    # Refresh and replication are disabled while copying and restored afterwards.
+    client.indices.create(
+        index=target,
+        mappings=mappings,
+        settings={**settings, "refresh_interval": "-1", "number_of_replicas": 0},
+    )
+
+    try:
+        actions: List[dict] = [{"add": {"index": target, "alias": name}}]
+        if source is not None:
+            print("[MIGRATION] Copying {} into {}".format(source, target))
+            response = client.options(request_timeout=None).reindex(
+                source={"index": source},
+                dest={"index": target},
+                script={"source": STRIP_ZERO_VECTORS_SCRIPT, "lang": "painless"},
+                wait_for_completion=True,
+                slices="auto",
+            )
+            if response.get("failures"):
+                raise Exception(
+                    "Copying {} into {} failed: {}".format(
+                        source, target, response["failures"]
+                    )
+                )
+
+        client.indices.put_settings(
+            index=target,
+            settings={
+                "refresh_interval": None,
+                "number_of_replicas": settings.get("number_of_replicas", 1),
+            },
+        )
+        client.indices.refresh(index=target)
+
+        if source is not None:
+            source_count = client.count(index=source)["count"]
+            target_count = client.count(index=target)["count"]
+            if source_count != target_count:
+                raise Exception(
+                    "{} has {} documents but {} has {}, the alias is left unchanged".format(
+                        source, source_count, target, target_count
+                    )
+                )
+            if source == name:
+                # An alias can not share its name with an index, the old index is removed in
+                # the same atomic request that creates the alias.
+                actions.append({"remove_index": {"index": source}})
+            else:
+                actions.append({"remove": {"index": source, "alias": name}})
+
+        client.indices.update_aliases(actions=actions)
+    except Exception as e:
+        # Remove the incomplete copy so the migration can be run again.
+        print("[MIGRATION] Deleting {} after a failed migration".format(target))
+        client.indices.delete(index=target, ignore_unavailable=True)
+        raise e
+    print("[MIGRATION] {} now points to {}".format(name, target))
+    return target
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Recreate Elasticsearch indices with the current mappings of the application."
+    )
+    parser.add_argument(
+        "--index",
+        action="append",
+        choices=list(INDEX_CONFIGURATIONS.keys()),
+        help="Index to be migrated, every index is migrated when omitted.",
+    )
+    args = parser.parse_args()
+
+    for index in args.index or INDEX_CONFIGURATIONS.keys():
+        migrate_index(index, *INDEX_CONFIGURATIONS[index])
@@ -56,6 +56,15 @@ class UpdateIndexBody(BaseModel):
     )
 
 
+class UpdateMappingBody(BaseModel):
+    properties: Mapping[str, Any] = Field(
+        ...,
+        description="Mapping of the fields to be added to the index, existing fields can not be "
+        "changed. For more information, refer to "
+        "[this](https://www.elastic.co/guide/en/elasticsearch/reference/8.6/indices-put-mapping.html)",
+    )
+
+
 # ==============================================================================
 # Response Body-related Schemas.
 # ==============================================================================
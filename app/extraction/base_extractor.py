@@ -6,15 +6,45 @@ from typing import Any, Dict, List
 import dateparser
 import magic
 import spacy
+from spacy.language import Language
 from tika import parser
 
 from app.extraction.converter import Converter
 from app.extraction.ner_result import NERResult
+from app.preprocess.parsed_document import ParsedDocument
 
 
 class BaseExtractor(abc.ABC):
     file_converter = Converter()
-    nlp = spacy.load("en_core_web_md")
+    spacy_model = "en_core_web_md"
+    nlp: Language = None
+
+    @classmethod
+    def get_nlp(cls) -> Language:
+        """
+        Get the spaCy pipeline shared by all extractors, loading it on first use.
+
+        [Returns]
+            Language -> spaCy pipeline
+        """
+        if BaseExtractor.nlp is None:
+            BaseExtractor.nlp = spacy.load(cls.spacy_model)
+        return BaseExtractor.nlp
+
+    @staticmethod
+    def parse_content(file: bytes, parsed_document: ParsedDocument = None) -> str:
+        """
+        Get the text content of a file, reusing the already parsed content if available.
+
+        [Arguments]
+            file: bytes -> File to parse
+            parsed_document: ParsedDocument -> Already parsed document (optional)
+        [Returns]
+            str -> Text content of the file
+        """
+        if parsed_document is not None:
+            return parsed_document.content.strip()
+        return parser.from_buffer(file)["content"].strip()
 
     @property
     @abc.abstractmethod
@@ -25,6 +55,7 @@ class BaseExtractor(abc.ABC):
         self,
         file: bytes,
         file_text: str = None,
+        parsed_document: ParsedDocument = None,
     ) -> Dict[str, Any]:
         """
         Extract entities and information from file
@@ -33,13 +64,15 @@ class BaseExtractor(abc.ABC):
             file: bytes -> File to extract metadata from
             file_text: str -> Text of file to extract entities from (optional), used when
                 file is scanned PDF
+            parsed_document: ParsedDocument -> Already parsed file (optional), reused instead
+                of parsing the file again
         [Returns]
             Dict[str, Any] -> Dictionary containing extracted information and entities
         """
-        file_text = file_text or parser.from_buffer(file)["content"].strip()
+        file_text = file_text or self.parse_content(file, parsed_document)
 
         # Extract general information
-        result = self.extract_general_information(file, file_text)
+        result = self.extract_general_information(file, file_text, parsed_document)
 
         entities = self.extract_entities(file_text)
 
@@ -51,7 +84,10 @@ class BaseExtractor(abc.ABC):
         return result
 
     def extract_general_information(
-        self, file: bytes, file_text: str = None
+        self,
+        file: bytes,
+        file_text: str = None,
+        parsed_document: ParsedDocument = None,
     ) -> Dict[str, Any]:
         """
         Extract general information from file
@@ -59,17 +95,22 @@ class BaseExtractor(abc.ABC):
         [Arguments]
             file: bytes -> File to extract information from
             file_text: str -> Text of file
+            parsed_document: ParsedDocument -> Already parsed file (optional)
         [Returns]
             Dict[str, Any] -> Dictionary containing extracted information
         """
 
-        mimetype = magic.from_buffer(file, mime=True)
-        extension = mimetypes.guess_extension(mimetype)
+        if parsed_document is not None:
+            mimetype = parsed_document.mimetype
+            extension = parsed_document.extension
+        else:
+            mimetype = magic.from_buffer(file, mime=True)
+            extension = mimetypes.guess_extension(mimetype)
         size = len(file)
 
         # Extract dates
         if file_text is None:
-            file_text: str = parser.from_buffer(file)["content"].strip()
+            file_text: str = self.parse_content(file, parsed_document)
         dates = self.__extract_dates(file_text)
         converted_dates = [date.strftime("%Y-%m-%d") for date in dates]
 
@@ -100,7 +141,7 @@ class BaseExtractor(abc.ABC):
             List[datetime.date] -> List of dates
         """
 
-        doc = self.nlp(text)
+        doc = self.get_nlp()(text)
         result = []
         for ent in doc.ents:
             if ent.label_ == "DATE":
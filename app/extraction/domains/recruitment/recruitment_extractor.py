@@ -21,6 +21,7 @@ from app.extraction.domains.recruitment.constants import (
     SKILLS_REGEX,
 )
 from app.extraction.ner_result import NERResult
+from app.preprocess.parsed_document import ParsedDocument
 
 dir_path = os.path.dirname(os.path.realpath(__file__))
 
@@ -56,6 +57,7 @@ class RecruitmentExtractor(BaseExtractor):
         self,
         file: bytes,
         file_text: str = None,
+        parsed_document: ParsedDocument = None,
     ) -> Dict[str, Any]:
         """
         Extract information from a paper file
@@ -64,21 +66,26 @@ class RecruitmentExtractor(BaseExtractor):
             file: bytes -> File bytes to extract information from
             file_text: str -> Text of file to extract entities from (optional), used when
                 file is a scanned PDF file
+            parsed_document: ParsedDocument -> Already parsed file (optional), reused instead
+                of parsing the file again
         [Returns]
             Dict -> Dictionary containing extracted information
         """
 
-        result = super().extract_general_information(file, file_text)
+        result = super().extract_general_information(file, file_text, parsed_document)
 
         is_pdf = result["extension"] == ".pdf" and file_text is None
 
         if result["extension"] == ".doc" or result["extension"] == ".docx":
-            file = self.file_converter.doc_to_pdf(file, result["extension"])
+            if parsed_document is not None:
+                file = parsed_document.pdf_bytes
+            else:
+                file = self.file_converter.doc_to_pdf(file, result["extension"])
             is_pdf = True
 
         # Get resume segments and text
         resume_segments_and_text = self.__get_resume_segments_and_text(
-            file, is_pdf, file_text
+            file, is_pdf, file_text, parsed_document
         )
 
         # Join text for every segment
@@ -212,6 +219,7 @@ class RecruitmentExtractor(BaseExtractor):
         file: bytes,
         is_pdf: bool,
         file_text: str = None,
+        parsed_document: ParsedDocument = None,
     ) -> Dict[str, Any]:
         """
         Get resume segments and text from resume file
@@ -220,18 +228,19 @@ class RecruitmentExtractor(BaseExtractor):
             file: bytes -> File bytes to extract information from
             file_text: str -> Text of file to extract entities from (optional), used when
                 file is a scanned PDF file
+            parsed_document: ParsedDocument -> Already opened file (optional)
         [Returns]
             Dict -> Dictionary of resume segments and text
         """
 
         page_lines = []
         if is_pdf:
-            if isinstance(file, bytes):
-                doc = fitz.open(stream=file, filetype="pdf")
-            else:
-                raise TypeError("file must be bytes")
+            if parsed_document is None:
+                if isinstance(file, bytes):
+                    doc = fitz.open(stream=file, filetype="pdf")
+                else:
+                    raise TypeError("file must be bytes")
 
-            pages = []
             dict_flags = (
                 (fitz.TEXTFLAGS_DICT | fitz.TEXT_DEHYPHENATE)
                 & ~fitz.TEXT_PRESERVE_IMAGES
@@ -242,10 +251,15 @@ class RecruitmentExtractor(BaseExtractor):
                 & ~fitz.TEXT_PRESERVE_IMAGES
                 & ~fitz.TEXT_PRESERVE_LIGATURES
             )
-            resume_text = ""
-            for page in doc:
-                pages.append(page.get_text("dict", sort=False, flags=dict_flags))
-                resume_text += page.get_text("text", sort=False, flags=text_flags)
+            if parsed_document is not None:
+                pages = parsed_document.get_page_dicts(dict_flags)
+                resume_text = "".join(parsed_document.get_page_texts(text_flags))
+            else:
+                pages = []
+                resume_text = ""
+                for page in doc:
+                    pages.append(page.get_text("dict", sort=False, flags=dict_flags))
+                    resume_text += page.get_text("text", sort=False, flags=text_flags)
 
             max_font_size = 0
             header_font_size = 0
@@ -290,7 +304,7 @@ class RecruitmentExtractor(BaseExtractor):
 
             header_font_size = max(possible_header_sizes)
         else:  # txt file
-            resume_text = file_text or parser.from_buffer(file)["content"].strip()
+            resume_text = file_text or self.parse_content(file, parsed_document)
             page_lines = [
                 {"text": line.strip(), "label": "unknown"}
                 for line in resume_text.splitlines()
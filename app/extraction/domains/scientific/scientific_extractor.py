@@ -14,6 +14,7 @@ from transformers import pipeline
 from app.extraction.base_extractor import BaseExtractor
 from app.extraction.domains.scientific.configuration import SCIENTIFIC_ENTITIES
 from app.extraction.ner_result import NERResult
+from app.preprocess.parsed_document import ParsedDocument
 
 dir_path = os.path.dirname(os.path.realpath(__file__))
 
@@ -93,6 +94,7 @@ class ScientificExtractor(BaseExtractor):
         self,
         file: bytes,
         file_text: str = None,
+        parsed_document: ParsedDocument = None,
     ) -> Dict[str, Any]:
         """
         Extract information from a paper file
@@ -101,23 +103,30 @@ class ScientificExtractor(BaseExtractor):
             file: bytes -> File bytes to extract information from
             file_text: str -> Text of file to extract entities from (optional), used when
                 file is scanned PDF
+            parsed_document: ParsedDocument -> Already parsed file (optional), reused instead
+                of parsing the file again
         [Returns]
             Dict -> Dictionary containing extracted information
         """
 
-        result = super().extract(file, file_text)
+        result = super().extract(file, file_text, parsed_document)
 
         if result["extension"] == ".doc" or result["extension"] == ".docx":
-            file = self.file_converter.doc_to_pdf(file, result["extension"])
+            if parsed_document is not None:
+                file = parsed_document.pdf_bytes
+            else:
+                file = self.file_converter.doc_to_pdf(file, result["extension"])
 
         if (
             (result["extension"] == ".pdf" and not file_text)
             or result["extension"] == ".doc"
             or result["extension"] == ".docx"
         ):
-            metadata = self.extract_scientific_information(file)
+            metadata = self.extract_scientific_information(file, parsed_document)
         else:
-            metadata = self.extract_scientific_information_txt(file, file_text)
+            metadata = self.extract_scientific_information_txt(
+                file, file_text, parsed_document
+            )
         result = result | metadata
 
         return result
@@ -149,12 +158,15 @@ class ScientificExtractor(BaseExtractor):
 
         return NERResult(full_text, result)
 
-    def extract_scientific_information(self, file: bytes) -> Dict[str, Any]:
+    def extract_scientific_information(
+        self, file: bytes, parsed_document: ParsedDocument = None
+    ) -> Dict[str, Any]:
         """
         Extract scientific metadata from a paper file
 
         [Arguments]
             file: bytes -> File bytes to extract metadata from
+            parsed_document: ParsedDocument -> Already opened file (optional)
         [Returns]
             Dict -> Dictionary containing extracted metadata
         """
@@ -168,23 +180,21 @@ class ScientificExtractor(BaseExtractor):
             "references": [],
         }
 
-        if isinstance(file, bytes):
+        if parsed_document is not None:
+            doc = parsed_document.pdf
+        elif isinstance(file, bytes):
             doc = fitz.open(stream=file, filetype="pdf")
         else:
             raise TypeError("file must be bytes")
 
         # Extract pages from document without images
-        pages = []
+        flags = (fitz.TEXTFLAGS_DICT | fitz.TEXT_DEHYPHENATE) & ~fitz.TEXT_PRESERVE_IMAGES
+        if parsed_document is not None:
+            pages = list(parsed_document.get_page_dicts(flags))
+        else:
+            pages = [page.get_text("dict", sort=False, flags=flags) for page in doc]
         reference_pages_numbers = []
         for page in doc:
-            pages.append(
-                page.get_text(
-                    "dict",
-                    sort=False,
-                    flags=(fitz.TEXTFLAGS_DICT | fitz.TEXT_DEHYPHENATE)
-                    & ~fitz.TEXT_PRESERVE_IMAGES,
-                )
-            )
             search = page.search_for("references") + page.search_for("bibliography")
             if search != []:
                 reference_pages_numbers.append(page.number)
@@ -316,6 +326,7 @@ class ScientificExtractor(BaseExtractor):
         self,
         file: bytes,
         file_text: str = None,
+        parsed_document: ParsedDocument = None,
     ) -> Dict[str, Any]:
         """
         Extract information from a txt file
@@ -324,6 +335,7 @@ class ScientificExtractor(BaseExtractor):
             file: bytes -> File bytes to extract information from
             file_text: str -> Text of file to extract entities from (optional), used when
                 file is scanned PDF
+            parsed_document: ParsedDocument -> Already parsed file (optional)
         [Returns]
             Dict -> Dictionary containing extracted information
         """
@@ -337,7 +349,7 @@ class ScientificExtractor(BaseExtractor):
             "references": [],
         }
 
-        file_text = file_text or parser.from_buffer(file)["content"].strip()
+        file_text = file_text or self.parse_content(file, parsed_document)
 
         # Split lines and remove empty
         lines = [
@@ -3,6 +3,7 @@ from typing import Any, Dict, Union
 from app.extraction.domains.general import GeneralExtractor
 from app.extraction.domains.recruitment import RecruitmentExtractor
 from app.extraction.domains.scientific import ScientificExtractor
+from app.preprocess.parsed_document import ParsedDocument
 
 
 class InformationExtractor:
@@ -39,6 +40,7 @@ class InformationExtractor:
         self,
         file: bytes,
         file_text: str = None,
+        parsed_document: ParsedDocument = None,
     ) -> Dict[str, Any]:
         """
         Extract entities and metadata from text
@@ -47,6 +49,8 @@ class InformationExtractor:
             file: bytes -> File to extract metadata from
             file_text: str -> Text of file to extract entities from (optional), used when
                 file is scanned PDF
+            parsed_document: ParsedDocument -> Already parsed file (optional), reused instead
+                of parsing the file again
         """
 
-        return self.extractor.extract(file, file_text)
+        return self.extractor.extract(file, file_text, parsed_document)
@@ -1,4 +1,5 @@
 from app.preprocess.ocr import OCRUtil
+from app.preprocess.parsed_document import ParsedDocument
 from app.preprocess.preprocess import PreprocessUtil
 
-__all__ = ["PreprocessUtil", "OCRUtil"]
+__all__ = ["PreprocessUtil", "OCRUtil", "ParsedDocument"]
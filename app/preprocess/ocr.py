@@ -1,14 +1,65 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Iterable, Iterator, List, Optional, Tuple
+
 import cv2
 import fitz
 import imutils
 import numpy as np
 import pytesseract
-from pdf2image import convert_from_bytes
 
 # import matplotlib.pyplot as plt
 from PIL import Image
 from pytesseract import Output
 
+from app.preprocess.ocr_cache import OCRCache
+from app.preprocess.parsed_document import ParsedDocument
+from core.config import config
+
+# OCR cache of the current process and its pid, created again in every process so pool workers
+# never share connections with their parent.
+_ocr_cache: Optional[Tuple[int, Optional[OCRCache]]] = None
+
+
+def get_ocr_cache() -> Optional[OCRCache]:
+    """
+    Get the OCR cache of the current process.
+    [Returns]
+        Optional[OCRCache]: The cache, or None when caching is disabled.
+    """
+    global _ocr_cache
+    if _ocr_cache is None or _ocr_cache[0] != os.getpid():
+        _ocr_cache = (os.getpid(), OCRCache.from_config())
+    return _ocr_cache[1]
+
+# PDF OCRed by a process pool worker, opened once per worker by init_ocr_worker so the file is
+# not sent with every page.
+_worker_pdf: Optional[fitz.Document] = None
+
+
+def init_ocr_worker(pdf_file: bytes) -> None:
+    """
+    Initializer of the OCR process pool workers.
+    [Parameters]
+        pdf_file: bytes -> The PDF file to be processed.
+    """
+    global _worker_pdf
+    _worker_pdf = fitz.open(stream=pdf_file, filetype="pdf")
+
+
+def ocr_worker_page(page_index: int, timeout: Optional[float]) -> str:
+    """
+    OCR a page of the PDF of an OCR process pool worker.
+    [Parameters]
+        page_index: int -> Page index, starting from 0.
+        timeout: Optional[float] -> Seconds the OCR of the page may take.
+    [Returns]
+        str: The text extracted from the page.
+    """
+    return OCRUtil.ocr_page(_worker_pdf, page_index, timeout)
+
 
 class OCRUtil:
     """
@@ -17,6 +68,9 @@ class OCRUtil:
     """
 
     TEXT_PERCENTAGE_THRESHOLD = 0.01
+    TESSERACT_CONFIG = "--oem 3 --psm 1"
+    # Flags of the native text merged with the text of OCRed pages.
+    NATIVE_TEXT_FLAGS = fitz.TEXTFLAGS_TEXT & ~fitz.TEXT_PRESERVE_IMAGES
 
     @classmethod
     def get_skew_angle(cls, cv_image: np.ndarray) -> float:
@@ -79,15 +133,18 @@ class OCRUtil:
         return new_image
 
     @classmethod
-    def deskew(cls, cvImage: np.ndarray) -> np.ndarray:
+    def deskew(cls, cvImage: np.ndarray, timeout: float = 0) -> np.ndarray:
         """
         Function to deskew (straighten) the image using OpenCV.
         [Parameters]
             cvImage: np.ndarray -> The image to be processed.
+            timeout: float -> Seconds tesseract may take, 0 for no timeout.
         [Returns]
             np.ndarray: The deskewed image.
         """
-        results = pytesseract.image_to_osd(cvImage, output_type=Output.DICT)
+        results = pytesseract.image_to_osd(
+            cvImage, output_type=Output.DICT, timeout=timeout
+        )
         rotated = imutils.rotate_bound(cvImage, angle=results["rotate"])
         return rotated
         angle = cls.get_skew_angle(cvImage)
@@ -131,26 +188,64 @@ class OCRUtil:
         cv2.destroyAllWindows()
 
     @classmethod
-    def ocr(cls, pdf_file: bytes) -> str:
+    def remaining(cls, deadline: Optional[float]) -> Optional[float]:
         """
-        Function to convert PDF file to text using OCR.
+        Function to get the seconds left before a deadline.
         [Parameters]
-            pdf_file: bytes -> The PDF file to be processed.
+            deadline: Optional[float] -> time.monotonic() deadline, None for no deadline.
         [Returns]
-            str: The text extracted from the PDF file.
+            Optional[float]: Seconds left, None for no deadline.
         """
-        images = convert_from_bytes(pdf_file)
-        ocr_texts = []
+        if deadline is None:
+            return None
+        return deadline - time.monotonic()
 
-        for img in images:
+    @classmethod
+    def rasterize(
+        cls,
+        pdf: fitz.Document,
+        page_indexes: Optional[Iterable[int]] = None,
+        dpi: Optional[int] = None,
+    ) -> Iterator[Tuple[int, np.ndarray]]:
+        """
+        Function to render the pages of a PDF one at a time, so only one page image is held in
+        memory however long the document is.
+        [Parameters]
+            pdf: fitz.Document -> The opened PDF file.
+            page_indexes: Optional[Iterable[int]] -> Pages to be rendered, every page by default.
+            dpi: Optional[int] -> Resolution of the images, defaults to OCR_DPI.
+        [Returns]
+            Iterator[Tuple[int, np.ndarray]]: Page index and BGR image of every page.
+        """
+        dpi = dpi or config.OCR_DPI
+        for page_index in page_indexes if page_indexes is not None else range(len(pdf)):
+            pixmap = pdf[page_index].get_pixmap(dpi=dpi, colorspace=fitz.csRGB, alpha=False)
+            image = np.frombuffer(pixmap.samples, dtype=np.uint8).reshape(
+                pixmap.height, pixmap.width, pixmap.n
+            )
+            del pixmap
+            yield page_index, cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
+
+    @classmethod
+    def ocr_image(cls, cv2img: np.ndarray, deadline: Optional[float] = None) -> List[str]:
+        """
+        Function to extract the text blocks of a page image using OCR.
+        [Parameters]
+            cv2img: np.ndarray -> The BGR page image to be processed.
+            deadline: Optional[float] -> time.monotonic() deadline of the page, the blocks read
+                so far are returned when it passes.
+        [Returns]
+            List[str]: The texts of the blocks, in reading order.
+        """
+        ocr_texts = []
+        try:
             # Image preprocessing.
-            cv2img = cls.pil2cv(img)
-            cv2img = cls.deskew(cv2img)
-            original_image = cv2img.copy()
-            cv2img = cv2.cvtColor(cv2img, cv2.COLOR_BGR2GRAY)
+            # Every step returns a new image, the deskewed page is kept for cropping blocks
+            # without copying it.
+            original_image = cls.deskew(cv2img, timeout=cls.remaining(deadline) or 0)
+            cv2img = cv2.cvtColor(original_image, cv2.COLOR_BGR2GRAY)
             # cv2img = cv2.fastNlMeansDenoising(cv2img, None, 10, 7, 21)
 
-            copied_image = original_image.copy()
             ret, cv2img = cv2.threshold(
                 cv2img, 0, 255, cv2.THRESH_OTSU | cv2.THRESH_BINARY_INV
             )
@@ -178,59 +273,231 @@ class OCRUtil:
             # Combine contours into
             contours = contours_1 + contours_2
 
-            mask = np.zeros(original_image.shape, np.uint8)
             for cnt in contours:
                 x, y, w, h = cv2.boundingRect(cnt)
 
                 # Cropping the text block for giving input to OCR
-                cropped = copied_image[y : y + h, x : x + w]
+                cropped = original_image[y : y + h, x : x + w]
 
                 # Apply OCR on the cropped image
-                text = pytesseract.image_to_string(cropped, config="--oem 3 --psm 1")
+                remaining = cls.remaining(deadline)
+                if remaining is not None and remaining <= 0:
+                    raise RuntimeError("Tesseract process timeout")
+                text = pytesseract.image_to_string(
+                    cropped, config=cls.TESSERACT_CONFIG, timeout=remaining or 0
+                )
                 ocr_texts.append(text)
+        except RuntimeError as e:
+            # pytesseract kills tesseract and raises RuntimeError when the timeout passes.
+            if "timeout" not in str(e):
+                raise e
+            print("[OCR] Page timed out after {} blocks".format(len(ocr_texts)))
+        return ocr_texts
 
-                masked = cv2.drawContours(mask, [cnt], 0, (255, 255, 255), -1)
+    @classmethod
+    def ocr_image_tsv(cls, cv2img: np.ndarray, deadline: Optional[float] = None) -> List[str]:
+        """
+        Function to extract the text blocks of a page image with a single tesseract call. The
+        words are read with image_to_data and grouped into the blocks, paragraphs and lines found
+        by tesseract, and the blocks are put in reading order assuming up to 2 columns.
+        [Parameters]
+            cv2img: np.ndarray -> The BGR page image to be processed.
+            deadline: Optional[float] -> time.monotonic() deadline of the page, nothing is read
+                when it passes.
+        [Returns]
+            List[str]: The texts of the blocks, in reading order.
+        """
+        try:
+            cv2img = cls.deskew(cv2img, timeout=cls.remaining(deadline) or 0)
+            remaining = cls.remaining(deadline)
+            if remaining is not None and remaining <= 0:
+                raise RuntimeError("Tesseract process timeout")
+            data = pytesseract.image_to_data(
+                cv2img,
+                config=cls.TESSERACT_CONFIG,
+                output_type=Output.DICT,
+                timeout=remaining or 0,
+            )
+        except RuntimeError as e:
+            # pytesseract kills tesseract and raises RuntimeError when the timeout passes.
+            if "timeout" not in str(e):
+                raise e
+            print("[OCR] Page timed out")
+            return []
 
-            # OCRUtil.show_image(masked)
-            # plt.figure(figsize=(25, 15))
-            # plt.imshow(masked, cmap='gray')
-            # plt.show()
+        # Words of every block, by paragraph and line, and the top left corner of the blocks.
+        blocks = {}
+        for i, word in enumerate(data["text"]):
+            if not word.strip():
+                continue
+            block = blocks.setdefault(
+                data["block_num"][i],
+                {"left": data["left"][i], "top": data["top"][i], "lines": {}},
+            )
+            block["left"] = min(block["left"], data["left"][i])
+            block["top"] = min(block["top"], data["top"][i])
+            block["lines"].setdefault(
+                (data["par_num"][i], data["line_num"][i]), []
+            ).append((data["word_num"][i], word))
+
+        # Assume there are 2 columns in the PDF file.
+        # Read the blocks of the left column, then the right one, from top to bottom.
+        half_width = cv2img.shape[1] / 2
+        ordered = sorted(
+            blocks.values(), key=lambda b: (b["left"] >= half_width, b["top"])
+        )
+        return [
+            "\n".join(
+                " ".join(word for _, word in sorted(words))
+                for _, words in sorted(block["lines"].items())
+            )
+            for block in ordered
+        ]
+
+    @classmethod
+    def read_page(cls, cv2img: np.ndarray, deadline: Optional[float] = None) -> str:
+        """
+        Function to extract the text of a page image with the OCR mode configured by OCR_MODE.
+        The text is looked up in the OCR cache first.
+        [Parameters]
+            cv2img: np.ndarray -> The BGR page image to be processed.
+            deadline: Optional[float] -> time.monotonic() deadline of the page.
+        [Returns]
+            str: The text extracted from the page.
+        """
+        cache = get_ocr_cache()
+        if cache is not None:
+            key = cache.make_key(
+                cv2img, "{}::{}".format(config.OCR_MODE.lower(), cls.TESSERACT_CONFIG)
+            )
+            text = cache.get(key)
+            if text is not None:
+                return text
+
+        match config.OCR_MODE.lower():
+            case "tsv":
+                text = " ".join(cls.ocr_image_tsv(cv2img, deadline))
+            case "blocks":
+                text = " ".join(cls.ocr_image(cv2img, deadline))
+            case _:
+                raise ValueError("Unsupported OCR mode: {}".format(config.OCR_MODE))
+
+        # Pages cut short by the timeout are not cached.
+        remaining = cls.remaining(deadline)
+        if cache is not None and (remaining is None or remaining > 0):
+            cache.set(key, text)
+        return text
+
+    @classmethod
+    def ocr_page(
+        cls, pdf: fitz.Document, page_index: int, timeout: Optional[float] = None
+    ) -> str:
+        """
+        Function to render a page of a PDF and extract its text using OCR.
+        [Parameters]
+            pdf: fitz.Document -> The opened PDF file.
+            page_index: int -> Page index, starting from 0.
+            timeout: Optional[float] -> Seconds the OCR of the page may take.
+        [Returns]
+            str: The text extracted from the page.
+        """
+        _, image = next(cls.rasterize(pdf, [page_index]))
+        deadline = time.monotonic() + timeout if timeout else None
+        return cls.read_page(image, deadline)
 
-            # OCR.
-            # cv2img = cv2.cvtColor(cv2img, cv2.COLOR_BGR2RGB)
-            # ocr_text = pytesseract.image_to_string(cv2img)
-            # ocr_texts.append(ocr_text)
-        return " ".join(ocr_texts)
+    @classmethod
+    def ocr_pages(
+        cls,
+        pdf_file: bytes,
+        page_indexes: Optional[Iterable[int]] = None,
+        workers: Optional[int] = None,
+        page_timeout: Optional[float] = None,
+    ) -> List[str]:
+        """
+        Function to extract the text of pages of a PDF file using OCR. Pages are rendered and
+        OCRed one at a time, by a pool of processes when there are several workers.
+        [Parameters]
+            pdf_file: bytes -> The PDF file to be processed.
+            page_indexes: Optional[Iterable[int]] -> Pages to be OCRed, every page by default.
+            workers: Optional[int] -> Number of processes, defaults to OCR_WORKERS, 1 OCRs pages
+                in the current process.
+            page_timeout: Optional[float] -> Seconds the OCR of a page may take, defaults to
+                OCR_PAGE_TIMEOUT, 0 for no timeout.
+        [Returns]
+            List[str]: The text of every page, in the order of page_indexes.
+        """
+        workers = config.OCR_WORKERS if workers is None else workers
+        page_timeout = config.OCR_PAGE_TIMEOUT if page_timeout is None else page_timeout
+
+        with fitz.open(stream=pdf_file, filetype="pdf") as pdf:
+            page_indexes = list(page_indexes if page_indexes is not None else range(len(pdf)))
+
+            if min(workers, len(page_indexes)) > 1:
+                try:
+                    with ProcessPoolExecutor(
+                        max_workers=min(workers, len(page_indexes)),
+                        initializer=init_ocr_worker,
+                        initargs=(pdf_file,),
+                    ) as pool:
+                        return list(
+                            pool.map(
+                                ocr_worker_page,
+                                page_indexes,
+                                [page_timeout] * len(page_indexes),
+                            )
+                        )
+                except (AssertionError, BrokenProcessPool, OSError) as e:
+                    # e.g. daemonic processes are not allowed to have children.
+                    print("[OCR] Process pool unavailable, OCR runs serially: {}".format(e))
+
+            page_texts = []
+            for _, image in cls.rasterize(pdf, page_indexes):
+                deadline = time.monotonic() + page_timeout if page_timeout else None
+                page_texts.append(cls.read_page(image, deadline))
+            return page_texts
 
     @classmethod
-    def get_text_percentage(
-        self,
-        file_bytes: bytes,
-    ) -> float:
-        """
-        Calculate the percentage of document that is covered by (searchable) text.
-        If the returned percentage of text is very low, the document is
-        most likely a scanned PDF
+    def ocr(
+        cls,
+        pdf_file: bytes,
+        workers: Optional[int] = None,
+        page_timeout: Optional[float] = None,
+    ) -> str:
+        """
+        Function to convert PDF file to text using OCR, the texts of the pages are joined in
+        page order.
         [Parameters]
-            file_bytes: bytes -> The PDF file to be processed.
+            pdf_file: bytes -> The PDF file to be processed.
+            workers: Optional[int] -> Number of processes, defaults to OCR_WORKERS.
+            page_timeout: Optional[float] -> Seconds the OCR of a page may take, defaults to
+                OCR_PAGE_TIMEOUT.
         [Returns]
-            float: The percentage of text in the PDF file.
-        """
-        total_page_area = 0.0
-        total_text_area = 0.0
-
-        doc = fitz.open(stream=file_bytes, filetype="pdf")
-        for _, page in enumerate(doc):
-            total_page_area = total_page_area + abs(page.rect)
-            text_area = 0.0
-            for b in page.get_text_blocks():
-                r = fitz.Rect(b[:4])  # rectangle where block text appears
-                text_area = text_area + abs(r)
-            total_text_area = total_text_area + text_area
-        doc.close()
-        if total_page_area == total_text_area:
-            return OCRUtil.TEXT_PERCENTAGE_THRESHOLD - 0.0001
-        return total_text_area / total_page_area
+            str: The text extracted from the PDF file.
+        """
+        return " ".join(cls.ocr_pages(pdf_file, workers=workers, page_timeout=page_timeout))
+
+    @classmethod
+    def get_ocr_page_indexes(cls, parsed_document: ParsedDocument) -> List[int]:
+        """
+        Find the pages of a PDF that need OCR, i.e. pages with images whose text blocks cover
+        less than TEXT_PERCENTAGE_THRESHOLD of the page. Pages without text nor images are
+        blank and skipped.
+        [Parameters]
+            parsed_document: ParsedDocument -> The opened document.
+        [Returns]
+            List[int]: Indexes of the pages to be OCRed.
+        """
+        page_indexes = []
+        page_blocks = parsed_document.get_page_blocks()
+        for page_index, (page, blocks) in enumerate(zip(parsed_document.pdf, page_blocks)):
+            page_area = abs(page.rect)
+            # Block type 0 is text, 1 is image.
+            text_area = sum(abs(fitz.Rect(b[:4])) for b in blocks if b[6] == 0)
+            if page_area and text_area / page_area >= OCRUtil.TEXT_PERCENTAGE_THRESHOLD:
+                continue
+            if page.get_images():
+                page_indexes.append(page_index)
+        return page_indexes
 
 
 if __name__ == "__main__":
@@ -0,0 +1,107 @@
+import hashlib
+import logging
+from typing import Optional
+
+import numpy as np
+import pytesseract
+
+from core.config import config
+from core.helpers.kv_cache import KeyValueCacheBackend, create_kv_cache_backend
+
+logger = logging.getLogger(__name__)
+
+
+class OCRCache:
+    """
+    OCRCache stores the text of OCRed pages keyed by the tesseract version, the OCR settings and
+    the SHA-256 hash of the rendered page, so unchanged scans are never OCRed twice, e.g. when
+    documents are reindexed.
+
+    [Attributes]
+        backend: KeyValueCacheBackend -> Storage of the cached texts.
+        hits: int -> Number of lookups found in the cache.
+        misses: int -> Number of lookups not found in the cache.
+    """
+
+    key_prefix = "ocr"
+
+    def __init__(self, backend: KeyValueCacheBackend) -> None:
+        """
+        Constructor of OCRCache class.
+        """
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self._tesseract_version: Optional[str] = None
+
+    @classmethod
+    def from_config(cls) -> Optional["OCRCache"]:
+        """
+        Create the OCR cache configured by OCR_CACHE_BACKEND.
+        [Returns]
+            Optional[OCRCache]: The cache, or None when caching is disabled.
+        """
+        backend = create_kv_cache_backend(
+            config.OCR_CACHE_BACKEND,
+            ttl=config.OCR_CACHE_TTL,
+            path=config.OCR_CACHE_PATH,
+            table="ocr_pages",
+            max_entries=config.OCR_CACHE_MAX_ENTRIES,
+        )
+        return cls(backend) if backend is not None else None
+
+    @property
+    def tesseract_version(self) -> str:
+        """
+        Version of the installed tesseract, read once since it runs tesseract.
+        """
+        if self._tesseract_version is None:
+            self._tesseract_version = str(pytesseract.get_tesseract_version())
+        return self._tesseract_version
+
+    def make_key(self, image: np.ndarray, variant: str) -> str:
+        """
+        Build the cache key of a page image.
+        [Parameters]
+            image: np.ndarray -> Rendered page.
+            variant: str -> OCR settings, e.g. the OCR mode and the tesseract config string.
+        [Returns]
+            str: Cache key.
+        """
+        image_hash = hashlib.sha256(str(image.shape).encode("utf-8"))
+        image_hash.update(np.ascontiguousarray(image).data)
+        variant_digest = hashlib.sha256(variant.encode("utf-8")).hexdigest()[:16]
+        return "{}::{}::{}::{}".format(
+            self.key_prefix, self.tesseract_version, variant_digest, image_hash.hexdigest()
+        )
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Look up the text of a page.
+        [Parameters]
+            key: str -> Cache key.
+        [Returns]
+            Optional[str]: Cached text, None on miss.
+        """
+        try:
+            value = self.backend.get(key)
+        except Exception as e:
+            logger.warning("OCR cache lookup failed: %s", e)
+            value = None
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return value.decode("utf-8")
+
+    def set(self, key: str, text: str) -> None:
+        """
+        Store the text of a page.
+        [Parameters]
+            key: str -> Cache key.
+            text: str -> Text extracted from the page.
+        """
+        try:
+            self.backend.set(key, text.encode("utf-8"))
+        except Exception as e:
+            logger.warning("OCR cache store failed: %s", e)
@@ -0,0 +1,120 @@
+import mimetypes
+from typing import Dict, List, Optional
+
+import fitz
+import magic
+from tika import parser
+
+
+class ParsedDocument:
+    """
+    ParsedDocument holds a downloaded file together with the results of parsing it, so every step
+    of the pipeline (OCR detection, text extraction, domain extractors) can share them instead of
+    parsing the file again. The PDF is opened once and page texts are extracted once per set of
+    text flags.
+
+    [Attributes]
+        file_bytes: bytes -> Content of the file.
+        mimetype: str -> Mimetype of the file.
+        extension: str -> Extension of the file predicted from its mimetype.
+    """
+
+    def __init__(self, file_bytes: bytes) -> None:
+        """
+        Constructor of ParsedDocument class.
+        [Parameters]
+            file_bytes: bytes -> Content of the file.
+        """
+        self.file_bytes = file_bytes
+        self.mimetype = magic.from_buffer(file_bytes, mime=True)
+        self.extension = mimetypes.guess_extension(self.mimetype)
+        self._content: Optional[str] = None
+        self._pdf: Optional[fitz.Document] = None
+        self._pdf_bytes: Optional[bytes] = None
+        self._page_blocks: Optional[List[list]] = None
+        self._page_dicts: Dict[int, List[dict]] = {}
+        self._page_texts: Dict[int, List[str]] = {}
+
+    def __enter__(self) -> "ParsedDocument":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    @property
+    def content(self) -> str:
+        """
+        Text content of the file parsed by Tika.
+        """
+        if self._content is None:
+            self._content = parser.from_buffer(self.file_bytes)["content"] or ""
+        return self._content
+
+    @property
+    def pdf_bytes(self) -> bytes:
+        """
+        The file as PDF, .doc and .docx files are converted to PDF once.
+        """
+        if self._pdf_bytes is None:
+            if self.extension in [".doc", ".docx"]:
+                from app.extraction.converter import Converter
+
+                self._pdf_bytes = Converter().doc_to_pdf(self.file_bytes, self.extension)
+            else:
+                self._pdf_bytes = self.file_bytes
+        return self._pdf_bytes
+
+    @property
+    def pdf(self) -> fitz.Document:
+        """
+        The file opened with PyMuPDF.
+        """
+        if self._pdf is None:
+            self._pdf = fitz.open(stream=self.pdf_bytes, filetype="pdf")
+        return self._pdf
+
+    def get_page_blocks(self) -> List[list]:
+        """
+        Get the text blocks of every page.
+        [Returns]
+            List[list]: Text blocks of every page.
+        """
+        if self._page_blocks is None:
+            self._page_blocks = [page.get_text_blocks() for page in self.pdf]
+        return self._page_blocks
+
+    def get_page_dicts(self, flags: int) -> List[dict]:
+        """
+        Get the "dict" text representation of every page.
+        [Parameters]
+            flags: int -> PyMuPDF text extraction flags.
+        [Returns]
+            List[dict]: Text dictionary of every page.
+        """
+        if flags not in self._page_dicts:
+            self._page_dicts[flags] = [
+                page.get_text("dict", sort=False, flags=flags) for page in self.pdf
+            ]
+        return self._page_dicts[flags]
+
+    def get_page_texts(self, flags: int) -> List[str]:
+        """
+        Get the plain text of every page.
+        [Parameters]
+            flags: int -> PyMuPDF text extraction flags.
+        [Returns]
+            List[str]: Text of every page.
+        """
+        if flags not in self._page_texts:
+            self._page_texts[flags] = [
+                page.get_text("text", sort=False, flags=flags) for page in self.pdf
+            ]
+        return self._page_texts[flags]
+
+    def close(self) -> None:
+        """
+        Close the opened PDF.
+        """
+        if self._pdf is not None:
+            self._pdf.close()
+            self._pdf = None
@@ -0,0 +1,9 @@
+from app.registry.model_registry import ModelLoadStats, ModelRegistry
+
+model_registry = ModelRegistry()
+
+__all__ = [
+    "ModelLoadStats",
+    "ModelRegistry",
+    "model_registry",
+]
@@ -0,0 +1,163 @@
+import logging
+import os
+import resource
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Type
+
+from spacy.language import Language
+
+from app.classification import Classifier
+from app.extraction import InformationExtractor
+from app.extraction.base_extractor import BaseExtractor
+from app.search.services.text_encoding_manager import TextEncodingManager
+
+logger = logging.getLogger(__name__)
+
+
+def get_rss_bytes() -> int:
+    """
+    Get the current resident set size of this process.
+    [Returns]
+        int: Resident memory in bytes, falls back to peak RSS when /proc is unavailable.
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        # ru_maxrss is reported in kilobytes on Linux.
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+@dataclass
+class ModelLoadStats:
+    name: str
+    load_time: float
+    rss_before: int
+    rss_after: int
+
+    @property
+    def rss_delta(self) -> int:
+        return self.rss_after - self.rss_before
+
+
+class ModelRegistry:
+    """
+    ModelRegistry holds process-wide instances of the heavy models (sentence encoders, NER
+    pipelines, spaCy and the document classifier) so they are loaded once per process instead
+    of once per task.
+
+    [Attributes]
+        stats: Dict[str, ModelLoadStats] -> Load time and resident memory of each loaded model.
+    """
+
+    def __init__(self) -> None:
+        """
+        Constructor of ModelRegistry class.
+        """
+        self._models: Dict[str, Any] = {}
+        self._lock = threading.RLock()
+        self.stats: Dict[str, ModelLoadStats] = {}
+
+    def _get_or_load(self, name: str, loader: Callable[[], Any]) -> Any:
+        """
+        Get a model from the registry, loading and measuring it on first access.
+        [Parameters]
+            name: str -> Registry key of the model.
+            loader: Callable[[], Any] -> Function that loads the model.
+        [Returns]
+            Any: The loaded model.
+        """
+        if name in self._models:
+            return self._models[name]
+        with self._lock:
+            if name in self._models:
+                return self._models[name]
+            rss_before = get_rss_bytes()
+            start = time.perf_counter()
+            model = loader()
+            stats = ModelLoadStats(
+                name=name,
+                load_time=time.perf_counter() - start,
+                rss_before=rss_before,
+                rss_after=get_rss_bytes(),
+            )
+            self._models[name] = model
+            self.stats[name] = stats
+            logger.info(
+                "Loaded model %s in %.2fs, rss +%.1f MB (total %.1f MB)",
+                name,
+                stats.load_time,
+                stats.rss_delta / (1024 * 1024),
+                stats.rss_after / (1024 * 1024),
+            )
+            return model
+
+    def get_text_encoding_manager(self) -> TextEncodingManager:
+        """
+        Get the shared text encoding manager.
+        [Returns]
+            TextEncodingManager: Manager holding the sentence encoders of every domain.
+        """
+        return self._get_or_load("encoder", TextEncodingManager)
+
+    def get_extractor(self, domain: str = "general") -> InformationExtractor:
+        """
+        Get the shared information extractor (and its NER pipeline) of a domain.
+        [Parameters]
+            domain: str -> Extractor domain, unknown domains fall back to general.
+        [Returns]
+            InformationExtractor: Information extractor of the domain.
+        """
+        if domain not in InformationExtractor.extractor_mapping:
+            domain = "general"
+        return self._get_or_load(
+            f"ner:{domain}", lambda: InformationExtractor(domain=domain)
+        )
+
+    def get_spacy(self) -> Language:
+        """
+        Get the spaCy pipeline shared by all extractors.
+        [Returns]
+            Language: spaCy pipeline.
+        """
+        return self._get_or_load("spacy", BaseExtractor.get_nlp)
+
+    def get_classifier(self) -> Type[Classifier]:
+        """
+        Get the document classifier with its fitted models loaded.
+        [Returns]
+            Type[Classifier]: Classifier class.
+        """
+
+        def load() -> Type[Classifier]:
+            Classifier.load()
+            return Classifier
+
+        return self._get_or_load("classifier", load)
+
+    def warm_up(self) -> None:
+        """
+        Load every model used by the document pipeline.
+        """
+        self.get_spacy()
+        self.get_classifier()
+        for domain in InformationExtractor.extractor_mapping:
+            self.get_extractor(domain)
+        self.get_text_encoding_manager()
+
+    def report(self) -> Dict[str, dict]:
+        """
+        Get load time and resident memory of each loaded model.
+        [Returns]
+            Dict[str, dict]: Model statistics keyed by registry name.
+        """
+        return {
+            name: {
+                "load_time": stats.load_time,
+                "rss_delta": stats.rss_delta,
+                "rss_after": stats.rss_after,
+            }
+            for name, stats in self.stats.items()
+        }
@@ -3,6 +3,13 @@ from typing import List
 from app.document.enums.document import IndexingStatusEnum
 from app.document.models import Document
 from app.document.services import document_service
+from app.document.services.accessible_document import AccessibleDocumentService
+from app.elastic import EsClient
+from app.elastic.configuration import (
+    GENERAL_ELASTICSEARCH_INDEX_NAME,
+    RECRUITMENT_ELASTICSEARCH_INDEX_NAME,
+    SCIENTIFIC_ELASTICSEARCH_INDEX_NAME,
+)
 from app.repository.constants import GRANTABLE_ROLES
 from app.repository.schemas import (
     CreateRepositoryResponseSchema,
@@ -37,6 +44,7 @@ class RepositoryService:
     repository_repo = RepositoryRepo()
     document_index_repo = DocumentIndexRepo()
     document_repo = DocumentRepo()
+    accessible_document_service = AccessibleDocumentService()
 
     def __init__(self):
         ...
@@ -52,6 +60,7 @@ class RepositoryService:
             params={"name": name, "description": description, "is_public": is_public},
             role="Owner",
         )
+        await self.accessible_document_service.user_repositories_changed(user_id)
 
         return CreateRepositoryResponseSchema(
             name=name, description=description, is_public=is_public
@@ -160,8 +169,14 @@ class RepositoryService:
             if document.index.status != IndexingStatusEnum.SUCCESS
         ]
 
-        for document in documents:
-            await document_service.reindex(document)
+        # Imported here to avoid circular import.
+        from celery_app import start_bulk_document_pipeline
+
+        pipelines = [
+            await document_service.reindex(document, start_pipeline=False)
+            for document in documents
+        ]
+        start_bulk_document_pipeline(pipelines)
 
     async def get_repository_collaborators(
         self, user_id: int, repository_id: int
@@ -270,6 +285,9 @@ class RepositoryService:
             user_id=params["collaborator_id"],
             role=params["role"],
         )
+        await self.accessible_document_service.repository_member_added(
+            repository_id, params["collaborator_id"]
+        )
 
         user_repo = UserRepo()
         user = await user_repo.get_by_id(params["collaborator_id"])
@@ -325,6 +343,12 @@ class RepositoryService:
         await self.repository_repo.delete_user_repository(
             repository_id=repository_id, user_id=collaborator_id
         )
+        await document_service.sync_document_access_after_transaction(
+            await self.document_repo.get_document_ids_by_repository_id(repository_id)
+        )
+        await self.accessible_document_service.repository_member_removed(
+            repository_id, collaborator_id
+        )
 
     @Transactional()
     async def edit_repository_collaborator(
@@ -379,6 +403,30 @@ class RepositoryService:
         if not is_owner:
             raise UserNotAllowedException
 
+        # Delete all elasticsearch documents, public ones would otherwise stay searchable.
+        document_ids = await self.document_repo.get_document_ids_by_repository_id(
+            repository_id
+        )
+        # Members and document collaborators lose access, their cached sets are reloaded.
+        user_ids = {
+            collaborator.id
+            for collaborator in await self.repository_repo.get_repository_collaborators(
+                repository_id
+            )
+        }
+        for access in (await document_service.get_document_access(document_ids)).values():
+            user_ids.update(access["collaborator_ids"])
+        if document_ids:
+            EsClient.delete_by_query(
+                indices=[
+                    GENERAL_ELASTICSEARCH_INDEX_NAME,
+                    RECRUITMENT_ELASTICSEARCH_INDEX_NAME,
+                    SCIENTIFIC_ELASTICSEARCH_INDEX_NAME,
+                ],
+                query={"terms": {"document_id": document_ids}},
+            )
+        print("deleted elasticsearch documents")
+
         # Delete all document_indexes
         await self.document_index_repo.delete_by_repository_id(repository_id)
         print("deleted document_indexes")
@@ -400,3 +448,7 @@ class RepositoryService:
         # Delete repository
         await self.repository_repo.delete_by_id(repository_id)
         print("deleted repository")
+
+        await self.accessible_document_service.repository_deleted(
+            repository_id, document_ids, user_ids
+        )
@@ -6,6 +6,13 @@ DOMAIN_INDEXES = {
     DomainEnum.SCIENTIFIC: "scientific_index",
 }
 
+# Maximum number of Elasticsearch requests made to fill a page of a paginated search.
+MAX_PAGE_BATCHES = 10
+
+# Maximum number of hits a search paged by offset (knn and hybrid modes) reaches, every page
+# fetches the hits of the previous pages again.
+MAX_SEARCH_OFFSET = 1000
+
 FIELD_WEIGHTS = {
     DomainEnum.RECRUITMENT: [
         'preprocessed_text^1', 
@@ -1,4 +1,4 @@
-from typing import Any, List
+from typing import Any, List, Optional
 
 from pydantic import BaseModel, Field
 
@@ -12,10 +12,14 @@ class MatchedDocument(BaseModel):
     )
     title: str = Field(..., description="The title of the document")
     preprocessed_text: str = Field(
-        ..., description="Preprocessed content of the document"
+        "", description="Preprocessed content of the document, empty unless requested"
     )
     document_metadata: dict[Any, Any] = Field(
-        ..., description="Key value pair mappings of recognized extracted entities"
+        {},
+        description="Key value pair mappings of recognized extracted entities, only the requested keys",
+    )
+    preview: str = Field(
+        "", description="Fragments of the document text matching the search query"
     )
 
 
@@ -23,6 +27,9 @@ class SearchResult(BaseModel):
     result: List[MatchedDocument] = Field(
         ..., description="Collection of matched documents from ElasticSearch"
     )
+    next_cursor: Optional[str] = Field(
+        None, description="Cursor of the next page, None on the last page"
+    )
 
 
 class MatchedDocumentDepr(BaseModel):
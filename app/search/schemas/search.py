@@ -1,4 +1,4 @@
-from typing import List
+from typing import List, Optional
 
 from pydantic import BaseModel, Field
 
@@ -15,6 +15,12 @@ class SemanticSearchRequest(BaseModel):
     advanced_filter: AdvancedSearchQuery = Field(
         ..., description="Additional entity based filters"
     )
+    page_size: Optional[int] = Field(
+        None, ge=1, le=100, description="Number of results per page, every result when omitted"
+    )
+    cursor: Optional[str] = Field(
+        None, description="Cursor of the page returned with the previous page"
+    )
 
 class DocumentDetails(BaseModel):
     details: DocumentResponseSchema = Field(
@@ -27,8 +33,17 @@ class DocumentDetails(BaseModel):
     domain: str = Field(..., description="Document domain based on classification")
 
 class SemanticSearchResponseSchema(BaseModel):
-    num_docs_retrieved: int = Field(..., description="Number of matched documents")
+    num_docs_retrieved: int = Field(
+        ...,
+        description="Number of documents in this page, every matched document when page_size "
+        "is omitted",
+    )
     result: List[DocumentDetails] = Field(..., description="List of matched documents")
+    next_cursor: Optional[str] = Field(
+        None,
+        description="Cursor of the next page, null on the last page. In the knn and hybrid "
+        "search modes pages end after the first 1000 matches",
+    )
 
 class RepoSearchPathParams(BaseModel):
     repository_id: int = Field(..., description="Unique identifier of current repository")
@@ -36,6 +51,18 @@ class RepoSearchPathParams(BaseModel):
 class FileSearchPathParams(BaseModel):
     domain: DomainEnum = Field(..., description="Document domain of the search")
     repository_id: int = Field(..., description="Unique identifier of current repository")
+    page_size: Optional[int] = Field(
+        None, ge=1, le=100, description="Number of results per page, every result when omitted"
+    )
+    cursor: Optional[str] = Field(
+        None, description="Cursor of the page returned with the previous page"
+    )
 
 class PublicFileSearchPathParams(BaseModel):
     domain: DomainEnum = Field(..., description="Document domain of the search")
+    page_size: Optional[int] = Field(
+        None, ge=1, le=100, description="Number of results per page, every result when omitted"
+    )
+    cursor: Optional[str] = Field(
+        None, description="Cursor of the page returned with the previous page"
+    )
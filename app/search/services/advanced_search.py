@@ -3,7 +3,7 @@ from datetime import datetime
 from typing import List
 
 from app.search.constants.search import FIELD_WEIGHTS
-from app.elastic.client import ElasticsearchClient
+from app.elastic import AsyncEsClient, EsClient
 from app.search.enums.search import DomainEnum
 from app.search.schemas.advanced_search import AdvancedFilterConditions
 from app.search.schemas.elastic import MatchedDocument, SearchResult
@@ -339,7 +339,7 @@ class AdvancedSearchService:
             and self.eval_regex(filter.value, d.document_metadata.get(filter.key))
         ]
 
-    def evaluate_semantic_filter(
+    async def evaluate_semantic_filter(
         self,
         search_result: List[MatchedDocument],
         domain: DomainEnum,
@@ -354,17 +354,26 @@ class AdvancedSearchService:
           MatchedDocument
         """
         print("Flag 1")
-        data = ElasticsearchClient().search_semantic(
+        data = await AsyncEsClient.search_semantic(
             query=filter.value,
             index=f"{domain.value}-0001",
             size=filter.top_n,
-            source=["document_id", "title", "preprocessed_text", "document_metadata"],
+            source=["document_id", "title"],
             emb_vector=f'document_metadata.{filter.key}.text_vector',
-            doc_ids=[x.doc_id for x in search_result.result],
+            access_filter={"terms": {"document_id": [x.doc_id for x in search_result.result]}},
             fields=[f'document_metadata.{filter.key}.text^3'],
-            model=self.model
+            model=self.model,
+            # score_threshold is given on the keyword + cosine score scale, which fused hybrid
+            # scores do not follow.
+            mode="knn" if EsClient.search_mode() == "hybrid" else None,
         )
-        return self.normalize_search_result(data, filter.score_threshold).result
+        # Matches keep the preview and metadata retrieved by the main search.
+        documents = {d.doc_id: d for d in search_result.result}
+        return [
+            documents[d.doc_id]
+            for d in self.normalize_search_result(data, filter.score_threshold).result
+            if d.doc_id in documents
+        ]
     
     def preprocess_filter(self, value, source):
         pu = PreprocessUtil()
@@ -456,8 +465,6 @@ class AdvancedSearchService:
                 id=hit["_id"],
                 score=hit["_score"],
                 title=hit["_source"]["title"],
-                preprocessed_text=hit["_source"]["preprocessed_text"],
-                document_metadata=hit["_source"]["document_metadata"],
             )
             if (matched_document.score >= min_score):
                 search_result.result.append(matched_document)
@@ -0,0 +1,115 @@
+import hashlib
+import logging
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from core.config import config
+from core.helpers.kv_cache import KeyValueCacheBackend, create_kv_cache_backend
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingCache:
+    """
+    EmbeddingCache stores embeddings keyed by the encoder checkpoint and the SHA-256 hash of the
+    normalized input text, so unchanged texts are never encoded twice.
+
+    [Attributes]
+        backend: KeyValueCacheBackend -> Storage of the cached embeddings.
+        hits: int -> Number of lookups found in the cache.
+        misses: int -> Number of lookups not found in the cache.
+    """
+
+    key_prefix = "embedding"
+
+    def __init__(self, backend: KeyValueCacheBackend) -> None:
+        """
+        Constructor of EmbeddingCache class.
+        """
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_config(cls) -> Optional["EmbeddingCache"]:
+        """
+        Create the embedding cache configured by EMBEDDING_CACHE_BACKEND.
+        [Returns]
+            Optional[EmbeddingCache]: The cache, or None when caching is disabled.
+        """
+        backend = create_kv_cache_backend(
+            config.EMBEDDING_CACHE_BACKEND,
+            ttl=config.EMBEDDING_CACHE_TTL,
+            path=config.EMBEDDING_CACHE_PATH,
+            table="embeddings",
+            max_entries=config.EMBEDDING_CACHE_MAX_ENTRIES,
+        )
+        return cls(backend) if backend is not None else None
+
+    def make_key(self, checkpoint: str, text: str, variant: str = "") -> str:
+        """
+        Build the cache key of a text.
+        [Parameters]
+            checkpoint: str -> Encoder checkpoint id.
+            text: str -> Text to be encoded, whitespace is normalized before hashing.
+            variant: str -> Encoding mode, e.g. chunking parameters.
+        [Returns]
+            str: Cache key.
+        """
+        digest = hashlib.sha256(" ".join(text.split()).encode("utf-8")).hexdigest()
+        return f"{self.key_prefix}::{checkpoint}::{variant}::{digest}"
+
+    def get_many(self, keys: List[str], dims: int) -> List[Optional[np.ndarray]]:
+        """
+        Look up several embeddings.
+        [Parameters]
+            keys: List[str] -> Cache keys.
+            dims: int -> Embedding dimension, used to restore the array shape.
+        [Returns]
+            List[Optional[np.ndarray]]: Cached float32 arrays of shape (n, dims), None on miss.
+        """
+        try:
+            values = self.backend.get_many(keys)
+        except Exception as e:
+            logger.warning("Embedding cache lookup failed: %s", e)
+            values = [None] * len(keys)
+        results = [
+            np.frombuffer(value, dtype=np.float32).reshape(-1, dims) if value else None
+            for value in values
+        ]
+        hits = sum(result is not None for result in results)
+        self.hits += hits
+        self.misses += len(keys) - hits
+        return results
+
+    def set_many(self, values: Dict[str, np.ndarray]) -> None:
+        """
+        Store several embeddings.
+        [Parameters]
+            values: Dict[str, np.ndarray] -> Embeddings keyed by cache key.
+        """
+        if not values:
+            return
+        try:
+            self.backend.set_many(
+                {
+                    key: np.ascontiguousarray(value, dtype=np.float32).tobytes()
+                    for key, value in values.items()
+                }
+            )
+        except Exception as e:
+            logger.warning("Embedding cache store failed: %s", e)
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Get hit and miss counters of this process.
+        [Returns]
+            Dict[str, float]: Number of hits, misses and the hit ratio.
+        """
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / total if total else 0.0,
+        }
@@ -0,0 +1,234 @@
+import abc
+import os
+from typing import Dict, List, Optional
+
+import numpy as np
+import torch
+from filelock import FileLock
+from transformers import AutoModel, AutoTokenizer, PreTrainedModel
+
+from core.config import config
+
+# Fixed query set used to check that an optimized backend produces the same embeddings as
+# the reference torch backend.
+PARITY_QUERIES = [
+    "machine learning engineer with python and tensorflow experience",
+    "bachelor degree in computer science",
+    "deep learning for natural language processing",
+    "convolutional neural network image classification accuracy",
+    "project manager agile scrum certification",
+    "information retrieval using bert embeddings",
+    "data analyst sql tableau dashboard",
+    "reinforcement learning robotics control",
+    "frontend developer react typescript",
+    "survey of transformer models for text summarization",
+]
+
+
+class EncoderBackend(abc.ABC):
+    """
+    EncoderBackend runs a sentence encoder forward pass on padded model inputs.
+    """
+
+    name: str
+
+    @abc.abstractmethod
+    def run(self, encoded_input: Dict[str, np.ndarray]) -> np.ndarray:
+        """
+        Run the encoder.
+        [Parameters]
+          encoded_input: Dict[str, np.ndarray] -> Padded tokenizer output.
+        [Returns]
+          np.ndarray -> Token embeddings with shape (batch, sequence, hidden size).
+        """
+        ...
+
+
+class TorchEncoderBackend(EncoderBackend):
+    """
+    Eager PyTorch inference backend.
+    """
+
+    name = "torch"
+
+    def __init__(
+        self,
+        checkpoint: str,
+        model: Optional[PreTrainedModel] = None,
+        num_threads: int = 0,
+    ):
+        if num_threads:
+            torch.set_num_threads(num_threads)
+        self.model = model or AutoModel.from_pretrained(checkpoint)
+        self.model.eval()
+
+    def run(self, encoded_input: Dict[str, np.ndarray]) -> np.ndarray:
+        with torch.no_grad():
+            model_output = self.model(
+                **{key: torch.from_numpy(value) for key, value in encoded_input.items()}
+            )
+        return model_output[0].numpy()
+
+
+class OnnxEncoderBackend(EncoderBackend):
+    """
+    ONNX Runtime CPU inference backend. The checkpoint is exported to ONNX on first use, and
+    optionally quantized with dynamic int8 quantization.
+    """
+
+    def __init__(
+        self,
+        checkpoint: str,
+        export_dir: str,
+        quantize: bool = False,
+        num_threads: int = 0,
+    ):
+        import onnxruntime
+
+        self.name = "onnx-int8" if quantize else "onnx"
+        model_path = self.export(checkpoint, export_dir, quantize)
+        options = onnxruntime.SessionOptions()
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self.session = onnxruntime.InferenceSession(
+            model_path, options, providers=["CPUExecutionProvider"]
+        )
+        self.input_names = {model_input.name for model_input in self.session.get_inputs()}
+
+    @classmethod
+    def export(cls, checkpoint: str, export_dir: str, quantize: bool = False) -> str:
+        """
+        Export a checkpoint to ONNX if it has not been exported yet.
+        [Parameters]
+          checkpoint: str -> Hugging Face checkpoint id.
+          export_dir: str -> Directory of the exported models.
+          quantize: bool -> Whether to also produce a dynamically int8 quantized model.
+        [Returns]
+          str -> Path of the ONNX model to load.
+        """
+        model_dir = os.path.join(export_dir, checkpoint.replace("/", "__"))
+        fp32_path = os.path.join(model_dir, "model.onnx")
+        int8_path = os.path.join(model_dir, "model-int8.onnx")
+        model_path = int8_path if quantize else fp32_path
+        # Models are moved into place once complete, an existing file is never partially
+        # written.
+        if os.path.exists(model_path):
+            return model_path
+
+        os.makedirs(model_dir, exist_ok=True)
+        # Worker processes warming up together export once, the others wait and reuse the model.
+        with FileLock(os.path.join(model_dir, "export.lock")):
+            if not os.path.exists(fp32_path):
+                model = AutoModel.from_pretrained(checkpoint)
+                model.eval()
+                dummy_input = (
+                    torch.ones((1, 8), dtype=torch.long),
+                    torch.ones((1, 8), dtype=torch.long),
+                )
+                dynamic_axes = {0: "batch", 1: "sequence"}
+                torch.onnx.export(
+                    model,
+                    dummy_input,
+                    fp32_path + ".tmp",
+                    input_names=["input_ids", "attention_mask"],
+                    output_names=["last_hidden_state"],
+                    dynamic_axes={
+                        "input_ids": dynamic_axes,
+                        "attention_mask": dynamic_axes,
+                        "last_hidden_state": dynamic_axes,
+                    },
+                    opset_version=14,
+                )
+                del model
+                os.replace(fp32_path + ".tmp", fp32_path)
+
+            if quantize and not os.path.exists(int8_path):
+                from onnxruntime.quantization import QuantType, quantize_dynamic
+
+                quantize_dynamic(fp32_path, int8_path + ".tmp", weight_type=QuantType.QInt8)
+                os.replace(int8_path + ".tmp", int8_path)
+        return model_path
+
+    def run(self, encoded_input: Dict[str, np.ndarray]) -> np.ndarray:
+        return self.session.run(
+            None,
+            {
+                key: value.astype(np.int64)
+                for key, value in encoded_input.items()
+                if key in self.input_names
+            },
+        )[0]
+
+
+def create_encoder_backend(
+    checkpoint: str,
+    backend: str = None,
+    model: Optional[PreTrainedModel] = None,
+) -> EncoderBackend:
+    """
+    Create the inference backend configured by TEXT_ENCODING_BACKEND.
+    [Parameters]
+      checkpoint: str -> Hugging Face checkpoint id.
+      backend: str -> Backend name (torch or onnx), defaults to TEXT_ENCODING_BACKEND.
+      model: Optional[PreTrainedModel] -> Already loaded model, only used by the torch backend.
+    [Returns]
+      EncoderBackend -> Inference backend.
+    """
+    backend = (backend or config.TEXT_ENCODING_BACKEND).lower()
+    if backend == "onnx":
+        return OnnxEncoderBackend(
+            checkpoint,
+            export_dir=config.TEXT_ENCODING_ONNX_PATH,
+            quantize=config.TEXT_ENCODING_QUANTIZE,
+            num_threads=config.TEXT_ENCODING_NUM_THREADS,
+        )
+    return TorchEncoderBackend(
+        checkpoint, model=model, num_threads=config.TEXT_ENCODING_NUM_THREADS
+    )
+
+
+def check_backend_parity(
+    domain: str = "general",
+    backend: Optional[EncoderBackend] = None,
+    queries: List[str] = PARITY_QUERIES,
+    threshold: float = 0.99,
+) -> dict:
+    """
+    Compare the embeddings of a backend against the torch backend on a fixed query set.
+    [Parameters]
+      domain: str -> Domain of the encoder to be checked.
+      backend: Optional[EncoderBackend] -> Backend to be checked, defaults to the configured one.
+      queries: List[str] -> Queries to be encoded.
+      threshold: float -> Minimum cosine similarity required for every query.
+    [Returns]
+      dict -> Minimum and mean cosine similarity, and whether the backend passed.
+    """
+    from app.search.services.text_encoding import TextEncodingService
+
+    checkpoint = TextEncodingService.encoder_mapping[domain]
+    tokenizer = AutoTokenizer.from_pretrained(TextEncodingService.tokenizer_checkpoint)
+    reference = TextEncodingService(
+        domain, tokenizer=tokenizer, backend=TorchEncoderBackend(checkpoint)
+    )
+    candidate = TextEncodingService(
+        domain,
+        tokenizer=tokenizer,
+        backend=backend or create_encoder_backend(checkpoint),
+    )
+    # Embeddings are L2-normalized, so the dot product is the cosine similarity.
+    similarities = np.sum(
+        reference.encode_batch(queries) * candidate.encode_batch(queries), axis=1
+    )
+    return {
+        "backend": candidate.backend.name,
+        "min_similarity": float(similarities.min()),
+        "mean_similarity": float(similarities.mean()),
+        "passed": bool(similarities.min() >= threshold),
+    }
+
+
+if __name__ == "__main__":
+    from app.search.services.text_encoding import TextEncodingService
+
+    for domain in TextEncodingService.encoder_mapping:
+        print(domain, check_backend_parity(domain))
@@ -1,29 +1,39 @@
+import base64
+import binascii
+import hashlib
+import hmac
 import json
+import math
 import magic
 import mimetypes
 import re
 import statistics
-from typing import List
+from typing import List, Optional, Tuple
 from binascii import a2b_base64, b2a_base64
 from fastapi import UploadFile
 from tika import parser
 
-from app.search.constants.search import FIELD_WEIGHTS
+from app.search.constants.search import FIELD_WEIGHTS, MAX_PAGE_BATCHES, MAX_SEARCH_OFFSET
 from app.search.enums.search import DomainEnum, FilterOperatorEnum
 from app.search.schemas.advanced_search import AdvancedFilterConditions
 from app.search.schemas.elastic import MatchedDocument, SearchResult
+from app.search.schemas.search import DocumentDetails, SemanticSearchResponseSchema
 from app.search.schemas.advanced_search import AdvancedFilterConditions
 from app.search.services.advanced_search import AdvancedSearchService
 from app.search.services.query_expansion import QueryExpansionService
 # from app.search.services.text_encoding import TextEncodingService
 from app.search.services.text_encoding_manager import TextEncodingManager
-from app.elastic.client import ElasticsearchClient
+from app.elastic import AsyncEsClient, EsClient
 from app.preprocess import PreprocessUtil
 from app.document.schemas.document import DocumentResponseSchema
+from app.document.services import document_service
 from app.elastic.configuration import (
     RECRUITMENT_ELASTICSEARCH_INDEX_NAME,
     SCIENTIFIC_ELASTICSEARCH_INDEX_NAME
 )
+from core.config import config
+from core.exceptions import InvalidSearchCursorException, NotFoundException
+from core.helpers.executor import inference_executor
 
 class SearchService:
 
@@ -61,9 +71,40 @@ class SearchService:
             query = self.scientific_expander.expansion_method[expansion_method](query)
         return " ".join(PreprocessUtil().preprocess(query))
 
-    def normalize_search_result(self, data, min_score=5):
+    def matched_document(self, hit) -> MatchedDocument:
+        return MatchedDocument(
+            doc_id=hit["_source"]["document_id"],
+            id=hit["_id"],
+            score=hit["_score"],
+            title=hit["_source"]["title"],
+            document_metadata=hit["_source"].get("document_metadata", {}),
+            preview=" ... ".join(hit.get("highlight", {}).get("preprocessed_text", [])),
+        )
+
+    def search_source(self, advanced_filter=None) -> List[str]:
+        """
+        Fields of the retrieved documents to be returned by Elasticsearch, the preview comes
+        from highlighting so only the metadata keys referenced by the advanced filters are needed
+        [Parameters]
+          advanced_filter: Optional[AdvancedSearchQuery]
+        [Returns]
+          List[str]: Source fields
+        """
+        source = ["document_id", "title"]
+        if advanced_filter is not None:
+            source += sorted(
+                {
+                    f"document_metadata.{filter.key}"
+                    for filter in advanced_filter.match
+                    # The semantic filter runs its own search on the metadata key.
+                    if filter.operator != FilterOperatorEnum.SEM
+                }
+            )
+        return source
+
+    def normalize_search_result(self, data, min_score=5, relative=True):
         scores = [hit["_score"] for hit in data["hits"]["hits"]]
-        if (len(data["hits"]["hits"]) >= 2):
+        if relative and (len(data["hits"]["hits"]) >= 2):
             stdev = statistics.stdev(scores)
             mean = statistics.mean(scores)
             maximum = max(scores)
@@ -72,14 +113,7 @@ class SearchService:
         
         search_result = SearchResult(result=[])
         for hit in data["hits"]["hits"]:
-            matched_document = MatchedDocument(
-                doc_id=hit["_source"]["document_id"],
-                id=hit["_id"],
-                score=hit["_score"],
-                title=hit["_source"]["title"],
-                preprocessed_text=hit["_source"]["preprocessed_text"],
-                document_metadata=hit["_source"]["document_metadata"],
-            )
+            matched_document = self.matched_document(hit)
             if (matched_document.score >= min_score):
                 search_result.result.append(matched_document)
             
@@ -90,8 +124,8 @@ class SearchService:
             print('---------------------------')
         return search_result
 
-    def elastic_keyword_search(
-        self, query: str, domain: DomainEnum, doc_ids: List[int]
+    async def elastic_keyword_search(
+        self, query: str, domain: DomainEnum, access_filter: dict, advanced_filter=None
     ):
         """
         Executes first part of search, calls elastic search to perform keyword based search
@@ -101,21 +135,228 @@ class SearchService:
           - ElasticSearchResult
         """
         model = self.text_encoding_manager.get_encoder(domain)
-        data = ElasticsearchClient().search_semantic(
+        data = await AsyncEsClient.search_semantic(
             query=query,
             index=f"{domain.value}-0001",
             size=1000,
-            source=["document_id", "title", "preprocessed_text", "document_metadata"],
+            source=self.search_source(advanced_filter),
             emb_vector="text_vector",
-            doc_ids=doc_ids,
+            access_filter=access_filter,
             fields=FIELD_WEIGHTS.get(domain),
-            model=model
+            model=model,
+            chunk_path="text_chunks",
+            highlight=EsClient.preview_highlight("preprocessed_text"),
         )
         if query == "":
             return self.normalize_search_result(data, min_score=0)    
+        if EsClient.search_mode() == "hybrid":
+            # Fused scores are not comparable with the keyword + cosine score thresholds, the
+            # candidate lists are already limited to the best matches of each retriever.
+            return self.normalize_search_result(data, min_score=0, relative=False)
         return self.normalize_search_result(data)
 
-    def evaluate_advanced_filter(self, search_result, domain, advanced_filter):
+    @staticmethod
+    def sign_cursor(payload: bytes) -> bytes:
+        return hmac.new(
+            config.JWT_SECRET_KEY.encode("utf-8"), b"search-cursor:" + payload, hashlib.sha256
+        ).digest()
+
+    @classmethod
+    def encode_cursor(cls, state: dict) -> str:
+        """
+        Encodes the pagination state of elastic_search_page into an opaque cursor, signed so
+        clients cannot change it.
+        [Parameters]
+          state: dict -> Pagination state
+        [Returns]
+          str: Cursor
+        """
+        payload = json.dumps(state, separators=(",", ":")).encode("utf-8")
+        return "{}.{}".format(
+            base64.urlsafe_b64encode(payload).decode("utf-8"),
+            base64.urlsafe_b64encode(cls.sign_cursor(payload)).decode("utf-8"),
+        )
+
+    @classmethod
+    def decode_cursor(cls, cursor: str, key: str) -> dict:
+        """
+        Decodes a cursor returned by elastic_search_page
+        [Parameters]
+          cursor: str -> Opaque cursor
+          key: str -> Key of the search the cursor must belong to
+        [Returns]
+          dict: Pagination state
+        """
+        try:
+            payload, signature = cursor.split(".")
+            payload = base64.urlsafe_b64decode(payload.encode("utf-8"))
+            signature = base64.urlsafe_b64decode(signature.encode("utf-8"))
+        except (ValueError, binascii.Error):
+            raise InvalidSearchCursorException
+        if not hmac.compare_digest(signature, cls.sign_cursor(payload)):
+            raise InvalidSearchCursorException
+        try:
+            state = json.loads(payload)
+        except ValueError:
+            raise InvalidSearchCursorException
+        if not cls.is_valid_cursor_state(state) or state["key"] != key:
+            raise InvalidSearchCursorException
+        return state
+
+    @staticmethod
+    def is_valid_cursor_state(state) -> bool:
+        """
+        Checks the fields of a decoded pagination state.
+        [Parameters]
+          state: Any -> Decoded pagination state
+        [Returns]
+          bool: Whether the state can be used by elastic_search_page
+        """
+
+        def is_number(value) -> bool:
+            return (
+                isinstance(value, (int, float))
+                and not isinstance(value, bool)
+                and math.isfinite(value)
+            )
+
+        if not isinstance(state, dict):
+            return False
+        if set(state) - {"key", "pit", "offset", "min_score", "search_after"}:
+            return False
+        if not isinstance(state.get("key"), str):
+            return False
+        if "pit" in state and not isinstance(state["pit"], str):
+            return False
+        offset = state.get("offset", 0)
+        if not (isinstance(offset, int) and not isinstance(offset, bool)):
+            return False
+        if not 0 <= offset <= MAX_SEARCH_OFFSET:
+            return False
+        if "min_score" in state and not is_number(state["min_score"]):
+            return False
+        search_after = state.get("search_after")
+        if search_after is not None and not (
+            isinstance(search_after, list)
+            and len(search_after) == 2
+            and all(is_number(value) for value in search_after)
+        ):
+            return False
+        return True
+
+    async def elastic_search_page(
+        self,
+        query: str,
+        domain: DomainEnum,
+        access_filter: dict,
+        advanced_filter=None,
+        page_size: int = 10,
+        cursor: Optional[str] = None,
+    ) -> SearchResult:
+        """
+        Paginated counterpart of elastic_keyword_search followed by evaluate_advanced_filter, only
+        the hits of the requested page are fetched instead of the best 1000. In the script_score
+        mode pages are read from a point in time of the index with search_after, the knn and
+        hybrid modes retrieve a bounded number of candidates so their pages are read by offset,
+        up to MAX_SEARCH_OFFSET hits since every page fetches the previous ones again.
+        The score threshold of normalize_search_result is computed once, from the scores of
+        every match, and kept in the cursor. When advanced filters drop hits more hits are
+        fetched, up to MAX_PAGE_BATCHES requests, so a page can hold fewer documents than
+        page_size and still be followed by a next page.
+        [Parameters]
+          query: str -> Preprocessed query
+          domain: DomainEnum -> Document domain of the search
+          access_filter: dict -> Filter clause of the documents that can be retrieved
+          advanced_filter: Optional[AdvancedSearchQuery] -> Entity based filters
+          page_size: int -> Number of documents per page
+          cursor: Optional[str] -> Cursor returned with the previous page, None for the first page
+        [Returns]
+          SearchResult: Documents of the page and the cursor of the next page
+        """
+        key = hashlib.sha1(
+            json.dumps(
+                [query, domain.value, advanced_filter.json() if advanced_filter else None]
+            ).encode("utf-8")
+        ).hexdigest()
+        state = self.decode_cursor(cursor, key) if cursor else {"key": key}
+
+        index = f"{domain.value}-0001"
+        mode = EsClient.search_mode()
+        by_offset = query != "" and mode != "script_score"
+        # Same thresholds as elastic_keyword_search.
+        relative = query == "" or mode != "hybrid"
+        floor = 0 if query == "" or mode == "hybrid" else 5
+
+        result = []
+        exhausted = True
+        for _ in range(MAX_PAGE_BATCHES):
+            first = "min_score" not in state
+            if not by_offset and "pit" not in state:
+                state["pit"] = await AsyncEsClient.open_point_in_time(index)
+            offset = state.get("offset", 0) if by_offset else 0
+            if offset >= MAX_SEARCH_OFFSET:
+                exhausted = True
+                break
+            try:
+                data = await AsyncEsClient.search_semantic(
+                    query=query,
+                    index=index,
+                    size=min(offset + page_size, MAX_SEARCH_OFFSET),
+                    source=self.search_source(advanced_filter),
+                    emb_vector="text_vector",
+                    access_filter=access_filter,
+                    fields=FIELD_WEIGHTS.get(domain),
+                    model=self.text_encoding_manager.get_encoder(domain),
+                    chunk_path="text_chunks",
+                    pit_id=state.get("pit"),
+                    search_after=state.get("search_after"),
+                    aggs={"score": {"stats": {"script": "_score"}}}
+                    if first and relative
+                    else None,
+                    highlight=EsClient.preview_highlight("preprocessed_text"),
+                )
+            except NotFoundException:
+                # The point in time of the cursor expired.
+                raise InvalidSearchCursorException
+            hits = data["hits"]["hits"][offset:]
+            if "pit_id" in data:
+                state["pit"] = data["pit_id"]
+            if first:
+                stats = data.get("aggregations", {}).get("score", {})
+                state["min_score"] = floor
+                if relative and stats.get("count", 0) >= 2:
+                    state["min_score"] = max(floor, stats["avg"])
+
+            # Hits are sorted by score, the first one under the threshold ends the search.
+            passing = [hit for hit in hits if hit["_score"] >= state["min_score"]]
+            exhausted = len(hits) < page_size or len(passing) < len(hits)
+            if not passing:
+                break
+
+            batch = SearchResult(result=[self.matched_document(hit) for hit in passing])
+            if advanced_filter is not None:
+                batch = await self.evaluate_advanced_filter(batch, domain, advanced_filter)
+            kept = {document.id: document for document in batch.result}
+
+            for position, hit in enumerate(passing):
+                if hit["_id"] in kept:
+                    result.append(kept[hit["_id"]])
+                if len(result) == page_size:
+                    break
+            state["offset"] = offset + position + 1
+            state["search_after"] = passing[position].get("sort")
+            if position < len(passing) - 1:
+                exhausted = False
+            if len(result) == page_size or exhausted:
+                break
+
+        if exhausted and state.get("pit"):
+            await AsyncEsClient.close_point_in_time(state["pit"])
+        return SearchResult(
+            result=result, next_cursor=None if exhausted else self.encode_cursor(state)
+        )
+
+    async def evaluate_advanced_filter(self, search_result, domain, advanced_filter):
         """
         Executes second part of search, filtering retrieved documents based on entity filters
         [Parameters]
@@ -128,13 +369,13 @@ class SearchService:
         # Evaluate advanced filters
         if bool(advanced_filter.match):
             for filter in advanced_filter.match:
-                advanced_search_result.result = self.evaluate_filter(
+                advanced_search_result.result = await self.evaluate_filter(
                     advanced_search_result, domain, filter
                 )
 
         return advanced_search_result
 
-    def evaluate_filter(
+    async def evaluate_filter(
         self,
         search_result: List[MatchedDocument],
         domain: DomainEnum,
@@ -194,45 +435,113 @@ class SearchService:
                     search_result, filter
                 )
             case FilterOperatorEnum.SEM:
-                return AdvancedSearchService(model=self.text_encoding_manager.get_encoder(domain)).evaluate_semantic_filter(
+                return await AdvancedSearchService(model=self.text_encoding_manager.get_encoder(domain)).evaluate_semantic_filter(
                     search_result, domain, filter
                 )
             case _:
                 print("No operator match found")
         return search_result
 
-    def run_file_search(self, file: UploadFile, domain: DomainEnum, doc_ids: List[int]):
+    async def run_file_search(
+        self,
+        file: UploadFile,
+        domain: DomainEnum,
+        access_filter: dict,
+        page_size: Optional[int] = None,
+        cursor: Optional[str] = None,
+    ) -> Tuple[List[dict], Optional[str]]:
         file.file.seek(0)
 
-        processed_query = self.parsing(
+        processed_query = await inference_executor.run(
+            self.parsing,
             file_content_str=b2a_base64(file.file.read()).decode("utf-8"),
         )
-        search_result = self.elastic_keyword_search(processed_query, domain, doc_ids)
+        if page_size is None:
+            search_result = await self.elastic_keyword_search(
+                processed_query, domain, access_filter
+            )
+        else:
+            search_result = await self.elastic_search_page(
+                processed_query, domain, access_filter, None, page_size, cursor
+            )
 
         retrieved_doc_ids = [
-            {"id": x.doc_id, "text": x.preprocessed_text[0:230]}
+            {"id": x.doc_id, "text": x.preview}
             for x in search_result.result
         ]
-        return retrieved_doc_ids
+        return retrieved_doc_ids, search_result.next_cursor
 
-    def run_search(self, query, domain, advanced_filter, doc_ids):
+    async def run_search(
+        self,
+        query,
+        domain,
+        advanced_filter,
+        access_filter,
+        page_size: Optional[int] = None,
+        cursor: Optional[str] = None,
+    ) -> Tuple[List[dict], Optional[str]]:
         """
         Calls query preprocessing, keyword search, and advanced filter methods
         [Parameters]
+          page_size: Optional[int] -> Number of documents per page, every document when None
+          cursor: Optional[str] -> Cursor of the page, None for the first page
         [Returns]
-          response: SemanticSearchResponse
+          Tuple[List[dict], Optional[str]]: Retrieved documents and the cursor of the next page
         """
-        processed_query = self.preprocess_query(query, domain)
-        search_result = self.elastic_keyword_search(processed_query, domain, doc_ids)
-        search_result = self.evaluate_advanced_filter(
-            search_result, domain, advanced_filter
-        )
+        processed_query = await inference_executor.run(self.preprocess_query, query, domain)
+        if page_size is None:
+            search_result = await self.elastic_keyword_search(
+                processed_query, domain, access_filter, advanced_filter
+            )
+            search_result = await self.evaluate_advanced_filter(
+                search_result, domain, advanced_filter
+            )
+        else:
+            search_result = await self.elastic_search_page(
+                processed_query, domain, access_filter, advanced_filter, page_size, cursor
+            )
 
         retrieved_doc_ids = [
-            {"id": x.doc_id, "text": x.preprocessed_text[0:230]}
+            {"id": x.doc_id, "text": x.preview}
             for x in search_result.result
         ]
-        return retrieved_doc_ids
+        return retrieved_doc_ids, search_result.next_cursor
+
+    async def build_search_response(
+        self,
+        result: List[dict],
+        highlights: List[str],
+        next_cursor: Optional[str] = None,
+    ) -> SemanticSearchResponseSchema:
+        """
+        Hydrates search results with their document details from the database in one query,
+        keeping the search rank order.
+        [Parameters]
+            result: List[dict] -> Ranked results of run_search or run_file_search.
+            highlights: List[str] -> Texts highlighted in every preview, computed once per query.
+            next_cursor: Optional[str] = None -> Cursor of the next page.
+        [Returns]
+            SemanticSearchResponseSchema -> Documents of the page, their number, and the cursor
+                of the next page.
+        """
+        documents = await document_service.get_ranked_documents(
+            [doc.get("id") for doc in result]
+        )
+        previews = {doc.get("id"): doc.get("text") for doc in result}
+
+        return SemanticSearchResponseSchema(
+            num_docs_retrieved=len(documents),
+            result=[
+                DocumentDetails(
+                    details=document.__dict__,
+                    preview=f"...{previews[document.id]}...",
+                    highlights=highlights,
+                    domain=self.get_document_category(document),
+                )
+                for document in documents
+            ],
+            next_cursor=next_cursor,
+        )
 
     def parsing(self, file_content_str: str, with_ocr: bool = True):
         """
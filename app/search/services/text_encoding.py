@@ -1,7 +1,11 @@
+from typing import List, Optional, Tuple
+
+import numpy as np
 from sentence_transformers import SentenceTransformer
-from transformers import AutoTokenizer, AutoModel
-import torch
-import torch.nn.functional as F
+from transformers import AutoConfig, AutoTokenizer, PreTrainedModel, PreTrainedTokenizerBase
+
+from app.search.services.embedding_cache import EmbeddingCache
+from app.search.services.encoder_backend import EncoderBackend, create_encoder_backend
 
 class TextEncodingService:
 
@@ -10,26 +14,143 @@ class TextEncodingService:
         "scientific": "salsabiilashifa11/sbert-paper",
         "recruitment": "salsabiilashifa11/sbert-paper",
     }
+    tokenizer_checkpoint = 'sentence-transformers/all-mpnet-base-v2'
+    chunk_size = 512
+    chunk_overlap = 128
 
-    def __init__(self, domain: str = "general"):
+    def __init__(
+        self,
+        domain: str = "general",
+        encoder: Optional[PreTrainedModel] = None,
+        tokenizer: Optional[PreTrainedTokenizerBase] = None,
+        cache: Optional[EmbeddingCache] = None,
+        backend: Optional[EncoderBackend] = None,
+    ):
         """
         Constructor of TextEncodingService class
+        [Parameters]
+          domain: str -> Domain of the encoder, unknown domains fall back to general.
+          encoder: Optional[PreTrainedModel] -> Already loaded model of the domain checkpoint.
+          tokenizer: Optional[PreTrainedTokenizerBase] -> Already loaded tokenizer.
+          cache: Optional[EmbeddingCache] -> Cache looked up before running the model.
+          backend: Optional[EncoderBackend] -> Inference backend, defaults to the one configured
+            by TEXT_ENCODING_BACKEND.
         """
         if domain not in self.encoder_mapping:
             domain = "general"
 
-        self.encoder = AutoModel.from_pretrained(self.encoder_mapping[domain])
-        self.tokenizer = AutoTokenizer.from_pretrained('sentence-transformers/all-mpnet-base-v2')
-        
-    def mean_pooling(self, model_output, attention_mask):
-        token_embeddings = model_output[0] #First element of model_output contains all token embeddings
-        input_mask_expanded = attention_mask.unsqueeze(-1).expand(token_embeddings.size()).float()
-        return torch.sum(token_embeddings * input_mask_expanded, 1) / torch.clamp(input_mask_expanded.sum(1), min=1e-9)
+        self.checkpoint = self.encoder_mapping[domain]
+        self.backend = backend or create_encoder_backend(self.checkpoint, model=encoder)
+        self.hidden_size = AutoConfig.from_pretrained(self.checkpoint).hidden_size
+        self.tokenizer = tokenizer or AutoTokenizer.from_pretrained(self.tokenizer_checkpoint)
+        self.cache = cache
+        # Backends may produce slightly different vectors, so they do not share cache entries.
+        self.cache_namespace = f"{self.checkpoint}:{self.backend.name}"
+
+    def mean_pooling(self, token_embeddings: np.ndarray, attention_mask: np.ndarray) -> np.ndarray:
+        input_mask_expanded = attention_mask[..., np.newaxis].astype(np.float32)
+        return np.sum(token_embeddings * input_mask_expanded, 1) / np.clip(input_mask_expanded.sum(1), 1e-9, None)
 
     def encode(self, query: str):
-        encoded_input = self.tokenizer([query], padding=True, truncation=True, return_tensors='pt')
-        with torch.no_grad():
-            model_output = self.encoder(**encoded_input)
-        sentence_embeddings = self.mean_pooling(model_output, encoded_input['attention_mask'])
-        sentence_embeddings = F.normalize(sentence_embeddings, p=2, dim=1)
-        return sentence_embeddings[0].numpy().tolist()
+        return self.encode_batch([query])[0].tolist()
+
+    def encode_batch(self, texts: List[str], batch_size: int = 32) -> np.ndarray:
+        """
+        Encode several texts using batched inference. Texts are sorted by token length so
+        each batch is only padded to its own longest text.
+        [Parameters]
+          texts: List[str] -> Texts to be encoded.
+          batch_size: int -> Maximum number of texts per forward pass.
+        [Returns]
+          np.ndarray -> L2-normalized float32 embeddings with shape (len(texts), hidden size).
+        """
+        dims = self.hidden_size
+        if not texts:
+            return np.zeros((0, dims), dtype=np.float32)
+        if not self.cache:
+            return self.encode_tokenized(self.tokenizer(list(texts), truncation=True), batch_size)
+
+        keys = [self.cache.make_key(self.cache_namespace, text) for text in texts]
+        cached = self.cache.get_many(keys, dims)
+        embeddings = np.zeros((len(texts), dims), dtype=np.float32)
+        missing = []
+        for i, value in enumerate(cached):
+            if value is None:
+                missing.append(i)
+            else:
+                embeddings[i] = value[0]
+        if missing:
+            encoded_texts = self.tokenizer([texts[i] for i in missing], truncation=True)
+            embeddings[missing] = self.encode_tokenized(encoded_texts, batch_size)
+            self.cache.set_many({keys[i]: embeddings[i] for i in missing})
+        return embeddings
+
+    def encode_chunked(
+        self,
+        text: str,
+        chunk_size: int = None,
+        chunk_overlap: int = None,
+        batch_size: int = 32,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Encode a text of any length by splitting it into overlapping windows of tokens, so
+        text past the model maximum length is not dropped.
+        [Parameters]
+          text: str -> Text to be encoded.
+          chunk_size: int -> Number of tokens per window, including special tokens.
+          chunk_overlap: int -> Number of tokens shared by two consecutive windows.
+          batch_size: int -> Maximum number of windows per forward pass.
+        [Returns]
+          Tuple[np.ndarray, np.ndarray] -> L2-normalized mean of the window embeddings with
+            shape (hidden size,) and the window embeddings with shape (n windows, hidden size).
+        """
+        chunk_size = min(chunk_size or self.chunk_size, self.tokenizer.model_max_length)
+        chunk_overlap = self.chunk_overlap if chunk_overlap is None else chunk_overlap
+        if self.cache:
+            # The document vector is stored as the first row, followed by the chunk vectors.
+            key = self.cache.make_key(
+                self.cache_namespace, text, f"chunked:{chunk_size}:{chunk_overlap}"
+            )
+            cached = self.cache.get_many([key], self.hidden_size)[0]
+            if cached is not None:
+                return cached[0], cached[1:]
+
+        encoded_chunks = self.tokenizer(
+            text,
+            truncation=True,
+            max_length=chunk_size,
+            stride=chunk_overlap,
+            return_overflowing_tokens=True,
+        )
+        chunk_embeddings = self.encode_tokenized(encoded_chunks, batch_size)
+        document_embedding = chunk_embeddings.mean(axis=0)
+        document_embedding /= max(np.linalg.norm(document_embedding), 1e-9)
+        if self.cache:
+            self.cache.set_many({key: np.vstack([document_embedding, chunk_embeddings])})
+        return document_embedding, chunk_embeddings
+
+    def encode_tokenized(self, encoded_texts, batch_size: int = 32) -> np.ndarray:
+        """
+        Run batched inference on already tokenized, unpadded texts. Texts are sorted by token
+        length so each batch is only padded to its own longest text.
+        [Parameters]
+          encoded_texts: BatchEncoding -> Tokenizer output without padding.
+          batch_size: int -> Maximum number of texts per forward pass.
+        [Returns]
+          np.ndarray -> L2-normalized float32 embeddings with shape (n texts, hidden size).
+        """
+        input_ids = encoded_texts['input_ids']
+        embeddings = np.zeros((len(input_ids), self.hidden_size), dtype=np.float32)
+        model_inputs = [key for key in self.tokenizer.model_input_names if key in encoded_texts]
+        order = sorted(range(len(input_ids)), key=lambda i: len(input_ids[i]))
+        for start in range(0, len(order), batch_size):
+            indices = order[start:start + batch_size]
+            encoded_input = self.tokenizer.pad(
+                {key: [encoded_texts[key][i] for i in indices] for key in model_inputs},
+                return_tensors='np',
+            )
+            token_embeddings = self.backend.run(dict(encoded_input))
+            sentence_embeddings = self.mean_pooling(token_embeddings, encoded_input['attention_mask'])
+            norms = np.linalg.norm(sentence_embeddings, axis=1, keepdims=True)
+            embeddings[indices] = sentence_embeddings / np.clip(norms, 1e-12, None)
+        return embeddings
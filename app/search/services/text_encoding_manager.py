@@ -1,14 +1,32 @@
+from typing import Dict
+
+from app.search.services.embedding_cache import EmbeddingCache
 from app.search.services.text_encoding import TextEncodingService
 
 class TextEncodingManager:
 
     def __init__(self):
         """
-        Constructor of TextEncodingManager class
+        Constructor of TextEncodingManager class. Domains that resolve to the same checkpoint
+        share a single encoder instance, and every encoder shares one tokenizer and one
+        embedding cache.
         """
-        self.general_encoder = TextEncodingService()
-        self.recruitment_encoder = TextEncodingService('recruitment')
-        self.scientific_encoder = TextEncodingService('scientific')
+        self.cache = EmbeddingCache.from_config()
+        self.encoders: Dict[str, TextEncodingService] = {}
+        tokenizer = None
+        for domain, checkpoint in TextEncodingService.encoder_mapping.items():
+            if checkpoint not in self.encoders:
+                self.encoders[checkpoint] = TextEncodingService(
+                    domain, tokenizer=tokenizer, cache=self.cache
+                )
+                tokenizer = self.encoders[checkpoint].tokenizer
+
+        self.general_encoder = self.get_checkpoint_encoder('general')
+        self.recruitment_encoder = self.get_checkpoint_encoder('recruitment')
+        self.scientific_encoder = self.get_checkpoint_encoder('scientific')
+
+    def get_checkpoint_encoder(self, domain: str) -> TextEncodingService:
+        return self.encoders[TextEncodingService.encoder_mapping[domain]]
 
     def get_encoder(self, domain: str = 'general'):
         match domain:
@@ -17,4 +35,4 @@ class TextEncodingManager:
             case 'scientific':
                 return self.scientific_encoder
             case _:
-                return self.general_encoder
\ No newline at end of file
+                return self.general_encoder
@@ -6,6 +6,7 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 
 from api import router
+from app.elastic import AsyncEsClient
 from core.config import config
 from core.exceptions import CustomException
 from core.fastapi.dependencies import Logging
@@ -16,6 +17,7 @@ from core.fastapi.middlewares import (
     SQLAlchemyMiddleware,
 )
 from core.helpers.cache import Cache, CustomKeyMaker, RedisBackend
+from core.helpers.executor import inference_executor
 
 
 def init_routers(app_: FastAPI) -> None:
@@ -31,6 +33,11 @@ def init_listeners(app_: FastAPI) -> None:
             content={"error_code": exc.error_code, "message": exc.message},
         )
 
+    @app_.on_event("shutdown")
+    async def shutdown():
+        await AsyncEsClient.close()
+        inference_executor.shutdown()
+
 
 def on_auth_error(request: Request, exc: Exception):
     status_code, error_code, message = 401, None, str(exc)
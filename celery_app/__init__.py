@@ -1,4 +1,23 @@
 from celery_app.main import celery
-from celery_app.tasks import extraction, indexing, parsing
+from celery_app.tasks import (
+    bulk_ingest,
+    extraction,
+    indexing,
+    ingest,
+    is_bulk_document_task_id,
+    parsing,
+    start_bulk_document_pipeline,
+    start_document_pipeline,
+)
 
-__all__ = ["celery", "parsing", "extraction", "indexing"]
+__all__ = [
+    "celery",
+    "parsing",
+    "extraction",
+    "indexing",
+    "ingest",
+    "bulk_ingest",
+    "is_bulk_document_task_id",
+    "start_document_pipeline",
+    "start_bulk_document_pipeline",
+]
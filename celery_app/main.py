@@ -1,5 +1,5 @@
 from celery import Celery
-from app.search.services.text_encoding_manager import TextEncodingManager
+from celery.signals import worker_process_init
 
 from core.config import config
 
@@ -11,3 +11,13 @@ celery = Celery(
 )
 celery.conf.update(task_track_started=True)
 celery.conf.timezone = "Asia/Jakarta"
+
+
+@worker_process_init.connect
+def warm_up_models(**kwargs) -> None:
+    """
+    Load all models once in every worker process before it starts consuming tasks.
+    """
+    from app.registry import model_registry
+
+    model_registry.warm_up()
@@ -1,14 +1,12 @@
 import datetime
-import mimetypes
-from typing import Any, Dict, List, Union
+from contextlib import nullcontext
+from typing import Any, Dict, List, Tuple, Union
 
-import magic
 from asgiref.sync import async_to_sync
 from bert_serving.client import BertClient
-from tika import parser
 from tzlocal import get_localzone
 
-from app.classification import Classifier, LabelEnum
+from app.classification import LabelEnum
 from app.document.enums.document import IndexingStatusEnum
 from app.document.services import document_index_service, document_service
 from app.elastic import (
@@ -17,16 +15,655 @@ from app.elastic import (
     SCIENTIFIC_ELASTICSEARCH_INDEX_NAME,
     EsClient,
 )
-from app.extraction import InformationExtractor
+from app.elastic.helpers import BulkIndexTracker
 from app.extraction.domains.recruitment import RECRUITMENT_INFORMATION
 from app.extraction.domains.scientific import SCIENTIFIC_INFORMATION
-from app.preprocess import OCRUtil, PreprocessUtil
-from app.search.services.text_encoding_manager import TextEncodingManager
+from app.preprocess import OCRUtil, ParsedDocument, PreprocessUtil
+from app.registry import model_registry
 from celery_app.main import celery
 from core.config import config
-from core.utils import GCStorage
+from core.utils import ArtifactStore, GCStorage
 
+# Intermediate results are kept in the artifact store, only their keys go through the broker.
+artifact_store = ArtifactStore()
 
+# Prefix of the current task id of documents indexed by a bulk_ingest task.
+BULK_TASK_ID_PREFIX = "bulk::"
+
+
+class IndexingSupersededException(Exception):
+    """
+    Raised when a document is reindexed while a task is still indexing it, the task then stops
+    without touching the indexing status that now belongs to the new task.
+    """
+
+    def __init__(self, document_id: int) -> None:
+        super().__init__("Document {} was reindexed by another task".format(document_id))
+
+
+# ==============================================================================
+# Pipeline stages, shared by the chained tasks and the fused ingest task.
+# ==============================================================================
+def parse_document(parsed_document: ParsedDocument) -> Tuple[str, List[str], bool]:
+    """
+    Extract text from document (parse document, OCR if necessary) and preprocess it (case
+    folding, tokenization, etc).
+    [Parameters]
+        parsed_document: ParsedDocument -> Document to be parsed.
+    [Returns]
+        str -> Raw text from document.
+        List[str] -> Preprocessed text from document.
+        bool -> Whether most pages of the document are parsed with OCR, the domain extractors
+            then read the raw text instead of the PDF.
+    """
+    if parsed_document.extension not in [".pdf", ".doc", ".docx", ".txt"]:
+        raise Exception("Unsupported file type")
+    file_text: str = ""
+
+    with_ocr = False
+    if parsed_document.extension == ".pdf":
+        # Only pages without a text layer are OCRed, the other pages keep their native text.
+        ocr_page_indexes = OCRUtil.get_ocr_page_indexes(parsed_document)
+        if ocr_page_indexes:
+            page_texts = list(parsed_document.get_page_texts(OCRUtil.NATIVE_TEXT_FLAGS))
+            ocr_texts = OCRUtil.ocr_pages(parsed_document.file_bytes, ocr_page_indexes)
+            for page_index, ocr_text in zip(ocr_page_indexes, ocr_texts):
+                page_texts[page_index] = ocr_text
+            file_text = " ".join(page_texts)
+            # Mostly digital documents keep being extracted from their text layer.
+            with_ocr = 2 * len(ocr_page_indexes) > len(page_texts)
+
+    if not (file_text):
+        file_text = parsed_document.content
+
+    return file_text, PreprocessUtil.preprocess(file_text), with_ocr
+
+
+def extract_document(
+    document_id: int,
+    document_title: str,
+    parsed_document: ParsedDocument,
+    file_raw_text: str,
+    file_preprocessed_text: List[str],
+    document_label: str = None,
+    document_title_fixed: bool = False,
+    with_ocr: bool = False,
+) -> Tuple[str, str, Dict[str, Any], Dict[str, Any]]:
+    """
+    Predict document type, extract high-level information from document such as metadata,
+    entities, etc, and update the document on database accordingly.
+    [Parameters]
+        document_id: int -> Document id.
+        document_title: str -> Document title.
+        parsed_document: ParsedDocument -> Parsed document.
+        file_raw_text: str -> Raw text from document.
+        file_preprocessed_text: List[str] -> Preprocessed text from document.
+        document_label: str -> Document predefined label, used when manually changing label.
+        document_title_fixed: bool -> Whether the document title should be kept.
+        with_ocr: bool -> Whether document is parsed with OCR or not.
+    [Returns]
+        str -> Document title.
+        str -> Document label.
+        Dict[str, Any] -> Metadata extracted from document.
+        Dict[str, Any] -> Metadata with general domain.
+    """
+    file_bytes = parsed_document.file_bytes
+
+    # Classify document type and extract general information from document.
+    extractor = model_registry.get_extractor(domain="general")
+    general_document_metadata = extractor.extract(
+        file_bytes, file_raw_text, parsed_document
+    )
+    document_metadata = {}
+    document_label = document_label or model_registry.get_classifier().classify(
+        texts=file_preprocessed_text
+    )
+
+    # Extract information on domain-specific document.
+    domain = None
+    if document_label == LabelEnum.RESUME.value:
+        domain = "recruitment"
+    elif document_label == LabelEnum.PAPER.value:
+        domain = "scientific"
+    if domain:
+        extractor = model_registry.get_extractor(domain=domain)
+        if with_ocr:
+            document_metadata = extractor.extract(
+                file_bytes, file_raw_text, parsed_document
+            )
+        else:
+            document_metadata = extractor.extract(
+                file_bytes, parsed_document=parsed_document
+            )
+
+    # Update document metadata on database.
+    mimetype = general_document_metadata.get("mimetype", None)
+    extension = general_document_metadata.get("extension", None)
+    size = general_document_metadata.get("size", None)
+    if document_metadata:
+        mimetype = document_metadata.get("mimetype", None)
+        extension = document_metadata.get("extension", None)
+        size = document_metadata.get("size", None)
+
+    if not document_title_fixed:
+        document_title = document_metadata.get("title", None) or document_title
+
+    # Update document in database according to extracted metadata.
+    async_to_sync(document_service.update_document_celery)(
+        id=document_id,
+        params={
+            "title": document_title,
+            "mimetype": mimetype,
+            "extension": extension,
+            "size": size,
+        },
+    )
+    return document_title, document_label, document_metadata, general_document_metadata
+
+
+def build_index_docs(
+    document_id: int,
+    document_title: str,
+    document_label: str,
+    document_metadata: Dict[str, Any],
+    general_document_metadata: Dict[str, Any],
+    file_raw_text: str,
+    file_preprocessed_text: List[str],
+) -> List[Tuple[str, Dict[str, Any]]]:
+    """
+    Calculate document vector/feature/weight and build the Elasticsearch documents to be indexed.
+    [Parameters]
+        document_id: int -> Document id.
+        document_title: str -> Document title.
+        document_label: str -> Document category.
+        document_metadata: Dict[str, Any] -> Metadata extracted from document.
+        general_document_metadata: Dict[str, Any] -> Metadata with general domain.
+        file_raw_text: str -> Raw text from document.
+        file_preprocessed_text: List[str] -> Preprocessed text from document.
+    [Returns]
+        List[Tuple[str, Dict[str, Any]]] -> Index name and Elasticsearch document, the general
+            domain document comes first.
+    """
+    text_encoding_manager = model_registry.get_text_encoding_manager()
+
+    # Prepare document to be indexed.
+    bc = BertClient(
+        ip=config.BERT_SERVER_IP,
+        port=config.BERT_SERVER_PORT,
+        port_out=config.BERT_SERVER_PORT_OUT,
+        output_fmt="list",
+    )
+    # Index the general domain document into Elasticsearch.
+    # embedding = bc.encode([" ".join(file_preprocessed_text)])
+
+    match document_label:
+        case LabelEnum.RESUME.value:
+            domain = "recruitment"
+        case LabelEnum.PAPER.value:
+            domain = "scientific"
+        case _:
+            domain = "general"
+    encoder = text_encoding_manager.get_encoder(domain=domain)
+
+    # Encode the whole document by overlapping token windows, the document vector is the
+    # mean of the window vectors.
+    embedding, chunk_embeddings = encoder.encode_chunked(
+        " ".join(file_preprocessed_text)
+    )
+
+    # Collect metadata with "semantic text" type, the vector of these metadata will be
+    # generated in a single batch.
+    metadata_info = []
+    if document_label != LabelEnum.OTHER.value:
+        metadata_info = (
+            SCIENTIFIC_INFORMATION
+            if document_label == LabelEnum.PAPER.value
+            else RECRUITMENT_INFORMATION
+        )
+    semantic_metadata: Dict[str, Union[str, List[str]]] = {}
+    texts = []
+    for dict in metadata_info:
+        if dict["type"] == "semantic text":
+            metadata_value: Union[str, List[str]] = document_metadata.get(
+                dict["name"], ""
+            )
+            preprocessed_metadata = PreprocessUtil.preprocess(metadata_value)
+            if preprocessed_metadata:
+                semantic_metadata[dict["name"]] = metadata_value
+                texts.append(" ".join(preprocessed_metadata))
+    metadata_embeddings = iter(encoder.encode_batch(texts))
+
+    doc = {
+        "document_id": document_id,
+        "title": document_title,
+        "raw_text": file_raw_text,
+        "preprocessed_text": " ".join(file_preprocessed_text),
+        "text_vector": embedding.tolist(),
+        "text_chunks": [
+            {"chunk_index": i, "text_vector": chunk_embedding.tolist()}
+            for i, chunk_embedding in enumerate(chunk_embeddings)
+        ],
+        "document_label": document_label,
+        "document_metadata": general_document_metadata,
+    }
+    index_docs = [(GENERAL_ELASTICSEARCH_INDEX_NAME, doc)]
+
+    # Build document to be indexed according to document type.
+    if document_label != LabelEnum.OTHER.value:
+        doc = {**doc, "document_metadata": document_metadata}
+        for dict in metadata_info:
+            name = dict["name"]
+            if dict["type"] != "semantic text":
+                continue
+            if name in semantic_metadata:
+                doc["document_metadata"][name] = {
+                    "text": semantic_metadata[name],
+                    "text_vector": next(metadata_embeddings).tolist(),
+                }
+            else:
+                # No vector for empty metadata, vectors indexed with cosine similarity must not
+                # have zero magnitude and the scoring script skips missing vectors.
+                doc["document_metadata"][name] = {"text": ""}
+
+        index_docs.append(
+            (
+                SCIENTIFIC_ELASTICSEARCH_INDEX_NAME
+                if document_label == LabelEnum.PAPER.value
+                else RECRUITMENT_ELASTICSEARCH_INDEX_NAME,
+                doc,
+            )
+        )
+    return index_docs
+
+
+def add_document_access(
+    document_id: int, index_docs: List[Tuple[str, Dict[str, Any]]]
+) -> None:
+    """
+    Add the access fields of a document (repository, visibility, and collaborators) to its
+    Elasticsearch documents. They are read right before writing so permission changes made while
+    the document was processed are not lost.
+    [Parameters]
+        document_id: int -> Document id.
+        index_docs: List[Tuple[str, Dict[str, Any]]] -> Index name and Elasticsearch document.
+    """
+    access = async_to_sync(document_service.get_document_access_celery)([document_id])
+    for _, doc in index_docs:
+        doc.update(access.get(document_id, {}))
+
+
+def write_index_docs(
+    document_id: int,
+    index_docs: List[Tuple[str, Dict[str, Any]]],
+    indexed_docs: List[Tuple[str, str]],
+) -> None:
+    """
+    Index the Elasticsearch documents of a document in a single bulk request and update document
+    elasticsearch related metadata on database.
+    [Parameters]
+        document_id: int -> Document id.
+        index_docs: List[Tuple[str, Dict[str, Any]]] -> Index name and Elasticsearch document.
+        indexed_docs: List[Tuple[str, str]] -> Index name and id of every Elasticsearch
+            document indexed so far are appended to this list, used to clean up on failure.
+    """
+    add_document_access(document_id, index_docs)
+    results = EsClient.bulk_index_docs(
+        {"_index": index_name, "_source": doc} for index_name, doc in index_docs
+    )
+    errors = []
+    for ok, item in results:
+        result = item.get("index", {})
+        if ok:
+            indexed_docs.append((result["_index"], result["_id"]))
+        else:
+            errors.append(bulk_error_reason(result))
+    if errors:
+        raise Exception("; ".join(errors))
+    save_elastic_doc_ids(document_id, indexed_docs)
+
+
+def index_document(
+    document_id: int,
+    document_title: str,
+    document_label: str,
+    document_metadata: Dict[str, Any],
+    general_document_metadata: Dict[str, Any],
+    file_raw_text: str,
+    file_preprocessed_text: List[str],
+    indexed_docs: List[Tuple[str, str]],
+) -> None:
+    """
+    Calculate document vector/feature/weight, index document into Elasticsearch, and update
+    document elasticsearch related metadata on database.
+    [Parameters]
+        document_id: int -> Document id.
+        document_title: str -> Document title.
+        document_label: str -> Document category.
+        document_metadata: Dict[str, Any] -> Metadata extracted from document.
+        general_document_metadata: Dict[str, Any] -> Metadata with general domain.
+        file_raw_text: str -> Raw text from document.
+        file_preprocessed_text: List[str] -> Preprocessed text from document.
+        indexed_docs: List[Tuple[str, str]] -> Index name and id of every Elasticsearch
+            document indexed so far are appended to this list, used to clean up on failure.
+    """
+    index_docs = build_index_docs(
+        document_id=document_id,
+        document_title=document_title,
+        document_label=document_label,
+        document_metadata=document_metadata,
+        general_document_metadata=general_document_metadata,
+        file_raw_text=file_raw_text,
+        file_preprocessed_text=file_preprocessed_text,
+    )
+    write_index_docs(document_id, index_docs, indexed_docs)
+
+
+def prepare_document(
+    task_id: str,
+    document_id: int,
+    document_title: str,
+    document_url: str,
+    document_label: str = None,
+    document_title_fixed: bool = False,
+    claim: bool = False,
+) -> List[Tuple[str, Dict[str, Any]]]:
+    """
+    Run parsing and extraction of a document in the current worker and build its Elasticsearch
+    documents. The indexing status goes through the same transitions as the chained tasks, and
+    IndexingSupersededException is raised as soon as the document is reindexed by another task.
+    [Parameters]
+        task_id: str -> Id of the running celery task.
+        document_id: int -> Document id.
+        document_title: str -> Document title.
+        document_url: str -> Document url.
+        document_label: str -> Document predefined label, used when manually changing label.
+        document_title_fixed: bool -> Whether the document title should be kept.
+        claim: bool -> Only start if no other task started indexing the document since it was
+            queued, used by tasks indexing several documents.
+    [Returns]
+        List[Tuple[str, Dict[str, Any]]] -> Index name and Elasticsearch document.
+    """
+    validate_document_label(document_label)
+
+    if claim:
+        if not claim_document(document_id, task_id):
+            raise IndexingSupersededException(document_id)
+    else:
+        update_indexing_status(document_id, IndexingStatusEnum.PARSING, task_id)
+    file_bytes = GCStorage().get_file(document_url)
+
+    with ParsedDocument(file_bytes) as parsed_document:
+        file_text, preprocessed_file_text, with_ocr = parse_document(parsed_document)
+
+        if not update_indexing_status(
+            document_id, IndexingStatusEnum.EXTRACTING, task_id, owner_task_id=task_id
+        ):
+            raise IndexingSupersededException(document_id)
+        (
+            document_title,
+            document_label,
+            document_metadata,
+            general_document_metadata,
+        ) = extract_document(
+            document_id=document_id,
+            document_title=document_title,
+            parsed_document=parsed_document,
+            file_raw_text=file_text,
+            file_preprocessed_text=preprocessed_file_text,
+            document_label=document_label,
+            document_title_fixed=document_title_fixed,
+            with_ocr=with_ocr,
+        )
+
+    if not update_indexing_status(
+        document_id, IndexingStatusEnum.INDEXING, task_id, owner_task_id=task_id
+    ):
+        raise IndexingSupersededException(document_id)
+    return build_index_docs(
+        document_id=document_id,
+        document_title=document_title,
+        document_label=document_label,
+        document_metadata=document_metadata,
+        general_document_metadata=general_document_metadata,
+        file_raw_text=file_text,
+        file_preprocessed_text=preprocessed_file_text,
+    )
+
+
+def elastic_doc_params(indexed_docs: List[Tuple[str, str]]) -> Dict[str, Any]:
+    """
+    Get the elasticsearch related metadata of a document.
+    [Parameters]
+        indexed_docs: List[Tuple[str, str]] -> Index name and id of the indexed documents.
+    [Returns]
+        Dict[str, Any] -> Document parameters.
+    """
+    general_elastic_doc_id = None
+    elastic_doc_id = None
+    elastic_index_name = None
+    for index_name, doc_id in indexed_docs:
+        if index_name == GENERAL_ELASTICSEARCH_INDEX_NAME:
+            general_elastic_doc_id = doc_id
+        else:
+            elastic_index_name, elastic_doc_id = index_name, doc_id
+    return {
+        "general_elastic_doc_id": general_elastic_doc_id,
+        "elastic_doc_id": elastic_doc_id,
+        "elastic_index_name": elastic_index_name,
+    }
+
+
+def save_elastic_doc_ids(
+    document_id: int, indexed_docs: List[Tuple[str, str]]
+) -> None:
+    """
+    Update document elasticsearch related metadata on database.
+    [Parameters]
+        document_id: int -> Document id.
+        indexed_docs: List[Tuple[str, str]] -> Index name and id of the indexed documents.
+    """
+    async_to_sync(document_service.update_document_celery)(
+        id=document_id, params=elastic_doc_params(indexed_docs)
+    )
+
+
+def bulk_error_reason(result: Dict[str, Any]) -> str:
+    """
+    Get the failure reason of a bulk action result.
+    [Parameters]
+        result: Dict[str, Any] -> Result of the bulk action.
+    [Returns]
+        str -> Failure reason.
+    """
+    error = result.get("error", "unknown error")
+    if isinstance(error, dict):
+        error = "{}: {}".format(error.get("type"), error.get("reason"))
+    return "Failed to index into {}: {}".format(result.get("_index"), error)
+
+
+def validate_document_label(document_label: str = None) -> None:
+    """
+    Check if provided document label is valid.
+    [Parameters]
+        document_label: str -> Document predefined label.
+    """
+    if document_label and document_label not in set(enum.value for enum in LabelEnum):
+        raise Exception("Invalid document label")
+
+
+def update_indexing_status(
+    document_id: int,
+    status: IndexingStatusEnum,
+    current_task_id: str = None,
+    reason: str = None,
+    owner_task_id: str = None,
+) -> bool:
+    """
+    Update indexing status of a document from a celery task.
+    [Parameters]
+        document_id: int -> Document id.
+        status: IndexingStatusEnum -> Indexing status.
+        current_task_id: str -> Celery task id.
+        reason: str -> Reason for the indexing status.
+        owner_task_id: str -> Only update the status while the document is indexed by this
+            task.
+    [Returns]
+        bool -> Whether the status was updated.
+    """
+    index = async_to_sync(document_index_service.update_indexing_status_celery)(
+        doc_id=document_id,
+        params={
+            "reason": reason,
+            "status": status,
+            "current_task_id": current_task_id,
+        },
+        task_id=owner_task_id,
+    )
+    return index is not None
+
+
+def claim_document(document_id: int, task_id: str) -> bool:
+    """
+    Start parsing a queued document, unless another task started indexing it since it was
+    queued, e.g. because it was reindexed.
+    [Parameters]
+        document_id: int -> Document id.
+        task_id: str -> Id of the claiming task.
+    [Returns]
+        bool -> Whether the document was claimed.
+    """
+    return async_to_sync(document_index_service.claim_indexing_celery)(
+        doc_id=document_id,
+        params={
+            "reason": None,
+            "status": IndexingStatusEnum.PARSING,
+            "current_task_id": task_id,
+        },
+    )
+
+
+def finish_document_indexing(
+    document_id: int, task_id: str, indexed_docs: List[Tuple[str, str]]
+) -> bool:
+    """
+    Save the Elasticsearch ids of an indexed document and mark it as indexed, only while the
+    document is still indexed by the task.
+    [Parameters]
+        document_id: int -> Document id.
+        task_id: str -> Id of the task that indexed the document.
+        indexed_docs: List[Tuple[str, str]] -> Index name and id of the indexed documents.
+    [Returns]
+        bool -> False if the document was reindexed meanwhile.
+    """
+    return async_to_sync(document_service.finish_indexing_celery)(
+        id=document_id, task_id=task_id, params=elastic_doc_params(indexed_docs)
+    )
+
+
+def bulk_document_task_id(task_id: str, document_id: int) -> str:
+    """
+    Get the id stored as current task of a document indexed by a bulk_ingest task. Documents of
+    a batch share the task, so the task must not be revoked when one of them is reindexed, the
+    stored id tells reindex to only mark the document instead.
+    [Parameters]
+        task_id: str -> Id of the bulk_ingest task.
+        document_id: int -> Document id.
+    [Returns]
+        str -> Current task id of the document.
+    """
+    return "{}{}::{}".format(BULK_TASK_ID_PREFIX, task_id, document_id)
+
+
+def is_bulk_document_task_id(task_id: str) -> bool:
+    """
+    Check if a current task id of a document belongs to a bulk_ingest task.
+    [Parameters]
+        task_id: str -> Current task id of the document.
+    [Returns]
+        bool -> Whether the task indexes several documents.
+    """
+    return task_id.startswith(BULK_TASK_ID_PREFIX)
+
+
+def delete_indexed_docs(indexed_docs: List[Tuple[str, str]]) -> None:
+    """
+    Delete documents from Elasticsearch, used when indexing failed.
+    [Parameters]
+        indexed_docs: List[Tuple[str, str]] -> Index name and id of the documents.
+    """
+    for index_name, doc_id in indexed_docs:
+        EsClient.delete_doc(index_name=index_name, doc_id=doc_id)
+
+
+def log_stage(stage: str, document_id: int, event: str) -> None:
+    print(
+        "[{}] task of document [{}] is {} at [{}]".format(
+            stage,
+            document_id,
+            event,
+            datetime.datetime.now()
+            .astimezone(get_localzone())
+            .strftime("%Y-%m-%d %H:%M:%S"),
+        )
+    )
+
+
+def start_document_pipeline(
+    document_id: int,
+    document_title: str,
+    document_url: str,
+    document_label: str = None,
+    document_title_fixed: bool = False,
+):
+    """
+    Start indexing a document, either with the fused ingest task or with the parsing, extraction,
+    and indexing task chain according to CELERY_FUSED_INGESTION.
+    [Parameters]
+        document_id: int -> Document id.
+        document_title: str -> Document title.
+        document_url: str -> Document url.
+        document_label: str -> Document predefined label, used when manually changing label.
+        document_title_fixed: bool -> Whether the document title should be kept.
+    [Returns]
+        AsyncResult -> Celery result of the first task.
+    """
+    task = ingest if config.CELERY_FUSED_INGESTION else parsing
+    return task.delay(
+        document_id=document_id,
+        document_title=document_title,
+        document_url=document_url,
+        document_label=document_label,
+        document_title_fixed=document_title_fixed,
+    )
+
+
+def start_bulk_document_pipeline(
+    documents: List[Dict[str, Any]],
+    relax_refresh: bool = None,
+) -> None:
+    """
+    Start indexing several documents, the documents are split into batches of
+    ELASTICSEARCH_BULK_BATCH_SIZE and every batch is indexed by a bulk_ingest task.
+    [Parameters]
+        documents: List[Dict[str, Any]] -> Arguments of start_document_pipeline of every
+            document.
+        relax_refresh: bool -> Whether to relax the refresh interval of the indices while
+            indexing, defaults to ELASTICSEARCH_BULK_RELAX_REFRESH.
+    """
+    if relax_refresh is None:
+        relax_refresh = config.ELASTICSEARCH_BULK_RELAX_REFRESH
+    batch_size = max(config.ELASTICSEARCH_BULK_BATCH_SIZE, 1)
+    for start in range(0, len(documents), batch_size):
+        batch = documents[start : start + batch_size]
+        if len(batch) == 1:
+            start_document_pipeline(**batch[0])
+        else:
+            bulk_ingest.delay(documents=batch, relax_refresh=relax_refresh)
+
+
+# ==============================================================================
+# Tasks.
+# ==============================================================================
 @celery.task(
     name="parsing",
     bind=True,
@@ -53,60 +690,26 @@ def parsing(
         bool -> True if parsing is successful.
     """
     try:
-        print(
-            "[PARSING] task of document [{}] is started at [{}]".format(
-                document_id,
-                datetime.datetime.now()
-                .astimezone(get_localzone())
-                .strftime("%Y-%m-%d %H:%M:%S"),
-            )
-        )
-        # Check if provided document label is valid.
-        if document_label and document_label not in set(
-            enum.value for enum in LabelEnum
-        ):
-            raise Exception("Invalid document label")
+        log_stage("PARSING", document_id, "started")
+        validate_document_label(document_label)
 
         # Update indexing status.
-        async_to_sync(document_index_service.update_indexing_status_celery)(
-            doc_id=document_id,
-            params={
-                "reason": None,
-                "status": IndexingStatusEnum.PARSING,
-                "current_task_id": self.request.id,
-            },
-        )
+        update_indexing_status(document_id, IndexingStatusEnum.PARSING, self.request.id)
         file_bytes = GCStorage().get_file(document_url)
 
-        # Parsing content and predict extension.
-        file_extension = mimetypes.guess_extension(
-            magic.from_buffer(file_bytes, mime=True)
-        )
-        if file_extension not in [".pdf", ".doc", ".docx", ".txt"]:
-            raise Exception("Unsupported file type")
-        file_text: str = ""
-
-        with_ocr = False
-        if file_extension == ".pdf":
-            text_percentage = OCRUtil.get_text_percentage(file_bytes)
-            if text_percentage < OCRUtil.TEXT_PERCENTAGE_THRESHOLD:
-                with_ocr = True
-            if with_ocr:
-                file_text = OCRUtil.ocr(file_bytes)
-        
-        if not(file_text):
-            file_text = parser.from_buffer(file_bytes)["content"]
-
-        # Preprocess text and do extraction.
-        preprocessed_file_text = PreprocessUtil.preprocess(file_text)
-        print(
-            "[PARSING] task of document [{}] is finished at [{}]".format(
-                document_id,
-                datetime.datetime.now()
-                .astimezone(get_localzone())
-                .strftime("%Y-%m-%d %H:%M:%S"),
+        # Parse and preprocess text, then do extraction.
+        with ParsedDocument(file_bytes) as parsed_document:
+            file_text, preprocessed_file_text, with_ocr = parse_document(
+                parsed_document
             )
+        text_artifact_key = artifact_store.put(
+            artifact_store.make_key(document_id, self.request.id, "text"),
+            {
+                "file_raw_text": file_text,
+                "file_preprocessed_text": preprocessed_file_text,
+            },
         )
+        log_stage("PARSING", document_id, "finished")
         extraction.delay(
             document_id=document_id,
             document_title=document_title,
@@ -114,20 +717,12 @@ def parsing(
             document_label=document_label,
             document_title_fixed=document_title_fixed,
             with_ocr=with_ocr,
-            file_raw_text=file_text,
-            file_preprocessed_text=preprocessed_file_text,
+            text_artifact_key=text_artifact_key,
         )
         return True
     except Exception as e:
         # Update indexing status to failed.
-        async_to_sync(document_index_service.update_indexing_status_celery)(
-            doc_id=document_id,
-            params={
-                "status": IndexingStatusEnum.FAILED,
-                "reason": str(e),
-                "current_task_id": None,
-            },
-        )
+        update_indexing_status(document_id, IndexingStatusEnum.FAILED, reason=str(e))
         raise e
 
 
@@ -144,8 +739,7 @@ def extraction(
     document_label: str = None,
     document_title_fixed: bool = False,
     with_ocr: bool = False,
-    file_raw_text: str = "",
-    file_preprocessed_text: List[str] = [],
+    text_artifact_key: str = None,
 ) -> bool:
     """
     Celery task for extracting information from document. The extraction task will be split into 2
@@ -156,104 +750,58 @@ def extraction(
         document_id: int -> Document id.
         document_title: str -> Document title.
         document_url: str -> Document url.
-        file_raw_text: str -> Raw text from document.
-        file_preprocessed_text: List[str] -> Preprocessed text from document.
+        text_artifact_key: str -> Artifact key of the raw and preprocessed text of the document.
         with_ocr: bool -> Whether document is parsed with OCR or not.
     [Returns]
         bool -> True if extraction is successful
     """
     try:
-        print(
-            "[EXTRACTION] task of document [{}] is started at [{}]".format(
-                document_id,
-                datetime.datetime.now()
-                .astimezone(get_localzone())
-                .strftime("%Y-%m-%d %H:%M:%S"),
-            )
-        )
+        log_stage("EXTRACTION", document_id, "started")
         # Update indexing status to extracting.
-        async_to_sync(document_index_service.update_indexing_status_celery)(
-            doc_id=document_id,
-            params={
-                "reason": None,
-                "status": IndexingStatusEnum.EXTRACTING,
-                "current_task_id": self.request.id,
-            },
+        update_indexing_status(
+            document_id, IndexingStatusEnum.EXTRACTING, self.request.id
         )
         file_bytes = GCStorage().get_file(document_url)
+        text_artifact = artifact_store.get(text_artifact_key)
 
-        # Classify document type and extract general information from document.
-        extractor = InformationExtractor(domain="general")
-        general_document_metadata = extractor.extract(file_bytes, file_raw_text)
-        document_metadata = {}
-        document_label = document_label or Classifier.classify(
-            texts=file_preprocessed_text
-        )
+        with ParsedDocument(file_bytes) as parsed_document:
+            (
+                document_title,
+                document_label,
+                document_metadata,
+                general_document_metadata,
+            ) = extract_document(
+                document_id=document_id,
+                document_title=document_title,
+                parsed_document=parsed_document,
+                file_raw_text=text_artifact["file_raw_text"],
+                file_preprocessed_text=text_artifact["file_preprocessed_text"],
+                document_label=document_label,
+                document_title_fixed=document_title_fixed,
+                with_ocr=with_ocr,
+            )
+        log_stage("EXTRACTION", document_id, "finished")
 
-        # Extract information on domain-specific document.
-        domain = None
-        if document_label == LabelEnum.RESUME.value:
-            domain = "recruitment"
-        elif document_label == LabelEnum.PAPER.value:
-            domain = "scientific"
-        if domain:
-            extractor = InformationExtractor(domain=domain)
-            if with_ocr:
-                document_metadata = extractor.extract(file_bytes, file_raw_text)
-            else:
-                document_metadata = extractor.extract(file_bytes)
-
-        # Update document metadata on database.
-        mimetype = general_document_metadata.get("mimetype", None)
-        extension = general_document_metadata.get("extension", None)
-        size = general_document_metadata.get("size", None)
-        if document_metadata:
-            mimetype = document_metadata.get("mimetype", None)
-            extension = document_metadata.get("extension", None)
-            size = document_metadata.get("size", None)
-
-        if not document_title_fixed:
-            document_title = document_metadata.get("title", None) or document_title
-
-        # Update document in database according to extracted metadata and do indexing.
-        async_to_sync(document_service.update_document_celery)(
-            id=document_id,
-            params={
-                "title": document_title,
-                "mimetype": mimetype,
-                "extension": extension,
-                "size": size,
+        # Do indexing.
+        metadata_artifact_key = artifact_store.put(
+            artifact_store.make_key(document_id, self.request.id, "metadata"),
+            {
+                "document_metadata": document_metadata,
+                "general_document_metadata": general_document_metadata,
             },
         )
-        print(
-            "[EXTRACTION] task of document [{}] is finished at [{}]".format(
-                document_id,
-                datetime.datetime.now()
-                .astimezone(get_localzone())
-                .strftime("%Y-%m-%d %H:%M:%S"),
-            )
-        )
         indexing.delay(
             document_id=document_id,
             document_title=document_title,
             document_label=document_label,
-            document_metadata=document_metadata,
-            general_document_metadata=general_document_metadata,
-            file_raw_text=file_raw_text,
-            file_preprocessed_text=file_preprocessed_text,
+            text_artifact_key=text_artifact_key,
+            metadata_artifact_key=metadata_artifact_key,
         )
 
         return True
     except Exception as e:
         # Turn indexing status to failed if extraction failed.
-        async_to_sync(document_index_service.update_indexing_status_celery)(
-            doc_id=document_id,
-            params={
-                "status": IndexingStatusEnum.FAILED,
-                "reason": str(e),
-                "current_task_id": None,
-            },
-        )
+        update_indexing_status(document_id, IndexingStatusEnum.FAILED, reason=str(e))
         raise e
 
 
@@ -267,10 +815,8 @@ def indexing(
     document_id: int,
     document_title: str,
     document_label: str,
-    document_metadata: Dict[str, Any] = {},
-    general_document_metadata: Dict[str, Any] = {},
-    file_raw_text: str = "",
-    file_preprocessed_text: List[str] = [],
+    text_artifact_key: str = None,
+    metadata_artifact_key: str = None,
 ) -> bool:
     """
     Celelry task for indexing document. The indexing task will be split into 2 subtasks:
@@ -278,170 +824,212 @@ def indexing(
         2. Indexing document into Elasticsearch.
     [Parameters]
         document_id: int -> Document id.
-        file_raw_text: str -> Raw text from document.
-        file_preprocessed_text: List[str] -> Preprocessed text from document.
         document_label: str -> Document category.
-        document_metadata: Dict[str, Any] -> Metadata extracted from document.
-        general_document_metadata: Dict[str, Any] -> Metadata with general domain.
+        text_artifact_key: str -> Artifact key of the raw and preprocessed text of the document.
+        metadata_artifact_key: str -> Artifact key of the metadata extracted from document and
+            the metadata with general domain.
     [Returns]
         bool -> True if indexing is successful.
     """
+    indexed_docs: List[Tuple[str, str]] = []
     try:
-        print(
-            "[INDEXING] task of document [{}] is started at [{}]".format(
-                document_id,
-                datetime.datetime.now()
-                .astimezone(get_localzone())
-                .strftime("%Y-%m-%d %H:%M:%S"),
-            )
-        )
-        text_encoding_manager = TextEncodingManager()
+        log_stage("INDEXING", document_id, "started")
         # Update indexing status.
-        async_to_sync(document_index_service.update_indexing_status_celery)(
-            doc_id=document_id,
-            params={
-                "reason": None,
-                "status": IndexingStatusEnum.INDEXING,
-                "current_task_id": self.request.id,
-            },
-        )
+        update_indexing_status(document_id, IndexingStatusEnum.INDEXING, self.request.id)
 
-        # Setup dummy variable.
-        general_elastic_doc_id = None
-        elastic_doc_id = None
-        elastic_index_name = None
-
-        # Prepare document to be indexed.
-        bc = BertClient(
-            ip=config.BERT_SERVER_IP,
-            port=config.BERT_SERVER_PORT,
-            port_out=config.BERT_SERVER_PORT_OUT,
-            output_fmt="list",
-        )
-        # Index the general domain document into Elasticsearch.
-        # embedding = bc.encode([" ".join(file_preprocessed_text)])
-
-        match document_label:
-            case LabelEnum.RESUME.value:
-                domain = "recruitment"
-            case LabelEnum.PAPER.value:
-                domain = "scientific"
-            case _:
-                domain = "general"
-        embedding = text_encoding_manager.get_encoder(domain=domain).encode(
-            " ".join(file_preprocessed_text)
-        )
-
-        doc = {
-            "document_id": document_id,
-            "title": document_title,
-            "raw_text": file_raw_text,
-            "preprocessed_text": " ".join(file_preprocessed_text),
-            "text_vector": embedding,
-            "document_label": document_label,
-            "document_metadata": general_document_metadata,
-        }
-        res = EsClient.index_doc(
-            index=GENERAL_ELASTICSEARCH_INDEX_NAME,
-            doc=doc,
-        )
-        general_elastic_doc_id = res["_id"]
+        # Load the results of the previous tasks.
+        text_artifact = artifact_store.get(text_artifact_key)
+        metadata_artifact = artifact_store.get(metadata_artifact_key)
 
-        # Index document into Elasticsearch according to document type.
-        doc["document_metadata"] = document_metadata
-        if document_label != LabelEnum.OTHER.value:
-            metadata_info = (
-                SCIENTIFIC_INFORMATION
-                if document_label == LabelEnum.PAPER.value
-                else RECRUITMENT_INFORMATION
-            )
-            for dict in metadata_info:
-                name = dict["name"]
-                type = dict["type"]
-                # Type of metadata checking, if type contains "semantic" then we need to generate vector for the metadata.
-                preprocessed_metadata = None
-                if type == "semantic text":
-                    metadata_value: Union[str, List[str]] = document_metadata.get(
-                        name, ""
-                    )
-                    preprocessed_metadata = PreprocessUtil.preprocess(metadata_value)
-
-                # Generate vector for metadata.
-                if preprocessed_metadata:
-                    metadata_embedding = text_encoding_manager.get_encoder(
-                        domain=domain
-                    ).encode(" ".join(file_preprocessed_text))
-                    doc["document_metadata"][name] = {
-                        "text": metadata_value,
-                        "text_vector": metadata_embedding,
-                    }
-                elif not preprocessed_metadata and type == "semantic text":
-                    doc["document_metadata"][name] = {
-                        "text": "",
-                        "text_vector": [0.0 for _ in range(768)],
-                    }
-
-            res = EsClient.index_doc(
-                index=SCIENTIFIC_ELASTICSEARCH_INDEX_NAME
-                if document_label == LabelEnum.PAPER.value
-                else RECRUITMENT_ELASTICSEARCH_INDEX_NAME,
-                doc=doc,
-            )
-            elastic_doc_id = res["_id"]
-            elastic_index_name = (
-                SCIENTIFIC_ELASTICSEARCH_INDEX_NAME
-                if document_label == LabelEnum.PAPER.value
-                else RECRUITMENT_ELASTICSEARCH_INDEX_NAME
-            )
-
-        # Update document elasticsearch related metadata and indexing status on database.
-        async_to_sync(document_service.update_document_celery)(
-            id=document_id,
-            params={
-                "general_elastic_doc_id": general_elastic_doc_id,
-                "elastic_doc_id": elastic_doc_id,
-                "elastic_index_name": elastic_index_name,
-            },
-        )
-        async_to_sync(document_index_service.update_indexing_status_celery)(
-            doc_id=document_id,
-            params={
-                "reason": None,
-                "status": IndexingStatusEnum.SUCCESS,
-                "current_task_id": None,
-            },
+        index_document(
+            document_id=document_id,
+            document_title=document_title,
+            document_label=document_label,
+            document_metadata=metadata_artifact["document_metadata"],
+            general_document_metadata=metadata_artifact["general_document_metadata"],
+            file_raw_text=text_artifact["file_raw_text"],
+            file_preprocessed_text=text_artifact["file_preprocessed_text"],
+            indexed_docs=indexed_docs,
         )
+        update_indexing_status(document_id, IndexingStatusEnum.SUCCESS)
+        artifact_store.delete(text_artifact_key, metadata_artifact_key)
 
         # Write current timestamp.
-        print(
-            "[INDEXING] task of document [{}] is finished at [{}]".format(
-                document_id,
-                datetime.datetime.now()
-                .astimezone(get_localzone())
-                .strftime("%Y-%m-%d %H:%M:%S"),
-            )
-        )
+        log_stage("INDEXING", document_id, "finished")
         return True
     except Exception as e:
         # Turn indexing status to failed if indexing failed.
-        async_to_sync(document_index_service.update_indexing_status_celery)(
-            doc_id=document_id,
-            params={
-                "status": IndexingStatusEnum.FAILED,
-                "reason": str(e),
-                "current_task_id": None,
-            },
-        )
+        update_indexing_status(document_id, IndexingStatusEnum.FAILED, reason=str(e))
 
         # Delete document from Elasticsearch if indexing failed.
-        if general_elastic_doc_id:
-            EsClient.delete_doc(
-                index_name=GENERAL_ELASTICSEARCH_INDEX_NAME,
-                doc_id=general_elastic_doc_id,
-            )
-        if elastic_doc_id and elastic_index_name:
-            EsClient.delete_doc(
-                index_name=elastic_index_name,
-                doc_id=elastic_doc_id,
+        delete_indexed_docs(indexed_docs)
+        raise e
+
+
+@celery.task(
+    name="ingest",
+    bind=True,
+    rate_limit="2/s",
+)
+def ingest(
+    self,
+    document_id: int,
+    document_title: str,
+    document_url: str,
+    document_label: str = None,
+    document_title_fixed: bool = False,
+) -> bool:
+    """
+    Celery task running parsing, extraction, and indexing of a document in a single worker call.
+    The file is downloaded and opened once and the parsed document is shared by every stage,
+    nothing goes through the broker between the stages. The indexing status goes through the
+    same transitions as the chained tasks.
+    [Parameters]
+        document_id: int -> Document id.
+        document_title: str -> Document title.
+        document_url: str -> Document url.
+        document_label: str -> Document predefined label, used when manually changing label.
+        document_title_fixed: bool -> Whether the document title should be kept.
+    [Returns]
+        bool -> True if ingestion is successful.
+    """
+    indexed_docs: List[Tuple[str, str]] = []
+    try:
+        log_stage("INGEST", document_id, "started")
+        index_docs = prepare_document(
+            task_id=self.request.id,
+            document_id=document_id,
+            document_title=document_title,
+            document_url=document_url,
+            document_label=document_label,
+            document_title_fixed=document_title_fixed,
+        )
+        write_index_docs(document_id, index_docs, indexed_docs)
+        update_indexing_status(document_id, IndexingStatusEnum.SUCCESS)
+        log_stage("INGEST", document_id, "finished")
+        return True
+    except IndexingSupersededException:
+        log_stage("INGEST", document_id, "superseded")
+        return False
+    except Exception as e:
+        update_indexing_status(document_id, IndexingStatusEnum.FAILED, reason=str(e))
+        delete_indexed_docs(indexed_docs)
+        raise e
+
+
+@celery.task(
+    name="bulk_ingest",
+    bind=True,
+)
+def bulk_ingest(
+    self,
+    documents: List[Dict[str, Any]],
+    relax_refresh: bool = False,
+) -> Dict[str, int]:
+    """
+    Celery task running parsing, extraction, and indexing of several documents in a single worker
+    call. Documents are parsed and extracted one by one and streamed into the Elasticsearch bulk
+    API, the outcome of every document is reported back to its indexing status. A document
+    reindexed while the batch runs is skipped, or removed from Elasticsearch if it was already
+    sent, and its indexing status is left to the new task.
+    [Parameters]
+        documents: List[Dict[str, Any]] -> Arguments of start_document_pipeline of every
+            document.
+        relax_refresh: bool -> Whether to relax the refresh interval of the indices while
+            indexing, the interval is shared with the other bulk tasks running.
+    [Returns]
+        Dict[str, int] -> Number of succeeded, failed, and superseded documents.
+    """
+    tracker = BulkIndexTracker()
+    finished_document_ids = set()
+    summary = {"success": 0, "failed": 0, "superseded": 0}
+
+    # Every document is owned through its own id, reindexing a document only takes it out of
+    # the batch.
+    task_ids = {
+        document["document_id"]: bulk_document_task_id(self.request.id, document["document_id"])
+        for document in documents
+    }
+
+    def fail_document(document_id: int, reason: str) -> None:
+        # A document reindexed meanwhile keeps the status set by its new task.
+        if update_indexing_status(
+            document_id,
+            IndexingStatusEnum.FAILED,
+            reason=reason,
+            owner_task_id=task_ids[document_id],
+        ):
+            summary["failed"] += 1
+        else:
+            summary["superseded"] += 1
+
+    def generate_actions():
+        for document in documents:
+            document_id = document["document_id"]
+            try:
+                log_stage("BULK INGEST", document_id, "started")
+                index_docs = prepare_document(
+                    task_id=task_ids[document_id], claim=True, **document
+                )
+                add_document_access(document_id, index_docs)
+            except IndexingSupersededException:
+                log_stage("BULK INGEST", document_id, "superseded")
+                finished_document_ids.add(document_id)
+                summary["superseded"] += 1
+                continue
+            except Exception as e:
+                finished_document_ids.add(document_id)
+                fail_document(document_id, str(e))
+                continue
+            yield from tracker.add_document(document_id, index_docs)
+
+    def finish_document(document_id: int) -> None:
+        finished_document_ids.add(document_id)
+        document_results = tracker.pop_results(document_id)
+        indexed_docs = [
+            (result["_index"], result["_id"]) for ok, result in document_results if ok
+        ]
+        errors = [bulk_error_reason(result) for ok, result in document_results if not ok]
+        try:
+            if len(indexed_docs) != len(document_results):
+                raise Exception("; ".join(errors) or "Failed to index document")
+            if not finish_document_indexing(document_id, task_ids[document_id], indexed_docs):
+                # The new task of a reindexed document writes its own Elasticsearch documents.
+                log_stage("BULK INGEST", document_id, "superseded")
+                delete_indexed_docs(indexed_docs)
+                summary["superseded"] += 1
+                return
+            summary["success"] += 1
+            log_stage("BULK INGEST", document_id, "finished")
+        except Exception as e:
+            fail_document(document_id, str(e))
+            delete_indexed_docs(indexed_docs)
+
+    indices = [
+        GENERAL_ELASTICSEARCH_INDEX_NAME,
+        RECRUITMENT_ELASTICSEARCH_INDEX_NAME,
+        SCIENTIFIC_ELASTICSEARCH_INDEX_NAME,
+    ]
+    try:
+        with EsClient.relaxed_refresh(indices) if relax_refresh else nullcontext():
+            for ok, item in EsClient.bulk_index_docs(generate_actions()):
+                document_id = tracker.add_result(ok, item)
+                if document_id is not None:
+                    finish_document(document_id)
+    except Exception as e:
+        # Unfinished documents are failed, partially indexed ones are removed from
+        # Elasticsearch.
+        for document in documents:
+            document_id = document["document_id"]
+            if document_id in finished_document_ids:
+                continue
+            fail_document(document_id, str(e))
+            delete_indexed_docs(
+                [
+                    (result["_index"], result["_id"])
+                    for ok, result in tracker.pop_results(document_id)
+                    if ok
+                ]
             )
         raise e
+    return summary
@@ -1,10 +1,11 @@
 from .session import Base, session
 from .standalone_session import standalone_session
-from .transactional import Transactional
+from .transactional import Transactional, run_after_transaction
 
 __all__ = [
     "Base",
     "session",
     "Transactional",
+    "run_after_transaction",
     "standalone_session",
 ]
@@ -9,7 +9,7 @@ def standalone_session(func):
         context = set_session_context(session_id=session_id)
 
         try:
-            await func(*args, **kwargs)
+            return await func(*args, **kwargs)
         except Exception as e:
             await session.rollback()
             raise e
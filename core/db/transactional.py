@@ -1,18 +1,46 @@
+from contextvars import ContextVar
 from functools import wraps
+from typing import Awaitable, Callable, List, Optional
 
 from core.db import session
 
+# Callbacks registered with run_after_transaction by the transaction of the current context.
+after_transaction_callbacks: ContextVar[
+    Optional[List[Callable[[], Awaitable[None]]]]
+] = ContextVar("after_transaction_callbacks", default=None)
+
+
+async def run_after_transaction(callback: Callable[[], Awaitable[None]]) -> None:
+    """
+    Run a callback once the current transaction is committed or rolled back, or right away when
+    no transaction is running, e.g. to invalidate caches only when the database changes they
+    reflect can be read by everyone. The callback must be safe to run after a rollback as well.
+    [Parameters]
+        callback: Callable[[], Awaitable[None]] -> Callback to be run.
+    """
+    callbacks = after_transaction_callbacks.get()
+    if callbacks is None:
+        await callback()
+    else:
+        callbacks.append(callback)
+
 
 class Transactional:
     def __call__(self, func):
         @wraps(func)
         async def _transactional(*args, **kwargs):
+            token = after_transaction_callbacks.set([])
             try:
                 result = await func(*args, **kwargs)
                 await session.commit()
             except Exception as e:
                 await session.rollback()
                 raise e
+            finally:
+                callbacks = after_transaction_callbacks.get()
+                after_transaction_callbacks.reset(token)
+                for callback in callbacks:
+                    await callback()
 
             return result
 
@@ -1,5 +1,6 @@
 from .base import *
 from .document import *
 from .repository import *
+from .search import *
 from .token import *
 from .user import *
@@ -63,3 +63,9 @@ class FailedDependencyException(CustomException):
     code = HTTPStatus.FAILED_DEPENDENCY
     error_code = HTTPStatus.FAILED_DEPENDENCY
     message = HTTPStatus.FAILED_DEPENDENCY.description
+
+
+class ServiceUnavailableException(CustomException):
+    code = HTTPStatus.SERVICE_UNAVAILABLE
+    error_code = HTTPStatus.SERVICE_UNAVAILABLE
+    message = HTTPStatus.SERVICE_UNAVAILABLE.description
@@ -0,0 +1,7 @@
+from core.exceptions import CustomException
+
+
+class InvalidSearchCursorException(CustomException):
+    code = 400
+    error_code = "SEARCH__INVALID_CURSOR"
+    message = "Search cursor is invalid or expired"
@@ -0,0 +1,93 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, TypeVar
+
+from core.config import config
+from core.exceptions.base import ServiceUnavailableException
+
+T = TypeVar("T")
+
+
+class InferenceExecutor:
+    """
+    InferenceExecutor runs CPU-bound work (model inference, text preprocessing, file parsing)
+    outside of the event loop on a bounded thread pool, so a slow call does not block the other
+    requests handled by the same worker. Torch, tokenizers and NumPy release the GIL, so threads
+    run the inference in parallel.
+
+    Calls are admitted only while fewer than max_queue_size calls are waiting for a thread, and a
+    waiting call gives up after queue_timeout seconds. Rejected calls raise
+    ServiceUnavailableException (503), so a burst of slow requests is shed instead of piling up.
+
+    [Attributes]
+        max_workers: int -> Number of threads of the pool.
+        max_queue_size: int -> Maximum number of calls waiting for a thread.
+        queue_timeout: float -> Seconds a call waits for a thread before being rejected.
+    """
+
+    def __init__(self, max_workers: int, max_queue_size: int, queue_timeout: float) -> None:
+        """
+        Constructor of InferenceExecutor class.
+        """
+        self.max_workers = max_workers
+        self.max_queue_size = max_queue_size
+        self.queue_timeout = queue_timeout
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="inference"
+        )
+        self.slots = asyncio.Semaphore(max_workers)
+        self.waiting = 0
+
+    async def acquire(self) -> None:
+        """
+        Wait for a free thread of the pool.
+        """
+        if not self.slots.locked():
+            # A free slot is taken without suspending.
+            await self.slots.acquire()
+            return
+        if self.waiting >= self.max_queue_size:
+            raise ServiceUnavailableException("Server is busy, please try again later")
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self.slots.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            raise ServiceUnavailableException("Server is busy, please try again later")
+        finally:
+            self.waiting -= 1
+
+    async def run(self, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """
+        Run a function on the executor and wait for its result.
+        [Parameters]
+            func: Callable[..., T] -> Function to be run.
+            args: Any -> Positional arguments of the function.
+            kwargs: Any -> Keyword arguments of the function.
+        [Returns]
+            T: Result of the function.
+        """
+        await self.acquire()
+        loop = asyncio.get_running_loop()
+        try:
+            future = self.executor.submit(partial(func, *args, **kwargs))
+        except BaseException:
+            self.slots.release()
+            raise
+        # The thread stays busy even if the request is cancelled, so the slot is only released
+        # once the call has actually finished.
+        future.add_done_callback(lambda _: loop.call_soon_threadsafe(self.slots.release))
+        return await asyncio.wrap_future(future)
+
+    def shutdown(self) -> None:
+        """
+        Stop the executor, waiting for the running calls to finish.
+        """
+        self.executor.shutdown(wait=True)
+
+
+inference_executor = InferenceExecutor(
+    max_workers=config.INFERENCE_EXECUTOR_WORKERS,
+    max_queue_size=config.INFERENCE_EXECUTOR_MAX_QUEUE_SIZE,
+    queue_timeout=config.INFERENCE_EXECUTOR_QUEUE_TIMEOUT,
+)
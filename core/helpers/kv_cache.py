@@ -0,0 +1,142 @@
+import abc
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional
+
+from core.helpers.redis import get_sync_redis
+
+
+class KeyValueCacheBackend(abc.ABC):
+    """
+    Storage of a cache of bytes values keyed by strings.
+    """
+
+    @abc.abstractmethod
+    def get_many(self, keys: List[str]) -> List[Optional[bytes]]:
+        ...
+
+    @abc.abstractmethod
+    def set_many(self, values: Dict[str, bytes]) -> None:
+        ...
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self.get_many([key])[0]
+
+    def set(self, key: str, value: bytes) -> None:
+        self.set_many({key: value})
+
+
+class RedisKeyValueCacheBackend(KeyValueCacheBackend):
+    """
+    Redis backed cache. Entries expire after the TTL, LRU eviction is left to the Redis
+    maxmemory-policy (allkeys-lru or volatile-lru).
+    """
+
+    def __init__(self, ttl: int) -> None:
+        self.ttl = ttl
+        self.client = get_sync_redis()
+
+    def get_many(self, keys: List[str]) -> List[Optional[bytes]]:
+        return self.client.mget(keys)
+
+    def set_many(self, values: Dict[str, bytes]) -> None:
+        pipe = self.client.pipeline(transaction=False)
+        for key, value in values.items():
+            pipe.set(name=key, value=value, ex=self.ttl)
+        pipe.execute()
+
+
+class DiskKeyValueCacheBackend(KeyValueCacheBackend):
+    """
+    SQLite backed cache stored on the local disk, several caches can share a file with different
+    tables. Entries expire after the TTL and the least recently used entries are evicted once the
+    table holds more than max_entries.
+    """
+
+    # Keep the number of bound parameters below the SQLite limit.
+    max_keys_per_query = 500
+
+    def __init__(self, path: str, table: str, ttl: int, max_entries: int) -> None:
+        if not re.fullmatch(r"[a-z_]+", table):
+            raise ValueError("Invalid cache table name: {}".format(table))
+        self.table = table
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        # Processes sharing the file wait for the one writing instead of failing.
+        self.conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS {} ("
+            "key TEXT PRIMARY KEY, value BLOB, created_at REAL, accessed_at REAL)".format(table)
+        )
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS {0}_accessed_at ON {0} (accessed_at)".format(table)
+        )
+        self.conn.commit()
+
+    def get_many(self, keys: List[str]) -> List[Optional[bytes]]:
+        now = time.time()
+        found: Dict[str, bytes] = {}
+        with self._lock:
+            for start in range(0, len(keys), self.max_keys_per_query):
+                batch = keys[start : start + self.max_keys_per_query]
+                rows = self.conn.execute(
+                    "SELECT key, value FROM {} WHERE created_at >= ? AND key IN ({})".format(
+                        self.table, ",".join("?" * len(batch))
+                    ),
+                    [now - self.ttl, *batch],
+                ).fetchall()
+                found.update(rows)
+            if found:
+                self.conn.executemany(
+                    "UPDATE {} SET accessed_at = ? WHERE key = ?".format(self.table),
+                    [(now, key) for key in found],
+                )
+                self.conn.commit()
+        return [found.get(key) for key in keys]
+
+    def set_many(self, values: Dict[str, bytes]) -> None:
+        now = time.time()
+        with self._lock:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO {} VALUES (?, ?, ?, ?)".format(self.table),
+                [(key, value, now, now) for key, value in values.items()],
+            )
+            self.conn.execute(
+                "DELETE FROM {} WHERE created_at < ?".format(self.table), (now - self.ttl,)
+            )
+            self.conn.execute(
+                "DELETE FROM {0} WHERE key IN (SELECT key FROM {0} "
+                "ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)".format(self.table),
+                (self.max_entries,),
+            )
+            self.conn.commit()
+
+
+def create_kv_cache_backend(
+    backend: str, ttl: int, path: str, table: str, max_entries: int
+) -> Optional[KeyValueCacheBackend]:
+    """
+    Create a cache backend from its settings.
+    [Parameters]
+        backend: str -> Either redis or disk, any other value disables the cache.
+        ttl: int -> Entry lifetime in seconds.
+        path: str -> SQLite file of the disk backend.
+        table: str -> Table of the disk backend.
+        max_entries: int -> Maximum number of entries of the disk backend.
+    [Returns]
+        Optional[KeyValueCacheBackend]: The backend, or None when caching is disabled.
+    """
+    match backend.lower():
+        case "redis":
+            return RedisKeyValueCacheBackend(ttl=ttl)
+        case "disk":
+            return DiskKeyValueCacheBackend(
+                path=path, table=table, ttl=ttl, max_entries=max_entries
+            )
+        case _:
+            return None
@@ -1,5 +1,25 @@
+from typing import Optional
+
+import redis as sync_redis
 import redis.asyncio as aioredis
 
 from core.config import config
 
-redis = aioredis.from_url(url=f"redis://{config.REDIS_HOST}")
+REDIS_URL = f"redis://{config.REDIS_HOST}:{config.REDIS_PORT}"
+
+redis = aioredis.from_url(url=REDIS_URL)
+
+_sync_redis: Optional[sync_redis.Redis] = None
+
+
+def get_sync_redis() -> sync_redis.Redis:
+    """
+    Get the synchronous Redis client of the process, used by code running outside of the event
+    loop such as Celery tasks and inference threads. The connection pool reconnects after a fork.
+    [Returns]
+        Redis: The client.
+    """
+    global _sync_redis
+    if _sync_redis is None:
+        _sync_redis = sync_redis.from_url(url=REDIS_URL)
+    return _sync_redis
@@ -210,6 +210,42 @@ class DocumentRepo(BaseRepo[Document]):
         result = await session.execute(text(query), {"user_id": collaborator_id})
         return [r.id for r in result.fetchall()]
 
+    async def get_document_access(self, document_ids: List[int]) -> list:
+        query = """
+        SELECT d.id, d.repository_id, d.is_public,
+            array_remove(array_agg(ud.user_id), NULL) AS collaborator_ids
+        FROM documents d
+        LEFT JOIN user_documents ud ON d.id = ud.document_id
+        WHERE d.id = ANY(:document_ids)
+        GROUP BY d.id
+        """
+        result = await session.execute(text(query), {"document_ids": list(document_ids)})
+        return result.fetchall()
+
+    async def get_document_ids_by_repository_id(self, repository_id: int) -> List[int]:
+        query = """
+        SELECT d.id FROM documents d
+        WHERE d.repository_id = :repository_id
+        """
+        result = await session.execute(text(query), {"repository_id": repository_id})
+        return [r.id for r in result.fetchall()]
+
+    async def get_public_document_ids(self) -> List[int]:
+        query = """
+        SELECT d.id FROM documents d
+        WHERE d.is_public IS true
+        """
+        result = await session.execute(text(query))
+        return [r.id for r in result.fetchall()]
+
+    async def get_document_ids_by_collaborator_id(self, collaborator_id: int) -> List[int]:
+        query = """
+        SELECT ud.document_id FROM user_documents ud
+        WHERE ud.user_id = :user_id
+        """
+        result = await session.execute(text(query), {"user_id": collaborator_id})
+        return [r.document_id for r in result.fetchall()]
+
     async def get_repo_accessible_documents(self, repository_id: int) -> List[int]:
         query = """
         SELECT d.id FROM documents d
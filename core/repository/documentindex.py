@@ -1,6 +1,7 @@
 from sqlalchemy import select, update
 from sqlalchemy.sql import text
 
+from app.document.enums.document import IndexingStatusEnum
 from app.document.models import DocumentIndex
 from core.db.session import session
 from core.repository import BaseRepo
@@ -21,14 +22,31 @@ class DocumentIndexRepo(BaseRepo[DocumentIndex]):
         doc_id: int,
         params: dict,
         synchronize_session: SynchronizeSessionEnum = False,
-    ):
+        task_id: str = None,
+    ) -> bool:
+        query = update(self.model).where(self.model.doc_id == doc_id)
+        if task_id is not None:
+            # Only update the row while the document is still indexed by this task.
+            query = query.where(self.model.current_task_id == task_id)
+        query = query.values(**params).execution_options(
+            synchronize_session=synchronize_session
+        )
+        result = await session.execute(query)
+        return result.rowcount > 0
+
+    async def claim_by_doc_id(self, doc_id: int, params: dict) -> bool:
         query = (
             update(self.model)
-            .where(self.model.doc_id == doc_id)
+            .where(
+                self.model.doc_id == doc_id,
+                self.model.status == IndexingStatusEnum.READY,
+                self.model.current_task_id.is_(None),
+            )
             .values(**params)
-            .execution_options(synchronize_session=synchronize_session)
+            .execution_options(synchronize_session=False)
         )
-        await session.execute(query)
+        result = await session.execute(query)
+        return result.rowcount > 0
 
     async def delete_by_repository_id(self, repository_id: int):
         sql = text(
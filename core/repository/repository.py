@@ -193,6 +193,15 @@ class RepositoryRepo(BaseRepo[Repository]):
         total_items = result.fetchone().total_count
         return total_items > 0
 
+    async def get_user_repository_ids(self, user_id: int) -> List[int]:
+        query = """
+        SELECT ur.repository_id
+        FROM user_repositories ur
+        WHERE ur.user_id = :user_id
+        """
+        result = await session.execute(text(query), {"user_id": user_id})
+        return [r.repository_id for r in result.fetchall()]
+
     async def get_repository_collaborators(self, repository_id: int) -> List[User]:
         query = """
         SELECT u.*, ur.role
@@ -1,4 +1,6 @@
+from .artifact_store import ArtifactStore
 from .custom_exception_helper import CustomExceptionHelper
+from .file_cache import FileCache
 from .gcs import GCStorage
 from .hash_helper import HashHelper
 from .string_helper import StringHelper
@@ -10,4 +12,6 @@ __all__ = [
     "HashHelper",
     "StringHelper",
     "GCStorage",
+    "ArtifactStore",
+    "FileCache",
 ]
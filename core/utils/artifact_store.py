@@ -0,0 +1,192 @@
+import abc
+import json
+import os
+import time
+import zlib
+from typing import Any, Optional
+
+from core.config import config
+from core.helpers.redis import get_sync_redis
+
+
+class ArtifactStoreBackend(abc.ABC):
+    @abc.abstractmethod
+    def get(self, key: str) -> Optional[bytes]:
+        ...
+
+    @abc.abstractmethod
+    def set(self, key: str, value: bytes) -> None:
+        ...
+
+    @abc.abstractmethod
+    def delete(self, key: str) -> None:
+        ...
+
+
+class RedisArtifactStoreBackend(ArtifactStoreBackend):
+    """
+    Redis backed artifact store, entries expire after the TTL.
+    """
+
+    def __init__(self, ttl: int) -> None:
+        self.ttl = ttl
+        self.client = get_sync_redis()
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self.client.get(key)
+
+    def set(self, key: str, value: bytes) -> None:
+        self.client.set(name=key, value=value, ex=self.ttl)
+
+    def delete(self, key: str) -> None:
+        self.client.delete(key)
+
+
+class DiskArtifactStoreBackend(ArtifactStoreBackend):
+    """
+    Artifact store on a directory shared by the workers (e.g. a mounted volume). Entries older
+    than the TTL are treated as missing and removed when they are read or when new entries are
+    written.
+    """
+
+    def __init__(self, path: str, ttl: int) -> None:
+        self.path = path
+        self.ttl = ttl
+        os.makedirs(self.path, exist_ok=True)
+
+    def _file_path(self, key: str) -> str:
+        return os.path.join(self.path, key.replace("/", "_").replace(":", "_"))
+
+    def _is_expired(self, file_path: str, now: float) -> bool:
+        return os.path.getmtime(file_path) < now - self.ttl
+
+    def get(self, key: str) -> Optional[bytes]:
+        file_path = self._file_path(key)
+        try:
+            if self._is_expired(file_path, time.time()):
+                os.remove(file_path)
+                return None
+            with open(file_path, "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def set(self, key: str, value: bytes) -> None:
+        file_path = self._file_path(key)
+        # Write to a temporary file first so readers never see a partially written artifact.
+        tmp_path = "{}.{}.tmp".format(file_path, os.getpid())
+        with open(tmp_path, "wb") as f:
+            f.write(value)
+        os.replace(tmp_path, file_path)
+        self.sweep()
+
+    def delete(self, key: str) -> None:
+        try:
+            os.remove(self._file_path(key))
+        except FileNotFoundError:
+            pass
+
+    def sweep(self) -> None:
+        now = time.time()
+        for entry in os.scandir(self.path):
+            try:
+                if entry.is_file() and self._is_expired(entry.path, now):
+                    os.remove(entry.path)
+            except FileNotFoundError:
+                continue
+
+
+class ArtifactStore:
+    """
+    ArtifactStore keeps the intermediate results of the document pipeline (parsed text,
+    extracted metadata, etc.) outside of the Celery broker. Values are JSON serialized and zlib
+    compressed, tasks only pass the key of the artifact to the next task.
+
+    [Attributes]
+        backend: ArtifactStoreBackend -> Storage of the artifacts.
+    """
+
+    key_prefix = "artifact"
+
+    def __init__(self, backend: ArtifactStoreBackend = None) -> None:
+        """
+        Constructor of ArtifactStore class.
+        [Parameters]
+            backend: ArtifactStoreBackend -> Storage of the artifacts, defaults to the one
+                configured by ARTIFACT_STORE_BACKEND.
+        """
+        self.backend = backend or self.backend_from_config()
+
+    @staticmethod
+    def backend_from_config() -> ArtifactStoreBackend:
+        """
+        Create the artifact store backend configured by ARTIFACT_STORE_BACKEND.
+        [Returns]
+            ArtifactStoreBackend: The configured backend.
+        """
+        match config.ARTIFACT_STORE_BACKEND.lower():
+            case "redis":
+                return RedisArtifactStoreBackend(ttl=config.ARTIFACT_STORE_TTL)
+            case "disk":
+                return DiskArtifactStoreBackend(
+                    path=config.ARTIFACT_STORE_PATH, ttl=config.ARTIFACT_STORE_TTL
+                )
+            case _:
+                raise ValueError(
+                    "Unsupported artifact store backend: {}".format(
+                        config.ARTIFACT_STORE_BACKEND
+                    )
+                )
+
+    def make_key(self, document_id: int, run_id: str, name: str) -> str:
+        """
+        Build the key of an artifact produced by a pipeline run.
+        [Parameters]
+            document_id: int -> Document id.
+            run_id: str -> Id of the pipeline run, e.g. the id of the first task.
+            name: str -> Name of the artifact.
+        [Returns]
+            str: Artifact key.
+        """
+        return f"{self.key_prefix}::{document_id}::{run_id}::{name}"
+
+    def put(self, key: str, value: Any) -> str:
+        """
+        Store an artifact.
+        [Parameters]
+            key: str -> Artifact key.
+            value: Any -> JSON serializable value.
+        [Returns]
+            str: Artifact key.
+        """
+        payload = zlib.compress(
+            json.dumps(value, ensure_ascii=False).encode("utf-8"),
+            config.ARTIFACT_STORE_COMPRESSION_LEVEL,
+        )
+        self.backend.set(key, payload)
+        return key
+
+    def get(self, key: str) -> Any:
+        """
+        Load an artifact.
+        [Parameters]
+            key: str -> Artifact key.
+        [Returns]
+            Any: Stored value.
+        """
+        payload = self.backend.get(key)
+        if payload is None:
+            raise Exception("Pipeline artifact {} is missing or expired".format(key))
+        return json.loads(zlib.decompress(payload).decode("utf-8"))
+
+    def delete(self, *keys: str) -> None:
+        """
+        Delete artifacts, failures are ignored since the artifacts expire anyway.
+        [Parameters]
+            keys: str -> Artifact keys.
+        """
+        for key in keys:
+            try:
+                self.backend.delete(key)
+            except Exception as e:
+                print("[ARTIFACT STORE] delete of {} failed: {}".format(key, e))
@@ -0,0 +1,120 @@
+import hashlib
+import json
+import os
+import time
+from typing import Optional, Tuple
+
+
+class FileCache:
+    """
+    FileCache is a size-bounded cache of downloaded files stored on the local disk of the worker,
+    so it is shared by every worker process (and pipeline stage) running on the same host. Entries
+    are keyed by the file URL and carry the etag returned by the server, which is used to
+    revalidate the entry. The least recently used files are evicted once the cache grows over
+    max_bytes.
+
+    [Attributes]
+        path: str -> Directory of the cached files.
+        max_bytes: int -> Maximum total size of the cached files.
+        max_age: int -> Seconds an entry is served without revalidation.
+    """
+
+    def __init__(self, path: str, max_bytes: int, max_age: int) -> None:
+        """
+        Constructor of FileCache class.
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        os.makedirs(self.path, exist_ok=True)
+
+    def _paths(self, url: str) -> Tuple[str, str]:
+        name = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        return (
+            os.path.join(self.path, name + ".bin"),
+            os.path.join(self.path, name + ".json"),
+        )
+
+    def get(self, url: str) -> Tuple[Optional[bytes], Optional[str], bool]:
+        """
+        Look up a cached file.
+        [Parameters]
+            url: str -> File URL.
+        [Returns]
+            Optional[bytes]: Cached content, None on miss.
+            Optional[str]: Etag of the cached content.
+            bool: Whether the entry is fresh enough to be used without revalidation.
+        """
+        content_path, meta_path = self._paths(url)
+        try:
+            with open(meta_path, "r") as f:
+                meta = json.load(f)
+            with open(content_path, "rb") as f:
+                content = f.read()
+        except (FileNotFoundError, ValueError):
+            return None, None, False
+        if meta.get("url") != url:
+            return None, None, False
+        os.utime(content_path)
+        return content, meta.get("etag"), time.time() - meta["fetched_at"] < self.max_age
+
+    def set(self, url: str, content: bytes, etag: Optional[str]) -> None:
+        """
+        Store a downloaded file.
+        [Parameters]
+            url: str -> File URL.
+            content: bytes -> File content.
+            etag: Optional[str] -> Etag returned by the server.
+        """
+        if len(content) > self.max_bytes:
+            return
+        content_path, meta_path = self._paths(url)
+        suffix = ".{}.tmp".format(os.getpid())
+        with open(content_path + suffix, "wb") as f:
+            f.write(content)
+        with open(meta_path + suffix, "w") as f:
+            json.dump({"url": url, "etag": etag, "fetched_at": time.time()}, f)
+        os.replace(content_path + suffix, content_path)
+        os.replace(meta_path + suffix, meta_path)
+        self.evict()
+
+    def touch(self, url: str) -> None:
+        """
+        Mark a cached file as revalidated.
+        [Parameters]
+            url: str -> File URL.
+        """
+        _, meta_path = self._paths(url)
+        try:
+            with open(meta_path, "r") as f:
+                meta = json.load(f)
+            meta["fetched_at"] = time.time()
+            with open(meta_path, "w") as f:
+                json.dump(meta, f)
+        except (FileNotFoundError, ValueError):
+            pass
+
+    def evict(self) -> None:
+        """
+        Remove the least recently used files until the cache fits in max_bytes.
+        """
+        entries = []
+        total = 0
+        for entry in os.scandir(self.path):
+            if not entry.name.endswith(".bin"):
+                continue
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+            total += stat.st_size
+        for _, size, content_path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            for file_path in (content_path, content_path[: -len(".bin")] + ".json"):
+                try:
+                    os.remove(file_path)
+                except FileNotFoundError:
+                    pass
+            total -= size
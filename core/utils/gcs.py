@@ -1,11 +1,14 @@
 import mimetypes
+import threading
 import time
 
 import requests
 from google.cloud import storage
 from google.oauth2.service_account import Credentials
+from requests.adapters import HTTPAdapter
 
 from core.config import config
+from core.utils.file_cache import FileCache
 
 creds_dict = {
     "type": "service_account",
@@ -23,9 +26,63 @@ creds = Credentials.from_service_account_info(info=creds_dict)
 
 
 class GCStorage:
+    """
+    GCStorage handles file upload and download. The storage client, bucket, HTTP session and file
+    cache are created once per process and shared by every GCStorage instance, so connections are
+    kept alive between documents.
+    """
+
+    _lock = threading.Lock()
+    _client: storage.Client = None
+    _bucket: storage.Bucket = None
+    _session: requests.Session = None
+    _file_cache: FileCache = None
+
     def __init__(self):
-        self.client = storage.Client(credentials=creds)
-        self.bucket = self.client.get_bucket(config.GCS_BUCKET_NAME)
+        with GCStorage._lock:
+            if GCStorage._client is None:
+                GCStorage._client = storage.Client(credentials=creds)
+                GCStorage._bucket = GCStorage._client.get_bucket(config.GCS_BUCKET_NAME)
+        self.client = GCStorage._client
+        self.bucket = GCStorage._bucket
+
+    @classmethod
+    def get_session(cls) -> requests.Session:
+        """
+        Get the process-wide HTTP session used to download files.
+        [Returns]
+            requests.Session: Pooled HTTP session.
+        """
+        with cls._lock:
+            if cls._session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(
+                    pool_connections=config.GCS_HTTP_POOL_SIZE,
+                    pool_maxsize=config.GCS_HTTP_POOL_SIZE,
+                    max_retries=3,
+                )
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                cls._session = session
+        return cls._session
+
+    @classmethod
+    def get_file_cache(cls) -> FileCache:
+        """
+        Get the worker-local cache of downloaded files, None if disabled.
+        [Returns]
+            FileCache: File cache.
+        """
+        if config.FILE_CACHE_MAX_BYTES <= 0:
+            return None
+        with cls._lock:
+            if cls._file_cache is None:
+                cls._file_cache = FileCache(
+                    path=config.FILE_CACHE_PATH,
+                    max_bytes=config.FILE_CACHE_MAX_BYTES,
+                    max_age=config.FILE_CACHE_MAX_AGE,
+                )
+        return cls._file_cache
 
     def upload_file(self, file, path):
         type, _ = mimetypes.guess_type(file.filename)
@@ -35,7 +92,29 @@ class GCStorage:
         return blob.public_url
 
     def get_file(self, path) -> bytes:
-        # blob = self.bucket.blob(path)
-        # url = blob.public_url
-        req = requests.get(path)
+        """
+        Download a file. A cached copy is served directly while it is fresh, otherwise it is
+        revalidated against the server with its etag and only downloaded again if it changed.
+        [Parameters]
+            path: str -> File URL.
+        [Returns]
+            bytes: File content.
+        """
+        file_cache = self.get_file_cache()
+        content, etag = None, None
+        if file_cache:
+            content, etag, fresh = file_cache.get(path)
+            if content is not None and fresh:
+                return content
+
+        headers = {"If-None-Match": etag} if content is not None and etag else {}
+        req = self.get_session().get(
+            path, headers=headers, timeout=config.GCS_HTTP_TIMEOUT
+        )
+        if req.status_code == 304 and content is not None:
+            file_cache.touch(path)
+            return content
+        req.raise_for_status()
+        if file_cache:
+            file_cache.set(path, req.content, req.headers.get("ETag"))
         return req.content
@@ -0,0 +1,146 @@
+from typing import Dict, List, Set
+
+import pytest
+from fakeredis import aioredis
+
+import app.document.services.accessible_document as accessible_document
+import core.db.transactional as transactional
+from app.document.services.accessible_document import AccessibleDocumentService
+from core.db import Transactional
+
+
+class FakeDocumentRepo:
+    def __init__(self) -> None:
+        self.public: Set[int] = set()
+        self.repositories: Dict[int, Set[int]] = {}
+        self.collaborations: Dict[int, Set[int]] = {}
+        self.memberships: Dict[int, Set[int]] = {}
+
+    async def get_public_document_ids(self) -> List[int]:
+        return sorted(self.public)
+
+    async def get_document_ids_by_repository_id(self, repository_id: int) -> List[int]:
+        return sorted(self.repositories.get(repository_id, set()))
+
+    async def get_document_ids_by_collaborator_id(self, collaborator_id: int) -> List[int]:
+        return sorted(self.collaborations.get(collaborator_id, set()))
+
+    async def get_all_accessible_documents(self, collaborator_id: int) -> List[int]:
+        document_ids = set(self.public) | self.collaborations.get(collaborator_id, set())
+        for repository_id in self.memberships.get(collaborator_id, set()):
+            document_ids |= self.repositories.get(repository_id, set())
+        return sorted(document_ids)
+
+
+class FakeRepositoryRepo:
+    def __init__(self, document_repo: FakeDocumentRepo) -> None:
+        self.document_repo = document_repo
+
+    async def get_user_repository_ids(self, user_id: int) -> List[int]:
+        return sorted(self.document_repo.memberships.get(user_id, set()))
+
+
+class FakeSession:
+    async def commit(self) -> None:
+        ...
+
+    async def rollback(self) -> None:
+        ...
+
+
+@pytest.fixture
+def db() -> FakeDocumentRepo:
+    db = FakeDocumentRepo()
+    db.public = {1}
+    db.repositories = {10: {2, 3}, 20: {4}}
+    db.collaborations = {100: {4}}
+    db.memberships = {100: {10}}
+    return db
+
+
+@pytest.fixture
+def service(monkeypatch, db) -> AccessibleDocumentService:
+    monkeypatch.setattr(accessible_document, "redis", aioredis.FakeRedis())
+    monkeypatch.setattr(transactional, "session", FakeSession())
+    service = AccessibleDocumentService()
+    service.document_repo = db
+    service.repository_repo = FakeRepositoryRepo(db)
+    return service
+
+
+@pytest.mark.asyncio
+async def test_get_user_document_ids(service, db):
+    assert await service.get_user_document_ids(100) == [1, 2, 3, 4]
+    assert await accessible_document.redis.exists(
+        service.public_key(),
+        service.repository_key(10),
+        service.user_repositories_key(100),
+        service.user_documents_key(100),
+    ) == 4
+
+
+@pytest.mark.asyncio
+async def test_invalidation_reloads_from_database(service, db):
+    await service.get_user_document_ids(100)
+
+    db.collaborations[100] = set()
+    db.memberships[100] = set()
+    await service.collaborators_removed(4, [100])
+    await service.repository_member_removed(10, 100)
+
+    assert await service.get_user_document_ids(100) == [1]
+
+
+@pytest.mark.asyncio
+async def test_invalidation_runs_after_transaction(service, db):
+    await service.get_user_document_ids(100)
+
+    @Transactional()
+    async def revoke() -> None:
+        db.memberships[100] = set()
+        await service.repository_member_removed(10, 100)
+        # Not committed yet, the cache still holds the previous state.
+        assert await accessible_document.redis.exists(service.user_repositories_key(100))
+
+    await revoke()
+
+    assert not await accessible_document.redis.exists(service.user_repositories_key(100))
+    assert await service.get_user_document_ids(100) == [1, 4]
+
+
+@pytest.mark.asyncio
+async def test_invalidation_runs_after_rollback(service, db):
+    await service.get_user_document_ids(100)
+
+    @Transactional()
+    async def fail() -> None:
+        await service.visibility_changed(1, False)
+        raise ValueError
+
+    with pytest.raises(ValueError):
+        await fail()
+
+    assert not await accessible_document.redis.exists(service.public_key())
+
+
+@pytest.mark.asyncio
+async def test_load_invalidated_while_loading_is_not_stored(service, db):
+    async def stale_loader() -> List[int]:
+        # Permissions change and are invalidated between the database read and the store.
+        stale = sorted(db.public)
+        db.public = set()
+        await service.visibility_changed(1, False)
+        return stale
+
+    await service.load(service.public_key(), stale_loader)
+
+    assert not await accessible_document.redis.exists(service.public_key())
+    assert await service.get_user_document_ids(100) == [2, 3, 4]
+
+
+@pytest.mark.asyncio
+async def test_disabled_cache_reads_database(service, db, monkeypatch):
+    monkeypatch.setattr(accessible_document.config, "ACCESSIBLE_DOCUMENT_CACHE_TTL", 0)
+
+    assert await service.get_user_document_ids(100) == [1, 2, 3, 4]
+    assert not await accessible_document.redis.exists(service.public_key())
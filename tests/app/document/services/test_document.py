@@ -0,0 +1,76 @@
+import pytest
+
+import core.db.transactional as transactional
+from app.document.services.document import DocumentService
+from core.db import Transactional
+from core.exceptions import FailedDependencyException
+
+
+class FakeSession:
+    def __init__(self, events):
+        self.events = events
+
+    async def commit(self) -> None:
+        self.events.append("commit")
+
+    async def rollback(self) -> None:
+        self.events.append("rollback")
+
+
+@pytest.fixture
+def events(monkeypatch):
+    events = []
+    monkeypatch.setattr(transactional, "session", FakeSession(events))
+    return events
+
+
+@pytest.fixture
+def service(events):
+    service = DocumentService()
+
+    async def sync_document_access(document_ids):
+        events.append(("sync", document_ids))
+
+    service.sync_document_access = sync_document_access
+    return service
+
+
+@pytest.mark.asyncio
+async def test_access_is_synced_after_commit(service, events):
+    @Transactional()
+    async def share() -> None:
+        await service.sync_document_access_after_transaction([1, 2])
+        events.append("update")
+
+    await share()
+
+    assert events == ["update", "commit", ("sync", [1, 2])]
+
+
+@pytest.mark.asyncio
+async def test_access_is_synced_from_database_after_rollback(service, events):
+    @Transactional()
+    async def fail() -> None:
+        await service.sync_document_access_after_transaction([1])
+        raise ValueError
+
+    with pytest.raises(ValueError):
+        await fail()
+
+    assert events == ["rollback", ("sync", [1])]
+
+
+@pytest.mark.asyncio
+async def test_failed_sync_does_not_fail_the_committed_request(service, events):
+    async def sync_document_access(document_ids):
+        raise FailedDependencyException("Elasticsearch is down")
+
+    service.sync_document_access = sync_document_access
+
+    @Transactional()
+    async def share() -> str:
+        await service.sync_document_access_after_transaction([1])
+        return "shared"
+
+    assert await share() == "shared"
+    assert events == ["commit"]
@@ -0,0 +1,57 @@
+from app.elastic.helpers import BulkIndexTracker
+
+
+def index_result(action, ok=True):
+    result = {"_index": action["_index"], "_id": action["_id"]}
+    if not ok:
+        result["status"] = 429
+        result["error"] = {"type": "es_rejected_execution_exception", "reason": "busy"}
+    return ok, {"index": result}
+
+
+def test_add_document_gives_every_action_an_id():
+    tracker = BulkIndexTracker()
+    actions = tracker.add_document(1, [("general", {"a": 1}), ("scientific", {"b": 2})])
+
+    assert [action["_index"] for action in actions] == ["general", "scientific"]
+    assert [action["_source"] for action in actions] == [{"a": 1}, {"b": 2}]
+    assert len({action["_id"] for action in actions}) == 2
+
+
+def test_results_out_of_order_are_matched_by_id():
+    tracker = BulkIndexTracker()
+    first = tracker.add_document(1, [("general", {}), ("scientific", {})])
+    second = tracker.add_document(2, [("general", {})])
+
+    # The first action of document 1 is retried after a 429 and reported last.
+    assert tracker.add_result(*index_result(first[1])) is None
+    assert tracker.add_result(*index_result(second[0])) == 2
+    assert tracker.add_result(*index_result(first[0])) == 1
+
+    assert tracker.pop_results(2) == [(True, {"_index": "general", "_id": second[0]["_id"]})]
+    assert sorted(result["_id"] for _, result in tracker.pop_results(1)) == sorted(
+        action["_id"] for action in first
+    )
+
+
+def test_failed_results_are_kept_with_their_document():
+    tracker = BulkIndexTracker()
+    first = tracker.add_document(1, [("general", {})])
+    second = tracker.add_document(2, [("general", {}), ("recruitment", {})])
+
+    assert tracker.add_result(*index_result(second[0], ok=False)) is None
+    assert tracker.add_result(*index_result(first[0])) == 1
+    assert tracker.add_result(*index_result(second[1])) == 2
+
+    assert [ok for ok, _ in tracker.pop_results(1)] == [True]
+    assert [ok for ok, _ in tracker.pop_results(2)] == [False, True]
+
+
+def test_pop_results_of_unfinished_document():
+    tracker = BulkIndexTracker()
+    actions = tracker.add_document(1, [("general", {}), ("scientific", {})])
+    tracker.add_result(*index_result(actions[0]))
+
+    assert tracker.pop_results(1) == [(True, {"_index": "general", "_id": actions[0]["_id"]})]
+    assert tracker.pop_results(1) == []
+    assert tracker.pop_results(3) == []
@@ -0,0 +1,157 @@
+import fakeredis
+import pytest
+
+import app.elastic.client as client_module
+from app.elastic.client import ElasticsearchClient
+from core.config import config
+
+
+def hit(_id: str, score: float) -> dict:
+    return {"_id": _id, "_score": score, "_source": {"id": _id}}
+
+
+def response(keyword_hits, knn_hits) -> dict:
+    return {"responses": [{"hits": {"hits": keyword_hits}}, {"hits": {"hits": knn_hits}}]}
+
+
+def fused_ids(fused: dict) -> list:
+    return [hit["_id"] for hit in fused["hits"]["hits"]]
+
+
+@pytest.fixture
+def fusion(monkeypatch):
+    def set_fusion(name: str, vector_weight: float = 0.5) -> None:
+        monkeypatch.setattr(config, "ELASTICSEARCH_HYBRID_FUSION", name)
+        monkeypatch.setattr(config, "ELASTICSEARCH_HYBRID_VECTOR_WEIGHT", vector_weight)
+        monkeypatch.setattr(config, "ELASTICSEARCH_RRF_RANK_CONSTANT", 60)
+
+    return set_fusion
+
+
+def test_rrf_sums_reciprocal_ranks(fusion):
+    fusion("rrf")
+    fused = ElasticsearchClient.fuse_hits(
+        response([hit("a", 9), hit("b", 5), hit("c", 1)], [hit("b", 0.9), hit("c", 0.8)]),
+        size=10,
+    )
+
+    # b: 1/62 + 1/61, c: 1/63 + 1/62, a: 1/61 only.
+    assert fused_ids(fused) == ["b", "c", "a"]
+    assert fused["hits"]["hits"][0]["_score"] == pytest.approx(1 / 62 + 1 / 61)
+    assert fused["hits"]["total"] == {"value": 3, "relation": "eq"}
+
+
+def test_rrf_ties_keep_keyword_order(fusion):
+    fusion("rrf")
+    fused = ElasticsearchClient.fuse_hits(response([hit("a", 3)], [hit("b", 0.7)]), size=10)
+
+    assert fused_ids(fused) == ["a", "b"]
+    assert fused["hits"]["hits"][0]["_score"] == fused["hits"]["hits"][1]["_score"]
+
+
+def test_weighted_normalizes_scores(fusion):
+    fusion("weighted", vector_weight=0.75)
+    fused = ElasticsearchClient.fuse_hits(
+        response([hit("a", 20), hit("b", 10)], [hit("b", 0.9), hit("a", 0.5), hit("c", 0.1)]),
+        size=10,
+    )
+
+    # a: 0.25 * 1 + 0.75 * 0.5, b: 0.25 * 0 + 0.75 * 1, c: 0.75 * 0.
+    assert fused_ids(fused) == ["b", "a", "c"]
+    assert [hit["_score"] for hit in fused["hits"]["hits"]] == pytest.approx([0.75, 0.625, 0])
+
+
+def test_hit_missing_from_one_list(fusion):
+    fusion("weighted")
+    fused = ElasticsearchClient.fuse_hits(
+        response([hit("a", 4), hit("b", 2)], [hit("c", 0.3)]), size=10
+    )
+
+    assert fused_ids(fused) == ["a", "c", "b"]
+    assert fused["hits"]["hits"][1]["_source"] == {"id": "c"}
+
+
+def test_size_and_empty_list(fusion):
+    fusion("rrf")
+    fused = ElasticsearchClient.fuse_hits(response([hit("a", 2), hit("b", 1)], []), size=1)
+
+    assert fused_ids(fused) == ["a"]
+    assert fused["hits"]["total"]["value"] == 2
+
+
+def test_failed_search_raises(fusion):
+    fusion("rrf")
+    with pytest.raises(Exception):
+        ElasticsearchClient.fuse_hits({"responses": [{"error": "boom"}]}, size=10)
+
+
+class FakeIndices:
+    def __init__(self, client):
+        self.client = client
+
+    def refresh(self, index):
+        self.client.refreshed.append(index)
+
+
+class RefreshClient(ElasticsearchClient):
+    """
+    Client of a single index whose operator tuned its refresh interval to 30s.
+    """
+
+    def __init__(self):
+        self.refresh_interval = "30s"
+        self.refreshed = []
+        self.fail_updates = False
+
+    @property
+    def indices_client(self):
+        return FakeIndices(self)
+
+    def get_refresh_interval(self, index):
+        return self.refresh_interval
+
+    def update_index(self, index, settings):
+        if self.fail_updates:
+            raise Exception("Elasticsearch is down")
+        self.refresh_interval = settings["index"]["refresh_interval"]
+
+
+@pytest.fixture
+def es(monkeypatch):
+    redis = fakeredis.FakeRedis()
+    monkeypatch.setattr(client_module, "get_sync_redis", lambda: redis)
+    return RefreshClient()
+
+
+def test_relaxed_refresh_restores_previous_interval(es):
+    with es.relaxed_refresh(["general"], refresh_interval="-1"):
+        assert es.refresh_interval == "-1"
+
+    assert es.refresh_interval == "30s"
+    assert es.refreshed == ["general"]
+
+
+def test_concurrent_jobs_keep_refresh_relaxed_until_the_last_one_ends(es):
+    first = es.relaxed_refresh(["general"], refresh_interval="-1")
+    second = es.relaxed_refresh(["general"], refresh_interval="-1")
+    first.__enter__()
+    second.__enter__()
+
+    first.__exit__(None, None, None)
+    assert es.refresh_interval == "-1"
+    assert es.refreshed == ["general"]
+
+    second.__exit__(None, None, None)
+    assert es.refresh_interval == "30s"
+
+
+def test_failed_restore_is_retried_by_the_next_job(es):
+    with es.relaxed_refresh(["general"], refresh_interval="-1"):
+        es.fail_updates = True
+    assert es.refresh_interval == "-1"
+
+    es.fail_updates = False
+    with es.relaxed_refresh(["general"], refresh_interval="-1"):
+        ...
+    # The interval saved by the first job is restored, not the relaxed one left behind.
+    assert es.refresh_interval == "30s"
@@ -0,0 +1,97 @@
+import pytest
+
+import app.elastic.migration as migration
+from app.elastic.migration import STRIP_ZERO_VECTORS_SCRIPT, migrate_index
+
+
+class FakeIndices:
+    def __init__(self, client):
+        self.client = client
+
+    def exists_alias(self, name):
+        return False
+
+    def exists(self, index):
+        return index in self.client.counts
+
+    def create(self, index, mappings, settings):
+        if index in self.client.counts:
+            raise Exception("resource_already_exists_exception")
+        self.client.counts[index] = 0
+
+    def put_settings(self, index, settings):
+        ...
+
+    def refresh(self, index):
+        ...
+
+    def update_aliases(self, actions):
+        self.client.aliases = actions
+
+    def delete(self, index, ignore_unavailable=False):
+        self.client.counts.pop(index, None)
+
+
+class FakeClient:
+    def __init__(self, source_count, copied_count, failures=()):
+        self.counts = {"general-0001": source_count}
+        self.copied_count = copied_count
+        self.failures = list(failures)
+        self.reindex_kwargs = None
+        self.aliases = None
+        self.indices = FakeIndices(self)
+
+    def options(self, **kwargs):
+        return self
+
+    def reindex(self, dest, **kwargs):
+        self.reindex_kwargs = kwargs
+        self.counts[dest["index"]] = self.copied_count
+        return {"failures": self.failures}
+
+    def count(self, index):
+        return {"count": self.counts[index]}
+
+
+@pytest.fixture
+def client(monkeypatch):
+    def use_client(**kwargs):
+        client = FakeClient(**kwargs)
+        monkeypatch.setattr(migration.ElasticsearchClient, "get_client", lambda: client)
+        return client
+
+    return use_client
+
+
+def test_copy_strips_zero_vectors_and_moves_alias(client):
+    fake = client(source_count=3, copied_count=3)
+
+    assert migrate_index("general-0001", {}, {}) == "general-0002"
+    assert fake.reindex_kwargs["script"] == {
+        "source": STRIP_ZERO_VECTORS_SCRIPT,
+        "lang": "painless",
+    }
+    assert fake.aliases == [
+        {"add": {"index": "general-0002", "alias": "general-0001"}},
+        {"remove_index": {"index": "general-0001"}},
+    ]
+
+
+@pytest.mark.parametrize(
+    "kwargs",
+    [
+        {"source_count": 3, "copied_count": 2},
+        {"source_count": 3, "copied_count": 3, "failures": [{"cause": "mapper_parsing"}]},
+    ],
+)
+def test_failed_copy_deletes_target_so_it_can_be_rerun(client, kwargs):
+    fake = client(**kwargs)
+
+    with pytest.raises(Exception):
+        migrate_index("general-0001", {}, {})
+    assert "general-0002" not in fake.counts
+    assert fake.aliases is None
+
+    fake.copied_count = fake.counts["general-0001"]
+    fake.failures = []
+    assert migrate_index("general-0001", {}, {}) == "general-0002"
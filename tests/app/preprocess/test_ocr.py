@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+
+import app.preprocess.ocr as ocr
+from app.preprocess.ocr import OCRUtil
+
+# (block_num, par_num, line_num, word_num, left, top, text) of the words found by tesseract on
+# a 1000px wide page with 2 columns, in the order tesseract may report them.
+WORDS = [
+    (3, 1, 1, 1, 550, 100, "Right"),
+    (3, 1, 1, 2, 620, 100, "top"),
+    (1, 1, 2, 2, 120, 140, "second"),
+    (1, 1, 2, 1, 50, 140, "Left"),
+    (1, 1, 1, 1, 50, 100, "Left"),
+    (1, 1, 1, 2, 120, 100, "first"),
+    (2, 1, 1, 1, 60, 500, "Left"),
+    (2, 1, 1, 2, 130, 500, "bottom"),
+    (4, 1, 1, 1, 540, 400, "Right"),
+    (4, 1, 1, 2, 610, 400, "bottom"),
+    (4, 1, 1, 3, 680, 400, " "),
+]
+
+
+def image_to_data(image, config, output_type, timeout):
+    keys = ["block_num", "par_num", "line_num", "word_num", "left", "top", "text"]
+    return {key: [word[i] for word in WORDS] for i, key in enumerate(keys)}
+
+
+@pytest.fixture(autouse=True)
+def tesseract(monkeypatch):
+    monkeypatch.setattr(OCRUtil, "deskew", classmethod(lambda cls, image, timeout=0: image))
+    monkeypatch.setattr(ocr.pytesseract, "image_to_data", image_to_data)
+
+
+def test_blocks_are_read_by_column():
+    blocks = OCRUtil.ocr_image_tsv(np.zeros((800, 1000, 3), dtype=np.uint8))
+
+    assert blocks == [
+        "Left first\nLeft second",
+        "Left bottom",
+        "Right top",
+        "Right bottom",
+    ]
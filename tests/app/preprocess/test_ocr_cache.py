@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+
+from app.preprocess.ocr_cache import OCRCache
+from core.helpers.kv_cache import DiskKeyValueCacheBackend
+
+
+@pytest.fixture
+def cache(tmp_path) -> OCRCache:
+    cache = OCRCache(
+        DiskKeyValueCacheBackend(
+            path=str(tmp_path / "cache.sqlite3"), table="ocr_pages", ttl=60, max_entries=10
+        )
+    )
+    cache._tesseract_version = "5.3.0"
+    return cache
+
+
+def test_key_depends_on_image_and_variant(cache):
+    image = np.zeros((4, 6), dtype=np.uint8)
+    key = cache.make_key(image, "tsv --psm 1")
+
+    assert key.startswith("ocr::5.3.0::")
+    assert key == cache.make_key(image.copy(), "tsv --psm 1")
+    assert key != cache.make_key(np.ones((4, 6), dtype=np.uint8), "tsv --psm 1")
+    assert key != cache.make_key(np.zeros((6, 4), dtype=np.uint8), "tsv --psm 1")
+    assert key != cache.make_key(image, "text --psm 1")
+
+
+def test_key_depends_on_tesseract_version(cache):
+    image = np.zeros((4, 6), dtype=np.uint8)
+    key = cache.make_key(image, "tsv")
+    cache._tesseract_version = "5.4.0"
+
+    assert key != cache.make_key(image, "tsv")
+
+
+def test_round_trip(cache):
+    key = cache.make_key(np.zeros((4, 6), dtype=np.uint8), "tsv")
+
+    assert cache.get(key) is None
+    cache.set(key, "Xin chào")
+    assert cache.get(key) == "Xin chào"
+    assert (cache.hits, cache.misses) == (1, 1)
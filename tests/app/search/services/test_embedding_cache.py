@@ -0,0 +1,57 @@
+import numpy as np
+
+from app.search.services.embedding_cache import EmbeddingCache
+from core.helpers.kv_cache import DiskKeyValueCacheBackend, KeyValueCacheBackend
+
+
+class FailingBackend(KeyValueCacheBackend):
+    def get_many(self, keys):
+        raise ConnectionError("unavailable")
+
+    def set_many(self, values):
+        raise ConnectionError("unavailable")
+
+
+def make_cache(tmp_path) -> EmbeddingCache:
+    return EmbeddingCache(
+        DiskKeyValueCacheBackend(
+            path=str(tmp_path / "cache.sqlite3"), table="embeddings", ttl=60, max_entries=10
+        )
+    )
+
+
+def test_key_normalizes_whitespace(tmp_path):
+    cache = make_cache(tmp_path)
+
+    assert cache.make_key("model", "hello  world\n") == cache.make_key("model", " hello world")
+    assert cache.make_key("model", "hello world") != cache.make_key("model", "hello")
+
+
+def test_key_depends_on_checkpoint_and_variant(tmp_path):
+    cache = make_cache(tmp_path)
+    key = cache.make_key("model", "text")
+
+    assert key.startswith("embedding::")
+    assert key != cache.make_key("other", "text")
+    assert key != cache.make_key("model", "text", variant="chunked")
+
+
+def test_round_trip_and_stats(tmp_path):
+    cache = make_cache(tmp_path)
+    first, second = cache.make_key("model", "first"), cache.make_key("model", "second")
+    embedding = np.arange(6, dtype=np.float32).reshape(2, 3)
+    cache.set_many({first: embedding})
+
+    cached, missing = cache.get_many([first, second], dims=3)
+
+    np.testing.assert_array_equal(cached, embedding)
+    assert missing is None
+    assert cache.stats() == {"hits": 1, "misses": 1, "hit_ratio": 0.5}
+
+
+def test_failing_backend_counts_as_miss():
+    cache = EmbeddingCache(FailingBackend())
+    cache.set_many({"key": np.zeros((1, 3), dtype=np.float32)})
+
+    assert cache.get_many(["key"], dims=3) == [None]
+    assert cache.stats()["misses"] == 1
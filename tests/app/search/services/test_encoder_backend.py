@@ -0,0 +1,66 @@
+import os
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("torch")
+
+import app.search.services.encoder_backend as encoder_backend  # noqa: E402
+from app.search.services.encoder_backend import OnnxEncoderBackend  # noqa: E402
+
+
+class FakeModel:
+    def eval(self):
+        ...
+
+
+@pytest.fixture
+def exports(monkeypatch):
+    state = {"calls": 0, "fail": False}
+
+    def export(model, args, path, **kwargs):
+        state["calls"] += 1
+        with open(path, "wb") as f:
+            f.write(b"partial")
+            time.sleep(0.05)
+            if state["fail"]:
+                raise RuntimeError("export crashed")
+            f.write(b" model")
+
+    monkeypatch.setattr(
+        encoder_backend.AutoModel, "from_pretrained", staticmethod(lambda checkpoint: FakeModel())
+    )
+    monkeypatch.setattr(encoder_backend.torch.onnx, "export", export)
+    return state
+
+
+def test_concurrent_exports_write_the_model_once(tmp_path, exports):
+    paths = []
+    threads = [
+        threading.Thread(
+            target=lambda: paths.append(OnnxEncoderBackend.export("org/model", str(tmp_path)))
+        )
+        for _ in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert exports["calls"] == 1
+    assert len(set(paths)) == 1
+    with open(paths[0], "rb") as f:
+        assert f.read() == b"partial model"
+
+
+def test_crashed_export_is_not_loaded_and_is_retried(tmp_path, exports):
+    exports["fail"] = True
+    with pytest.raises(RuntimeError):
+        OnnxEncoderBackend.export("org/model", str(tmp_path))
+    assert not os.path.exists(tmp_path / "org__model" / "model.onnx")
+
+    exports["fail"] = False
+    path = OnnxEncoderBackend.export("org/model", str(tmp_path))
+    with open(path, "rb") as f:
+        assert f.read() == b"partial model"
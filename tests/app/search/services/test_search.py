@@ -0,0 +1,81 @@
+import base64
+import json
+
+import pytest
+
+from app.search.constants.search import MAX_SEARCH_OFFSET
+from app.search.services.search import SearchService
+from core.exceptions import InvalidSearchCursorException
+
+STATE = {
+    "key": "abc",
+    "pit": "pit-id",
+    "offset": 20,
+    "min_score": 5.5,
+    "search_after": [7.25, 42],
+}
+
+
+def forge_cursor(state) -> str:
+    """
+    Cursor with a valid signature of the original state but a different payload.
+    """
+    _, signature = SearchService.encode_cursor(STATE).split(".")
+    payload = base64.urlsafe_b64encode(json.dumps(state).encode("utf-8")).decode("utf-8")
+    return "{}.{}".format(payload, signature)
+
+
+def test_cursor_round_trip():
+    cursor = SearchService.encode_cursor(STATE)
+
+    assert SearchService.decode_cursor(cursor, "abc") == STATE
+
+
+def test_cursor_of_another_search_is_rejected():
+    cursor = SearchService.encode_cursor(STATE)
+
+    with pytest.raises(InvalidSearchCursorException):
+        SearchService.decode_cursor(cursor, "other")
+
+
+@pytest.mark.parametrize(
+    "cursor",
+    [
+        "",
+        "not a cursor",
+        "e30.",
+        base64.urlsafe_b64encode(json.dumps(STATE).encode("utf-8")).decode("utf-8"),
+        forge_cursor({**STATE, "offset": 10**9}),
+        forge_cursor({**STATE, "min_score": -1}),
+    ],
+)
+def test_tampered_cursor_is_rejected(cursor):
+    with pytest.raises(InvalidSearchCursorException):
+        SearchService.decode_cursor(cursor, "abc")
+
+
+@pytest.mark.parametrize(
+    "state",
+    [
+        [],
+        {**STATE, "offset": "10"},
+        {**STATE, "offset": True},
+        {**STATE, "offset": -1},
+        {**STATE, "offset": MAX_SEARCH_OFFSET + 1},
+        {**STATE, "min_score": "5"},
+        {**STATE, "min_score": float("inf")},
+        {**STATE, "search_after": [1.0]},
+        {**STATE, "search_after": ["a", 1]},
+        {**STATE, "pit": 1},
+        {**STATE, "size": 10000},
+        {key: value for key, value in STATE.items() if key != "key"},
+    ],
+)
+def test_invalid_cursor_state_is_rejected(state):
+    assert not SearchService.is_valid_cursor_state(state)
+    with pytest.raises(InvalidSearchCursorException):
+        SearchService.decode_cursor(SearchService.encode_cursor(state), "abc")
+
+
+def test_first_page_state_is_valid():
+    assert SearchService.is_valid_cursor_state({"key": "abc", "offset": 10, "min_score": 0})
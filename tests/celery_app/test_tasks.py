@@ -0,0 +1,177 @@
+from contextlib import nullcontext
+
+import pytest
+
+import celery_app.tasks as tasks
+from app.document.enums.document import IndexingStatusEnum
+from app.elastic import GENERAL_ELASTICSEARCH_INDEX_NAME
+
+
+class FakeIndexTable:
+    """
+    document_indexes rows with the conditional updates of DocumentIndexRepo.
+    """
+
+    def __init__(self, doc_ids):
+        self.rows = {
+            doc_id: {"status": IndexingStatusEnum.READY, "reason": None, "current_task_id": None}
+            for doc_id in doc_ids
+        }
+        self.elastic_doc_ids = {}
+
+    def update(self, doc_id, params, task_id=None) -> bool:
+        row = self.rows[doc_id]
+        if task_id is not None and row["current_task_id"] != task_id:
+            return False
+        row.update(params)
+        return True
+
+    def reindex(self, doc_id, new_task_id) -> None:
+        # What DocumentService.reindex and the first stage of the new pipeline write.
+        self.rows[doc_id].update(
+            {"status": IndexingStatusEnum.READY, "reason": None, "current_task_id": None}
+        )
+        self.update(
+            doc_id, {"status": IndexingStatusEnum.PARSING, "current_task_id": new_task_id}
+        )
+
+
+class FakeDocumentIndexService:
+    def __init__(self, table):
+        self.table = table
+
+    async def update_indexing_status_celery(self, doc_id, params, task_id=None):
+        return self.table.rows[doc_id] if self.table.update(doc_id, params, task_id) else None
+
+    async def claim_indexing_celery(self, doc_id, params):
+        row = self.table.rows[doc_id]
+        if row["status"] != IndexingStatusEnum.READY or row["current_task_id"] is not None:
+            return False
+        row.update(params)
+        return True
+
+
+class FakeDocumentService:
+    def __init__(self, table):
+        self.table = table
+
+    async def finish_indexing_celery(self, id, task_id, params):
+        if not self.table.update(
+            id,
+            {"status": IndexingStatusEnum.SUCCESS, "reason": None, "current_task_id": None},
+            task_id,
+        ):
+            return False
+        self.table.elastic_doc_ids[id] = params
+        return True
+
+
+class FakeStorage:
+    def get_file(self, url):
+        return url.encode("utf-8")
+
+
+@pytest.fixture
+def pipeline(monkeypatch):
+    state = {"table": FakeIndexTable([1, 2, 3]), "on_parse": {}, "on_write": {}, "deleted": []}
+    table = state["table"]
+
+    def parse_document(parsed_document):
+        document_id = int(parsed_document.decode("utf-8"))
+        state["on_parse"].get(document_id, lambda: None)()
+        return "text", ["text"], False
+
+    def extract_document(document_id, document_title, document_label, **kwargs):
+        return document_title, document_label or "general", {}, {}
+
+    def build_index_docs(document_id, **kwargs):
+        return [(GENERAL_ELASTICSEARCH_INDEX_NAME, {"id": document_id})]
+
+    def bulk_index_docs(actions):
+        for action in actions:
+            state["on_write"].get(action["_source"]["id"], lambda: None)()
+            yield True, {"index": {"_index": action["_index"], "_id": action["_id"]}}
+
+    monkeypatch.setattr(tasks, "document_index_service", FakeDocumentIndexService(table))
+    monkeypatch.setattr(tasks, "document_service", FakeDocumentService(table))
+    monkeypatch.setattr(tasks, "GCStorage", FakeStorage)
+    monkeypatch.setattr(tasks, "ParsedDocument", nullcontext)
+    monkeypatch.setattr(tasks, "parse_document", parse_document)
+    monkeypatch.setattr(tasks, "extract_document", extract_document)
+    monkeypatch.setattr(tasks, "build_index_docs", build_index_docs)
+    monkeypatch.setattr(tasks, "add_document_access", lambda document_id, index_docs: None)
+    monkeypatch.setattr(tasks.EsClient, "bulk_index_docs", bulk_index_docs)
+    monkeypatch.setattr(
+        tasks.EsClient,
+        "delete_doc",
+        lambda index_name, doc_id: state["deleted"].append((index_name, doc_id)),
+    )
+    return state
+
+
+def run_bulk_ingest(task_id="bulk-task"):
+    documents = [
+        {"document_id": document_id, "document_title": "doc", "document_url": str(document_id)}
+        for document_id in [1, 2, 3]
+    ]
+    tasks.bulk_ingest.push_request(id=task_id)
+    try:
+        return tasks.bulk_ingest.run(documents=documents)
+    finally:
+        tasks.bulk_ingest.pop_request()
+
+
+def test_bulk_ingest_indexes_every_document(pipeline):
+    summary = run_bulk_ingest()
+
+    assert summary == {"success": 3, "failed": 0, "superseded": 0}
+    for row in pipeline["table"].rows.values():
+        assert row == {"status": IndexingStatusEnum.SUCCESS, "reason": None, "current_task_id": None}
+    assert sorted(pipeline["table"].elastic_doc_ids) == [1, 2, 3]
+
+
+def test_document_reindexed_while_parsing_leaves_the_batch(pipeline):
+    table = pipeline["table"]
+    pipeline["on_parse"][2] = lambda: table.reindex(2, "new-task")
+
+    summary = run_bulk_ingest()
+
+    assert summary == {"success": 2, "failed": 0, "superseded": 1}
+    # The other documents of the batch are indexed, the reindexed one belongs to its new task.
+    assert table.rows[1]["status"] == table.rows[3]["status"] == IndexingStatusEnum.SUCCESS
+    assert table.rows[2] == {
+        "status": IndexingStatusEnum.PARSING,
+        "reason": None,
+        "current_task_id": "new-task",
+    }
+    assert 2 not in table.elastic_doc_ids
+    assert pipeline["deleted"] == []
+
+
+def test_document_reindexed_after_being_sent_is_removed(pipeline):
+    table = pipeline["table"]
+    pipeline["on_write"][2] = lambda: table.reindex(2, "new-task")
+
+    summary = run_bulk_ingest()
+
+    assert summary == {"success": 2, "failed": 0, "superseded": 1}
+    assert table.rows[2]["current_task_id"] == "new-task"
+    assert 2 not in table.elastic_doc_ids
+    assert [index_name for index_name, _ in pipeline["deleted"]] == [
+        GENERAL_ELASTICSEARCH_INDEX_NAME
+    ]
+
+
+def test_document_reindexed_before_the_batch_starts_is_skipped(pipeline):
+    table = pipeline["table"]
+    table.reindex(2, "new-task")
+
+    summary = run_bulk_ingest()
+
+    assert summary == {"success": 2, "failed": 0, "superseded": 1}
+    assert table.rows[2]["current_task_id"] == "new-task"
+
+
+def test_bulk_document_task_id_is_not_revoked():
+    assert tasks.is_bulk_document_task_id(tasks.bulk_document_task_id("bulk-task", 2))
+    assert not tasks.is_bulk_document_task_id("6f1c3b4e-0d6a-4a53-9a8e-2f5c0a2d1b7e")
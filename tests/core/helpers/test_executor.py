@@ -0,0 +1,66 @@
+import asyncio
+import threading
+
+import pytest
+
+from core.exceptions.base import ServiceUnavailableException
+from core.helpers.executor import InferenceExecutor
+
+
+async def wait_until(condition) -> None:
+    for _ in range(100):
+        if condition():
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError("Condition not met")
+
+
+@pytest.mark.asyncio
+async def test_run_returns_result():
+    executor = InferenceExecutor(max_workers=2, max_queue_size=1, queue_timeout=1)
+    try:
+        assert await executor.run(pow, 2, exp=10) == 1024
+    finally:
+        executor.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_calls_over_queue_limit_are_rejected():
+    executor = InferenceExecutor(max_workers=1, max_queue_size=1, queue_timeout=5)
+    release = threading.Event()
+    try:
+        running = asyncio.create_task(executor.run(release.wait))
+        await wait_until(executor.slots.locked)
+        waiting = asyncio.create_task(executor.run(lambda: "queued"))
+        await wait_until(lambda: executor.waiting == 1)
+
+        with pytest.raises(ServiceUnavailableException):
+            await executor.run(lambda: "rejected")
+
+        release.set()
+        assert await running is True
+        assert await waiting == "queued"
+        assert executor.waiting == 0
+    finally:
+        release.set()
+        executor.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_waiting_call_times_out():
+    executor = InferenceExecutor(max_workers=1, max_queue_size=1, queue_timeout=0.05)
+    release = threading.Event()
+    try:
+        running = asyncio.create_task(executor.run(release.wait))
+        await wait_until(executor.slots.locked)
+
+        with pytest.raises(ServiceUnavailableException):
+            await executor.run(lambda: "timed out")
+        assert executor.waiting == 0
+
+        release.set()
+        await running
+        assert await executor.run(lambda: "admitted") == "admitted"
+    finally:
+        release.set()
+        executor.shutdown()
@@ -0,0 +1,85 @@
+import fakeredis
+import pytest
+
+import core.helpers.kv_cache as kv_cache
+from core.helpers.kv_cache import (
+    DiskKeyValueCacheBackend,
+    RedisKeyValueCacheBackend,
+    create_kv_cache_backend,
+)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = {"now": 1000.0}
+    monkeypatch.setattr(kv_cache.time, "time", lambda: clock["now"])
+    return clock
+
+
+def disk_backend(tmp_path, table="entries", ttl=60, max_entries=3):
+    return DiskKeyValueCacheBackend(
+        path=str(tmp_path / "cache.sqlite3"), table=table, ttl=ttl, max_entries=max_entries
+    )
+
+
+def test_disk_round_trip(tmp_path):
+    backend = disk_backend(tmp_path)
+    backend.set_many({"a": b"1", "b": b"2"})
+
+    assert backend.get_many(["a", "missing", "b"]) == [b"1", None, b"2"]
+    assert backend.get("a") == b"1"
+
+
+def test_disk_entries_expire(tmp_path, clock):
+    backend = disk_backend(tmp_path, ttl=60)
+    backend.set("a", b"1")
+
+    clock["now"] += 61
+    assert backend.get("a") is None
+
+
+def test_disk_evicts_least_recently_used(tmp_path, clock):
+    backend = disk_backend(tmp_path, max_entries=2)
+    backend.set("a", b"1")
+    clock["now"] += 1
+    backend.set("b", b"2")
+    clock["now"] += 1
+    # Reading a makes b the least recently used entry.
+    assert backend.get("a") == b"1"
+    clock["now"] += 1
+    backend.set("c", b"3")
+
+    assert backend.get_many(["a", "b", "c"]) == [b"1", None, b"3"]
+
+
+def test_disk_tables_are_separate(tmp_path):
+    first = disk_backend(tmp_path, table="first")
+    second = disk_backend(tmp_path, table="second")
+    first.set("a", b"1")
+
+    assert second.get("a") is None
+
+
+def test_disk_rejects_invalid_table(tmp_path):
+    with pytest.raises(ValueError):
+        disk_backend(tmp_path, table="entries; DROP TABLE entries")
+
+
+def test_redis_round_trip(monkeypatch):
+    client = fakeredis.FakeRedis()
+    monkeypatch.setattr(kv_cache, "get_sync_redis", lambda: client)
+    backend = RedisKeyValueCacheBackend(ttl=60)
+    backend.set_many({"a": b"1", "b": b"2"})
+
+    assert backend.get_many(["a", "missing", "b"]) == [b"1", None, b"2"]
+    assert 0 < client.ttl("a") <= 60
+
+
+def test_create_backend(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+
+    assert isinstance(
+        create_kv_cache_backend("DISK", ttl=60, path=path, table="entries", max_entries=10),
+        DiskKeyValueCacheBackend,
+    )
+    assert create_kv_cache_backend("none", ttl=60, path=path, table="entries", max_entries=10) is None